@@ -6,12 +6,14 @@ import pandas as pd
 import numpy as np
 from PyQt6 import QtCore
 from PyQt6.QtCore import Qt
-from PyQt6.uic import loadUi
-from matplotlib import pyplot as plt
+from startup import lazy_import, load_ui
+plt = lazy_import('matplotlib.pyplot')
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
 import pyqtgraph as pg
-from scipy.signal import lfilter, butter
-from scipy import signal
+butter = lazy_import('scipy.signal', 'butter')
+from precision import lfilter
+signal = lazy_import('scipy.signal')
+from lazy_recording import open_recording
 
 
 class MainWindow(QMainWindow):
@@ -25,7 +27,7 @@ class MainWindow(QMainWindow):
         values (list): Lista de valores iniciales para configurar el análisis."""
         super().__init__()
         # Carga la interfaz gráfica desde el archivo .ui
-        loadUi('Autocorrelation.ui', self)
+        load_ui('Autocorrelation.ui', self)
 
         # Crea y configura el widget central y su layout
         central_widget = QWidget()
@@ -129,8 +131,8 @@ class MainWindow(QMainWindow):
         # Inicializa la ruta del archivo y carga los datos
         self.ruta_archivo = archivo
         self.carpeta_datos = os.path.dirname(self.ruta_archivo)  # Extrae la carpeta del archivo de datos
-        self.data = pd.read_csv(self.ruta_archivo)  # Lee los datos del archivo CSV
-        self.data_copy = pd.read_csv(self.ruta_archivo)  # Crea una copia de los datos
+        self.data = open_recording(self.ruta_archivo)  # Abre el archivo; cada columna se lee al usarla
+        self.data_copy = self.data.copy()  # Copia de los datos; guarda sólo las columnas reemplazadas
         self.time = self.data['TIME'].to_numpy()  # Extrae el tiempo de los datos
         
         self.num_dominant = 1
@@ -6,20 +6,20 @@ import pandas as pd
 import numpy as np
 from PyQt6 import QtCore
 from PyQt6.QtCore import Qt
-from PyQt6.uic import loadUi
-from matplotlib import pyplot as plt
+from startup import lazy_import, load_ui
+plt = lazy_import('matplotlib.pyplot')
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
 import pyqtgraph as pg
-from scipy.signal import lfilter, butter, convolve2d
-from scipy import signal
-import pywt
-from joblib import Parallel, delayed
-from matplotlib.colors import Normalize
-from matplotlib.cm import get_cmap
-from mpl_toolkits.axes_grid1.inset_locator import inset_axes
-from joblib import Parallel, delayed
-from scipy.ndimage import uniform_filter, gaussian_filter
-from mpl_toolkits.axes_grid1.inset_locator import inset_axes
+butter, convolve2d = lazy_import('scipy.signal', 'butter', 'convolve2d')
+from precision import lfilter, real_dtype
+signal = lazy_import('scipy.signal')
+pywt = lazy_import('pywt')
+Parallel, delayed = lazy_import('joblib', 'Parallel', 'delayed')
+Normalize = lazy_import('matplotlib.colors', 'Normalize')
+get_cmap = lazy_import('matplotlib.cm', 'get_cmap')
+inset_axes = lazy_import('mpl_toolkits.axes_grid1.inset_locator', 'inset_axes')
+uniform_filter, gaussian_filter = lazy_import('scipy.ndimage', 'uniform_filter', 'gaussian_filter')
+from lazy_recording import open_recording
 
 class MainWindow(QMainWindow):
     def __init__(self, archivo, channel_colors, stim_colors, values):
@@ -32,7 +32,7 @@ class MainWindow(QMainWindow):
         values (list): Lista de valores iniciales para configurar el análisis."""
         super().__init__()
         # Carga la interfaz gráfica desde el archivo .ui
-        loadUi('Wavelet_coherence.ui', self)
+        load_ui('Wavelet_coherence.ui', self)
 
         # Crea y configura el widget central y su layout
         central_widget = QWidget()
@@ -125,8 +125,8 @@ class MainWindow(QMainWindow):
         # Inicializa la ruta del archivo y carga los datos
         self.ruta_archivo = archivo
         self.carpeta_datos = os.path.dirname(self.ruta_archivo)  # Extrae la carpeta del archivo de datos
-        self.data = pd.read_csv(self.ruta_archivo)  # Lee los datos del archivo CSV
-        self.data_copy = pd.read_csv(self.ruta_archivo)  # Crea una copia de los datos
+        self.data = open_recording(self.ruta_archivo)  # Abre el archivo; cada columna se lee al usarla
+        self.data_copy = self.data.copy()  # Copia de los datos; guarda sólo las columnas reemplazadas
         self.time = self.data['TIME'].to_numpy()  # Extrae el tiempo de los datos
 
         # Inicializa variables de estado para el análisis
@@ -668,7 +668,7 @@ class MainWindow(QMainWindow):
         frequencies = pywt.scale2frequency(mother, scales) / dt
 
         coef12 = (coef1 * np.conj(coef2))
-        scaleMatrix = np.ones([1, N]) * scales[:, None]
+        scaleMatrix = (np.ones([1, N]) * scales[:, None]).astype(real_dtype())  # En la precisión de los coeficientes
         
         def smoothwavelet(wave, dt, dj, scale):
             """
@@ -697,7 +697,7 @@ class MainWindow(QMainWindow):
             k2 = k**2
             snorm = scale / dt
             for ii in range(wave.shape[0]):
-                F = np.exp(-0.5 * (snorm[ii]**2) * k2)  # Suavizado en el dominio del tiempo
+                F = np.exp(-0.5 * (snorm[ii]**2) * k2).astype(wave.real.dtype)  # Suavizado en el dominio del tiempo
                 smooth = np.fft.ifft(F * np.fft.fft(wave[ii, :], npad))
                 twave[ii, :] = smooth[:n]
 
@@ -712,7 +712,7 @@ class MainWindow(QMainWindow):
             part3 = np.array([[np.mod(dj0steps, 1)]])
 
             # Concatenar las partes del kernel
-            kernel = np.vstack((part1, part2, part3))
+            kernel = np.vstack((part1, part2, part3)).astype(twave.real.dtype)
 
             # Normalizar el kernel
             kernel /= (2 * round(dj0steps) - 1 + 2 * np.mod(dj0steps, 1))
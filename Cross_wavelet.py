@@ -6,18 +6,19 @@ import pandas as pd
 import numpy as np
 from PyQt6 import QtCore
 from PyQt6.QtCore import Qt
-from PyQt6.uic import loadUi
-from matplotlib import pyplot as plt
+from startup import lazy_import, load_ui
+plt = lazy_import('matplotlib.pyplot')
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
 import pyqtgraph as pg
-from scipy.signal import lfilter, butter
-from scipy import signal
-import pywt
-from joblib import Parallel, delayed
-from matplotlib.colors import Normalize
-from matplotlib.cm import get_cmap
-from mpl_toolkits.axes_grid1.inset_locator import inset_axes
-from joblib import Parallel, delayed
+butter = lazy_import('scipy.signal', 'butter')
+from precision import lfilter
+signal = lazy_import('scipy.signal')
+pywt = lazy_import('pywt')
+Parallel, delayed = lazy_import('joblib', 'Parallel', 'delayed')
+Normalize = lazy_import('matplotlib.colors', 'Normalize')
+get_cmap = lazy_import('matplotlib.cm', 'get_cmap')
+inset_axes = lazy_import('mpl_toolkits.axes_grid1.inset_locator', 'inset_axes')
+from lazy_recording import open_recording
 
 class MainWindow(QMainWindow):
     def __init__(self, archivo, channel_colors, stim_colors, values):
@@ -30,7 +31,7 @@ class MainWindow(QMainWindow):
         values (list): Lista de valores iniciales para configurar el análisis."""
         super().__init__()
         # Carga la interfaz gráfica desde el archivo .ui
-        loadUi('Cross_wavelet.ui', self)
+        load_ui('Cross_wavelet.ui', self)
 
         # Crea y configura el widget central y su layout
         central_widget = QWidget()
@@ -123,8 +124,8 @@ class MainWindow(QMainWindow):
         # Inicializa la ruta del archivo y carga los datos
         self.ruta_archivo = archivo
         self.carpeta_datos = os.path.dirname(self.ruta_archivo)  # Extrae la carpeta del archivo de datos
-        self.data = pd.read_csv(self.ruta_archivo)  # Lee los datos del archivo CSV
-        self.data_copy = pd.read_csv(self.ruta_archivo)  # Crea una copia de los datos
+        self.data = open_recording(self.ruta_archivo)  # Abre el archivo; cada columna se lee al usarla
+        self.data_copy = self.data.copy()  # Copia de los datos; guarda sólo las columnas reemplazadas
         self.time = self.data['TIME'].to_numpy()  # Extrae el tiempo de los datos
 
         # Inicializa variables de estado para el análisis
@@ -2,18 +2,19 @@ import os
 import sys
 from datetime import datetime
 from PyQt6.QtCore import Qt, QPoint
-from PyQt6.uic import loadUi
+from startup import lazy_import, load_ui
 import pandas as pd
 import numpy as np
-from matplotlib import pyplot as plt
-from scipy.signal import savgol_filter, butter
+plt = lazy_import('matplotlib.pyplot')
+savgol_filter, butter = lazy_import('scipy.signal', 'savgol_filter', 'butter')
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
 import pyqtgraph as pg
 from PyQt6 import QtCore
-from scipy.signal import lfilter
+from precision import lfilter
 import csv
 import math
-from scipy.stats import rayleigh
+rayleigh = lazy_import('scipy.stats', 'rayleigh')
+from lazy_recording import open_recording
 
 
 class MainWindow(QMainWindow):
@@ -22,7 +23,7 @@ class MainWindow(QMainWindow):
         super().__init__()
 
         # Cargar la interfaz gráfica desde el archivo .ui
-        loadUi('DURACION_CICLO_Y_FASES_GUI_con_HP_e_Hyst_desc.ui', self)
+        load_ui('DURACION_CICLO_Y_FASES_GUI_con_HP_e_Hyst_desc.ui', self)
 
         # Configurar el widget central y el diseño principal de la ventana
         central_widget = QWidget()
@@ -129,8 +130,8 @@ class MainWindow(QMainWindow):
         # Inicializar parámetros de archivo y datos
         self.ruta_archivo = archivo
         self.carpeta_datos = os.path.dirname(self.ruta_archivo)
-        self.data = pd.read_csv(self.ruta_archivo)  # Leer datos del archivo CSV
-        self.data_copy = pd.read_csv(self.ruta_archivo)  # Copia de los datos para uso futuro
+        self.data = open_recording(self.ruta_archivo)  # Abre el archivo; cada columna se lee al usarla
+        self.data_copy = self.data.copy()  # Copia de los datos; guarda sólo las columnas reemplazadas
 
         # Configurar requisitos de filtro estándar
         self.fs = 3300  # Frecuencia de muestreo
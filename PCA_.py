@@ -6,14 +6,16 @@ import pandas as pd
 import numpy as np
 from PyQt6 import QtCore
 from PyQt6.QtCore import Qt
-from PyQt6.uic import loadUi
-from matplotlib import pyplot as plt
+from startup import lazy_import, load_ui
+plt = lazy_import('matplotlib.pyplot')
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QMessageBox, QInputDialog, QFileDialog
 import pyqtgraph as pg
-from scipy.signal import lfilter, butter
-from sklearn.preprocessing import StandardScaler
-import seaborn as sns
-from sklearn.decomposition import PCA
+butter = lazy_import('scipy.signal', 'butter')
+from precision import lfilter
+StandardScaler = lazy_import('sklearn.preprocessing', 'StandardScaler')
+sns = lazy_import('seaborn')
+PCA = lazy_import('sklearn.decomposition', 'PCA')
+from post_processing import load_table
 
 
 class MainWindow(QMainWindow):
@@ -25,7 +27,7 @@ class MainWindow(QMainWindow):
 """
         super().__init__()
         # Carga la interfaz gráfica desde el archivo .ui
-        loadUi('PCA_.ui', self)
+        load_ui('PCA_.ui', self)
 
         # Crea y configura el widget central y su layout
         central_widget = QWidget()
@@ -52,8 +54,9 @@ class MainWindow(QMainWindow):
         
         self.save_function_flag = False
         
-        # Lee el archivo CSV en un DataFrame de pandas
-        df = pd.read_csv(self.ruta_archivo)
+        # Lee el archivo CSV en un DataFrame de pandas (una sola vez; los cambios de columna lo reutilizan)
+        self.data = load_table(self.ruta_archivo)
+        df = self.data
         
         # Obtener el head (encabezados y 5 primeras filas)
         df_head = df.head()
@@ -139,7 +142,7 @@ class MainWindow(QMainWindow):
         self.selected_column = self.column_combobox.currentText()        
         
         # Obtener los valores de la nueva columna seleccionada del DataFrame original
-        df = pd.read_csv(self.ruta_archivo)  # Vuelve a leer el CSV para obtener los datos actualizados
+        df = self.data  # Tabla cargada al abrir el archivo
         
         if self.selected_column in df.columns:
             # Actualizar los valores de la columna seleccionada
@@ -190,7 +193,8 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'ruta_archivo'):
             try:
                 # Lee el archivo CSV en un DataFrame de pandas
-                df = pd.read_csv(self.ruta_archivo)
+                self.data = load_table(self.ruta_archivo)
+                df = self.data
                 
                 # Obtener el head (encabezados y 5 primeras filas)
                 df_head = df.head()
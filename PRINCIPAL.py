@@ -2,34 +2,59 @@ import os
 import sys
 import time
 from PyQt6 import QtCore
-from PyQt6.QtWidgets import QMainWindow, QApplication, QWidget, QVBoxLayout, QMessageBox, QInputDialog, QFileDialog
-from PyQt6.QtCore import QObject, QThread, pyqtSignal, QSemaphore, QTime, QTimer, QMutex
-from PyQt6.uic import loadUi
+from PyQt6.QtWidgets import QMainWindow, QApplication, QWidget, QVBoxLayout, QMessageBox, QInputDialog, QFileDialog, QProgressDialog, QPlainTextEdit, QPushButton
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, QTime, QTimer
+from PyQt6.QtGui import QShortcut, QKeySequence, QFont
+from startup import load_ui
 import pyqtgraph as pg
-import nidaqmx
 import numpy as np
 import logging
-import csv
-import pandas as pd
-import subprocess
-import matplotlib
-matplotlib.use('Qt5Agg')
+import threading
+from collections import deque
+import daq_backend
+from ring_buffer import RingBuffer, EVENT_LABELS
+from block_size import BlockSizeController
+from cross_detector import CrossDetector
+from decimation import MinMaxDecimator
+import recorder
+import post_processing
+import snapshot
+import latency
+import telemetry
+from acquisition_config import AcquisitionConfig, CHANNEL_COLORS
+from stimulation import PulseEngine, build_stim_table
+from envelope import StreamingEnvelope
+from acquisition_process import AcquisitionProcess
+from analysis_pool import AnalysisPool
 
 
 class SaveThread(QObject):
     finished = pyqtSignal()  # Señal para indicar que la ejecución del código ha terminado
 
-    def __init__(self):
+    def __init__(self, ring, channel_labels):
         super().__init__()
+        self.ring = ring # Buffer circular de la adquisición
+        self.reader = ring.reader() # Cursor propio sobre el buffer; el guardado lee a su ritmo
         self.stopped = False # Flag para indicar si el hilo se ha detenido
         self.counter = 1 # Contador para numerar los archivos guardados
         self.folder_name = "" # Nombre de la carpeta seleccionada
         self.base_name = "" # Nombre base del archivo
         self.filename = "" # Nombre del archivo completo
         self.csv_file_path = "" # Ruta del archivo CSV
-        self.saved_files = [] # Lista de archivos guardados
-        self.column_labels = ['CH 1', 'CH 2', 'CH 3', 'CH 4', 'CH 5', 'CH 6', 'CH 7', 'CH 8', 'CH 9',
-                              'CH 10', 'CH 11', 'CH 12', 'TAG OUT', 'UP', 'DOWN', 'STIM 1', 'STIM 2', 'STIM 3']
+        self.saved_files = [] # Lista de archivos guardados (binarios, se convierten a CSV al detener)
+        self.recorder = None # Motor de grabación binaria del archivo actual
+        self.record_dtype = 'float32' # Tipo de dato de la grabación ('float32' o 'int16')
+        self.flush_interval = 1.0 # Segundos entre escrituras a disco del hilo escritor
+        # Una columna por canal configurado seguida de los carriles de eventos
+        self.column_labels = list(channel_labels) + EVENT_LABELS
+        # Hilo que pasa periódicamente lo nuevo del buffer circular a la cola de grabación; convertir y
+        # encolar los bloques (y esperar si la cola está llena) no ocurre en el hilo de la interfaz
+        self.poll_thread = None
+        self.poll_stop = threading.Event()
+        self.poll_interval = 200 # Periodo de guardado [ms]
+        # Segundos que el guardado se queda detrás de la adquisición: Thread_index escribe las marcas STIM
+        # después de que ThreadA publica el bloque, y una marca detrás del cursor ya no se guardaría
+        self.mark_guard = 0.25
         self.select_folder_and_base_file() # Método para seleccionar la carpeta y archivo base
 
     def select_folder_and_base_file(self):
@@ -52,12 +77,51 @@ class SaveThread(QObject):
 
     def generate_filename(self):
         """Genera un nuevo nombre de archivo basado en el contador."""
-        self.filename = os.path.join(self.folder_name, f"{self.base_name}_{self.counter}.csv")
+        self.filename = os.path.join(self.folder_name, f"{self.base_name}_{self.counter}.bin")
         self.counter += 1
         self.saved_files.append(os.path.basename(self.filename)) # Agrega el archivo generado a la lista
 
+    def start_saving(self):
+        """Empieza a guardar a partir de la posición actual del escritor en el buffer circular."""
+        if self.folder_name and self.filename:
+            # Abre la grabación binaria; el hilo escritor se encarga de los accesos a disco
+            self.recorder = recorder.BinaryRecorder(self.filename, self.column_labels, thread_a.sample_rate,
+                                                    EVENT_LABELS, dtype=self.record_dtype,
+                                                    flush_interval=self.flush_interval)
+            self.recorder.open()
+            # Las latencias del lazo cerrado se cuentan por grabación
+            latency.monitor.reset()
+        self.reader.seek_to_end()
+        self.poll_stop.clear()
+        self.poll_thread = threading.Thread(target=self.poll_loop, name='Guardado', daemon=True)
+        self.poll_thread.start()
+
+    def poll_loop(self):
+        """Hilo de guardado: lee el buffer circular cada `poll_interval` ms y, al detenerse, lo pendiente."""
+        while not self.poll_stop.wait(self.poll_interval / 1000):
+            self.save_data()
+            telemetry.monitor.report_cpu('guardado')
+        self.save_data(final=True)
+
+    def stop_saving(self):
+        """Guarda lo pendiente en el buffer circular y deja de guardar."""
+        if self.poll_thread is not None:
+            self.poll_stop.set()
+            self.poll_thread.join()
+            self.poll_thread = None
+        if self.recorder is not None:
+            self.recorder.close()
+            # Resumen de latencias de la grabación junto al archivo binario
+            latency.monitor.export_json(os.path.splitext(self.filename)[0] + '_latency.json',
+                                        recording=os.path.basename(self.filename),
+                                        sample_rate=thread_a.sample_rate,
+                                        delay_time=thread_pulse.delay_time)
+            self.recorder = None
+
     def stop(self):
         """Detiene el hilo y realiza el procesamiento posterior."""
+        if self.poll_thread is not None:
+            self.stop_saving()
         self.stopped = True
         thread_a.terminate()
         self.perform_post_processing()
@@ -65,59 +129,22 @@ class SaveThread(QObject):
     def perform_post_processing(self):
         """Realiza el procesamiento posterior a los archivos guardados."""
 
-        # Itera sobre cada archivo guardado en la lista `saved_files`
-        for saved_file in self.saved_files:
-            # Construye la ruta completa del archivo
-            file_path = os.path.join(self.folder_name, saved_file)
-
-            # Lee el archivo CSV en un DataFrame de pandas
-            df = pd.read_csv(file_path)
-
-            # Inserta la columna de tiempo
-            # `thread_a.sample_time` se asume que es el incremento de tiempo entre muestras
-            increment = thread_a.sample_time
-            df.insert(0, 'TIME', [0] + [increment * i for i in range(1, len(df))])
-
-            # Calcula los ciclos activos e inactivos
-            # Un ciclo activo ocurre entre 'DOWN' y 'UP', y un ciclo inactivo entre 'UP' y 'DOWN'
-            df['ACTIVE CYCLE'] = df.apply(lambda row: self.calculate_cycle_duration(row, df, 'DOWN', 'UP'), axis=1)
-            df['INACTIVE CYCLE'] = df.apply(lambda row: self.calculate_cycle_duration(row, df, 'UP', 'DOWN'), axis=1)
-
-            # Calcula el tiempo de ciclo y la frecuencia
-            # Encuentra los índices donde 'UP' es 1 (indica el inicio de un ciclo)
-            up_indices = df[df['UP'] == 1].index
-
-            # Calcula la diferencia de tiempo entre inicios consecutivos de ciclos
-            delta_cycle = [df.at[up_indices[i + 1], 'TIME'] - df.at[up_indices[i], 'TIME'] if i < len(up_indices) - 1 else None for i in range(len(up_indices))]
-
-            # Calcula la diferencia de tiempo entre inicios consecutivos de ciclos
-            df['CYCLE TIME'] = pd.Series(delta_cycle, index=up_indices)
-
-            # Calcula la frecuencia como el inverso del tiempo promedio de ciclo
-            frequency_value = 1 / df['CYCLE TIME'].mean()
-
-            # Inserta la frecuencia en la primera fila de la columna 'FREQUENCY'
-            df.at[0, 'FREQUENCY'] = frequency_value
-
-            # Llena las demás filas de la columna 'FREQUENCY' con None
-            df['FREQUENCY'] = df['FREQUENCY'].where(df.index == 0, None)
+        # Rutas completas de los archivos binarios guardados en la sesión
+        file_paths = [os.path.join(self.folder_name, saved_file) for saved_file in self.saved_files]
 
-            # Guarda el archivo CSV con los datos procesados
-            df.to_csv(file_path, index=False)
+        # Convierte cada grabación a CSV agregando TIME, ciclos activos/inactivos, tiempo de ciclo y frecuencia
+        # en un pool de procesos, sin bloquear la interfaz.
+        # `thread_a.sample_time` se asume que es el incremento de tiempo entre muestras
+        self.post_thread = PostProcessingThread(file_paths, thread_a.sample_time)
+        window.show_post_processing_progress(self.post_thread)
+        self.post_thread.start()
 
-            # Imprime un mensaje indicando que los datos han sido insertados en el archivo procesado
-            print("DATOS INSERTADOS", saved_file)
+    def save_data(self, final=False):
+        """Envía a la grabación binaria los bloques publicados en el buffer circular desde la última lectura.
 
-    def calculate_cycle_duration(self, row, df, start_label, end_label):
-        """Calcula la duración del ciclo entre dos eventos."""
-        if row[start_label] == 1:
-            index_start = row.name
-            index_end = df.loc[:index_start, end_label][::-1].idxmax()
-            return row['TIME'] - df.at[index_end, 'TIME']
-        return None
-
-    def save_data(self, data, cross_up, cross_down, stim_1, stim_2, stim_3):
-        """Guarda los datos en un archivo CSV."""
+        Corre en el hilo de guardado (`poll_loop`), nunca en el de la interfaz. Normalmente se queda
+        `mark_guard` segundos detrás de la adquisición; al terminar (`final`) espera a que el planificador
+        procese los cruces ya publicados y guarda hasta el final de lo publicado."""
         try:
             # Verifica si se ha seleccionado una carpeta
             if not self.folder_name:
@@ -125,23 +152,24 @@ class SaveThread(QObject):
                 return
 
             # Si el hilo no ha sido detenido y hay un nombre de archivo disponible
-            if not self.stopped and self.filename:
-                # Abre el archivo en modo de añadir ('a')
-                with open(self.filename, 'a', newline='') as csvfile:
-                    writer = csv.writer(csvfile)
-
-                    # Si el archivo está vacío, escribe la fila de etiquetas de columna
-                    if csvfile.tell() == 0:
-                        writer.writerow(self.column_labels)
-
-                    # Transpone los datos y los combina en una sola lista
-                    transposed_data = list(map(list, zip(*data, cross_up, cross_down, stim_1, stim_2, stim_3)))
+            if not self.stopped and self.recorder is not None:
+                # Segmentos (inicio, muestras) publicados por la adquisición desde la última lectura
+                if final:
+                    end = self.ring.write_count
+                    thread_index.wait_idle()
+                    hold_back = self.ring.write_count - end
+                else:
+                    hold_back = round(self.mark_guard * thread_a.sample_rate)
+                segments = self.reader.poll(hold_back)
+                if not segments:
+                    return
 
-                    # Escribe las filas de datos en el archivo CSV
-                    writer.writerows(transposed_data)
+                for start, n in segments:
+                    # Vistas del bloque y de sus carriles de eventos; la grabación las convierte al encolarlas
+                    self.recorder.push(self.ring.view(start, n), self.ring.events[:, start:start + n])
 
-                    # Emite una señal indicando que se ha terminado de guardar los datos
-                    self.finished.emit()
+                # Emite una señal indicando que se ha terminado de guardar los datos
+                self.finished.emit()
 
             # Si el hilo ha sido detenido, emite la señal de terminado
             if self.stopped:
@@ -151,16 +179,38 @@ class SaveThread(QObject):
             # Registra cualquier error que ocurra durante la ejecución del guardado de datos
             logging.error(f'Error en el hilo SaveData: {e}')
 
+class PostProcessingThread(QThread):
+    """Hilo que reparte el procesamiento posterior de los archivos guardados en un pool de procesos."""
+    progress = pyqtSignal(int, int, str)  # Archivos terminados, total y nombre del último archivo
+    finished_all = pyqtSignal(bool)  # True si el procesamiento se canceló
+
+    def __init__(self, file_paths, sample_time):
+        super().__init__()
+        self.file_paths = file_paths
+        self.sample_time = sample_time
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancela los archivos que aún no empiezan a procesarse."""
+        self.cancelled = True
+
+    def run(self):
+        post_processing.process_files(self.file_paths, self.sample_time,
+                                      progress=lambda done, total, path: self.progress.emit(done, total, os.path.basename(path)),
+                                      is_cancelled=lambda: self.cancelled)
+        self.finished_all.emit(self.cancelled)
+
 # Inicializa la interfaz
 class VentanaPrincipal(QMainWindow):
 
-    def __init__(self, number_of_samples, samp_per_iteration, tmax, tiempo, sample_rate):
+    def __init__(self, number_of_samples, samp_per_iteration, tmax, tiempo, sample_rate, backend, config):
         super().__init__()
 
         # Carga la interfaz de usuario desde el archivo .ui
-        loadUi('PRINCIPAL_GUI_CON_TH_BAJADA.ui', self)
+        load_ui('PRINCIPAL_GUI_CON_TH_BAJADA.ui', self)
 
         # Llama a la función para detectar dispositivos NIDAQ y obtener el nombre del dispositivo
+        self.backend = backend # Backend de adquisición (tarjeta NI o dispositivo simulado)
         self.dev_name = None
         self.detect_nidaq_devices()
 
@@ -195,11 +245,25 @@ class VentanaPrincipal(QMainWindow):
         # Conecta el control de delay a su función de actualización
         self.SB_Delay.valueChanged.connect(self.update_delay)
 
+        # Número de canales de la configuración de adquisición
+        self.n_channels = config.n_channels
+        self.snapshot_seconds = config.snapshot_seconds # Segundos que congela una instantánea (Ctrl+Shift+S)
+
+        # La frecuencia y la ventana iniciales vienen de la configuración; se fijan sin disparar sus funciones
+        self.SB_sample_rate.blockSignals(True)
+        self.SB_sample_rate.setMaximum(max(self.SB_sample_rate.maximum(), sample_rate))
+        self.SB_sample_rate.setValue(sample_rate)
+        self.SB_sample_rate.blockSignals(False)
+        self.SB_X_axis.blockSignals(True)
+        self.SB_X_axis.setValue(int(tmax))
+        self.SB_X_axis.blockSignals(False)
+
         # Opciones del menú desplegable de canales
-        options = ["Channel 1", "Channel 2", "Channel 3", "Channel 4", "Channel 5", "Channel 6",
-                   "Channel 7", "Channel 8", "Channel 9", "Channel 10", "Channel 11", "Channel 12", "Channel 13"]
+        options = [f"Channel {i + 1}" for i in range(self.n_channels)]
 
-        self.channel_colors = ['#23BAC4', '#DAA520', '#E69DFB','#F08080','#FF0000' , '#00FF00','#7FFFD4' ,'#FF9900' ,'#DA70D6', '#E7D40A', '#F08080', '#FF689D', '#FFFFFF']
+        # Colores de las curvas en vivo (uno por canal) y de los 13 canales que esperan los análisis
+        self.display_colors = config.channel_colors
+        self.channel_colors = list(CHANNEL_COLORS)
         self.stim_color_1 = '#FF9900'
         self.stim_color_2 = '#E7D40A'
         self.stim_color_3 = '#F08080'
@@ -214,24 +278,20 @@ class VentanaPrincipal(QMainWindow):
         self.Amount.currentIndexChanged.connect(self.clear_lines_and_indices)
 
         # Configura el gráfico principal y lo agrega al diseño
-        self.main_graph = CanvasGraph(self.channel_colors, self.stim_color_1, self.stim_color_2, self.stim_color_3,
+        self.main_graph = CanvasGraph(self.display_colors, self.stim_color_1, self.stim_color_2, self.stim_color_3,
                                       self.threshold_color, self.line_up_color, self.line_down_color, number_of_samples,
                                       samp_per_iteration, tmax, tiempo, sample_rate)
         self.Graph_layout.addWidget(self.main_graph)
 
-        # Conecta los controles de offset a sus funciones de actualización en el gráfico principal
-        self.offset_1.valueChanged.connect(self.main_graph.update_offset_1)
-        self.offset_2.valueChanged.connect(self.main_graph.update_offset_2)
-        self.offset_3.valueChanged.connect(self.main_graph.update_offset_3)
-        self.offset_4.valueChanged.connect(self.main_graph.update_offset_4)
-        self.offset_5.valueChanged.connect(self.main_graph.update_offset_5)
-        self.offset_6.valueChanged.connect(self.main_graph.update_offset_6)
-        self.offset_7.valueChanged.connect(self.main_graph.update_offset_7)
-        self.offset_8.valueChanged.connect(self.main_graph.update_offset_8)
-        self.offset_9.valueChanged.connect(self.main_graph.update_offset_9)
-        self.offset_10.valueChanged.connect(self.main_graph.update_offset_10)
-        self.offset_11.valueChanged.connect(self.main_graph.update_offset_11)
-        self.offset_12.valueChanged.connect(self.main_graph.update_offset_12)
+        # Conecta los controles de offset de la interfaz (uno por canal, hasta los que existan en el .ui)
+        i = 1
+        while hasattr(self, f'offset_{i}'):
+            spin_box = getattr(self, f'offset_{i}')
+            if i <= self.n_channels:
+                spin_box.valueChanged.connect(lambda value, index=i - 1: self.main_graph.update_offset(index, value))
+            else:
+                spin_box.setVisible(False)
+            i += 1
 
         # Configura el botón de análisis y su conexión ----------------------------------------------------------
         self.bt_go.clicked.connect(self.abrir_dialogo_archivo)
@@ -265,11 +325,17 @@ class VentanaPrincipal(QMainWindow):
             radio_button.clicked.connect(lambda _, value=i: self.update_crosses_count_max(value))
 
         # Configura y alterna los botones de los canales para la visibilidad de las señales.
+        # Los canales sin botón en la interfaz se muestran siempre; los botones sin canal se ocultan
         i = 0
-        while i < 13:
-            button = getattr(self, f'ENG_{i + 1}')
-            button.clicked.connect(lambda _, index=i: self.toggle_channel_visibility(index))
-            self.set_channel_visibility(i, False)
+        while i < self.n_channels or hasattr(self, f'ENG_{i + 1}'):
+            button = getattr(self, f'ENG_{i + 1}', None)
+            if button is None:
+                self.set_channel_visibility(i, True)
+            elif i < self.n_channels:
+                button.clicked.connect(lambda _, index=i: self.toggle_channel_visibility(index))
+                self.set_channel_visibility(i, False)
+            else:
+                button.setVisible(False)
             i += 1
 
         # Inicializa las variables de estimulación y sus botones de conexión
@@ -305,6 +371,46 @@ class VentanaPrincipal(QMainWindow):
         self.timer.timeout.connect(self.update_time)
         self.time_inic = None
 
+        # Panel de latencias del lazo cerrado (Ctrl+L)
+        self.latency_panel = LatencyPanel()
+        self.latency_shortcut = QShortcut(QKeySequence("Ctrl+L"), self)
+        self.latency_shortcut.activated.connect(self.latency_panel.show)
+
+        # Envolvente en vivo: Ctrl+E la muestra en la gráfica, Ctrl+D detecta los cruces sobre ella
+        self.envelope_shortcut = QShortcut(QKeySequence("Ctrl+E"), self)
+        self.envelope_shortcut.activated.connect(lambda: self.main_graph.set_show_envelope(not self.main_graph.show_envelope))
+        self.detect_on_envelope = False
+        self.envelope_detect_shortcut = QShortcut(QKeySequence("Ctrl+D"), self)
+        self.envelope_detect_shortcut.activated.connect(self.toggle_detect_on_envelope)
+
+        # Instantánea de los últimos segundos del buffer circular para los análisis seleccionados
+        self.snapshot_shortcut = QShortcut(QKeySequence("Ctrl+Shift+S"), self)
+        self.snapshot_shortcut.activated.connect(self.analyze_snapshot)
+
+        # Estado de los análisis enviados al pool (decodificando, en cola, abierta, error) en la barra de estado
+        self.analysis_status_timer = QTimer()
+        self.analysis_status_timer.timeout.connect(lambda: self.statusBar().showMessage(analysis_pool.summary()))
+        self.analysis_status_timer.start(500)
+
+
+    def analyze_snapshot(self):
+        """Congela los últimos segundos de la adquisición y abre con ellos los análisis seleccionados.
+
+        Los análisis reciben la instantánea binaria en lugar de un CSV, sin detener el guardado."""
+        try:
+            archivo = snapshot.take_snapshot(thread_a.ring, self.snapshot_seconds, thread_a.sample_rate,
+                                             save_thread.column_labels)
+        except (ValueError, RuntimeError) as e:
+            print(f"No se pudo tomar la instantánea: {e}")
+            return
+        print(f"Instantánea de la adquisición: {archivo}")
+        self.ruta_archivo = archivo
+        self.execute_selected_analyses()
+
+    def toggle_detect_on_envelope(self):
+        self.detect_on_envelope = not self.detect_on_envelope
+        thread_a.update_detect_on_envelope(self.detect_on_envelope)
+        print(f"Detección sobre la envolvente: {self.detect_on_envelope}")
 
     def stim_active(self):
         """
@@ -333,6 +439,29 @@ class VentanaPrincipal(QMainWindow):
         # Detiene el temporizador
         save_thread.stop()
 
+    def show_post_processing_progress(self, post_thread):
+        """Muestra el avance del procesamiento posterior en un diálogo no modal que permite cancelarlo."""
+        self.post_progress = QProgressDialog("Procesando archivos guardados...", "Cancelar", 0,
+                                             len(post_thread.file_paths), self)
+        self.post_progress.setWindowModality(QtCore.Qt.WindowModality.NonModal)
+        self.post_progress.setMinimumDuration(0)
+        self.post_progress.canceled.connect(post_thread.cancel)
+        post_thread.progress.connect(self.update_post_processing_progress)
+        post_thread.finished_all.connect(self.post_processing_finished)
+
+    def update_post_processing_progress(self, done, total, file_name):
+        """Actualiza el diálogo de avance cuando termina un archivo."""
+        self.post_progress.setValue(done)
+        self.post_progress.setLabelText(f"Procesando archivos guardados... {done}/{total}")
+        # Imprime un mensaje indicando que los datos han sido insertados en el archivo procesado
+        print("DATOS INSERTADOS", file_name)
+
+    def post_processing_finished(self, cancelled):
+        """Cierra el diálogo de avance al terminar o cancelar el procesamiento posterior."""
+        self.post_progress.close()
+        if cancelled:
+            print("Procesamiento posterior cancelado.")
+
     def save_data(self):
         """Inicia o detiene el proceso de guardado de datos basado en el estado de `self.saving`."""
         # Si no se está guardando actualmente, inicia el proceso de guardado
@@ -343,8 +472,8 @@ class VentanaPrincipal(QMainWindow):
             thread_a.save_data_update(True)
             # Actualiza el hilo thread_index para comenzar a guardar datos
             thread_index.save_data_update(True)
-            # Conecta la señal save_data del hilo thread_a a la función save_data del hilo save_thread
-            thread_a.save_data.connect(save_thread.save_data)
+            # El hilo save_thread empieza a leer el buffer circular de la adquisición a su propio ritmo
+            save_thread.start_saving()
             # Cambia el texto del botón bt_save a "Stop saving"
             self.bt_save.setText("Stop saving")
             # Inicia el temporizador para actualizar el tiempo cada segundo
@@ -364,6 +493,9 @@ class VentanaPrincipal(QMainWindow):
             # Actualiza el hilo thread_a para detener el guardado de datos
             thread_a.save_data_update(False)
 
+            # Guarda lo pendiente en el buffer circular y detiene el guardado
+            save_thread.stop_saving()
+
             # Actualiza el hilo thread_index para detener el guardado de datos
             thread_index.save_data_update(False)
 
@@ -391,10 +523,8 @@ class VentanaPrincipal(QMainWindow):
         Actualiza los atributos dev_name y dev_model con el dispositivo seleccionado."""
 
         try:
-            # Obtiene el sistema NIDAQmx local
-            system = nidaqmx.system.System.local()
-            # Obtiene la lista de dispositivos conectados al sistema
-            devices = system.devices
+            # Obtiene la lista de dispositivos (nombre, modelo) conectados al sistema a través del backend
+            devices = self.backend.list_devices()
 
             # Si no se encuentran dispositivos, muestra una advertencia y sale de la función
             if not devices:
@@ -402,7 +532,7 @@ class VentanaPrincipal(QMainWindow):
                 return
 
             # Crea una lista de nombres de dispositivos con sus tipos de producto
-            device_names = [f"{device.name} - {device.product_type}" for device in devices]
+            device_names = [f"{name} - {product_type}" for name, product_type in devices]
 
             # Muestra un cuadro de diálogo para que el usuario seleccione un dispositivo de la lista
             selected_device_name, ok = QInputDialog.getItem(self, "Seleccionar dispositivo", "Dispositivos NIDAQmx:",
@@ -417,8 +547,7 @@ class VentanaPrincipal(QMainWindow):
                 selected_device = devices[selected_device_index]
 
                 # Actualiza los atributos dev_name y dev_model con el nombre y tipo del dispositivo seleccionado
-                self.dev_name = selected_device.name
-                self.dev_model = selected_device.product_type
+                self.dev_name, self.dev_model = selected_device
 
             else:
                 # Si el usuario no selecciona ningún dispositivo, muestra una advertencia
@@ -489,10 +618,12 @@ class VentanaPrincipal(QMainWindow):
     def update_hysteresis_up(self, hysteresis):
         """Actualiza el valor de la histéresis ascendente."""
         self.hysteresis_up = hysteresis
+        thread_a.update_hysteresis_up(hysteresis)
 
     def update_hysteresis_down(self, hysteresis_d):
         """Actualiza el valor de la histéresis descendente."""
         self.hysteresis_down = hysteresis_d
+        thread_a.update_hysteresis_down(hysteresis_d)
 
     def update_lcd(self, crosses_count):
         """Actualiza el display LCD con el número de cruces detectados."""
@@ -539,7 +670,10 @@ class VentanaPrincipal(QMainWindow):
 
 
     def execute_selected_analyses(self):
-        """Ejecuta los análisis seleccionados en función de los índices seleccionados para los análisis 1 y 2."""
+        """Ejecuta los análisis seleccionados en función de los índices seleccionados para los análisis 1 y 2.
+
+        Los dos análisis se envían al pool a la vez y corren en paralelo en procesos distintos; ambos
+        comparten una sola decodificación del archivo y su avance se ve en la barra de estado."""
         # Crea una lista de valores que serán utilizados como parámetros para los análisis.
         self.values = [self.channel_index, self.threshold, self.hold_off, self.delay_time, self.hysteresis_up, self.hysteresis_down]
 
@@ -614,7 +748,7 @@ class VentanaPrincipal(QMainWindow):
             print("Ejecutando sólo analisís 1.")
 
     def rectificado_int_update(self):
-        """Abre un cuadro de diálogo para seleccionar un archivo y ejecuta un script de análisis con los parámetros proporcionados."""
+        """Abre un cuadro de diálogo para seleccionar un archivo y abre el rectificado e integrado con los parámetros proporcionados."""
 
         # Actualiza la lista de valores con parámetros actuales
         self.values = [self.channel_index, self.threshold, self.hold_off, self.delay_time, self.hysteresis_up,  self.hysteresis_down]
@@ -628,12 +762,8 @@ class VentanaPrincipal(QMainWindow):
             self.ruta_archivo = archivo
             print("Abriendo rectificado e integrado...")
 
-            # Ruta al script de análisis que se ejecutará
-            script_path_explore = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\RECT_E_INT_con_HP.py"
-
-            # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-            subprocess.run([sys.executable, script_path_explore, self.ruta_archivo, *map(str, self.channel_colors),
-                            *map(str, self.stim_colors), *map(str, self.values)])
+            # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+            analysis_pool.submit('RECT_E_INT_con_HP', self.ruta_archivo, self.channel_colors, self.stim_colors, self.values)
     
     
     def open_Read_ATF(self, values, channel_colors, stim_colors):
@@ -641,138 +771,83 @@ class VentanaPrincipal(QMainWindow):
         print("Abriendo conversión de ATF a CSV...")
         
 
-        # Ruta al script de análisis de conversión CSV que se ejecutará
-        script_path_atf = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\Read_ATF.py"
-        
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_atf, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('Read_ATF', self.ruta_archivo, channel_colors, stim_colors, values)
         
 
         
     def open_bins_analysis(self, values, channel_colors, stim_colors):
-        #Ejecuta el análisis de bins utilizando un script externo.
+        #Ejecuta el análisis de bins en el pool de análisis.
         print("Abriendo análisis de bins...")
 
-        # Ruta al script de análisis de bins que se ejecutará
-        script_path_bins = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\BINS.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_bins, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('BINS', self.ruta_archivo, channel_colors, stim_colors, values)
         
 
     def open_phase_and_cycle_duration_analysis(self, values, channel_colors, stim_colors):
-        """Ejecuta el análisis de duración de ciclo y fases utilizando un script externo."""
+        """Ejecuta el análisis de duración de ciclo y fases en el pool de análisis."""
         print("Abriendo análisis de fases circulares...")
 
-        # Ruta al script de análisis de duración de ciclo y fases que se ejecutará
-        script_path_phase = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\DURACIÓN_CICLO_Y_FASES_2.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_phase, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('DURACIÓN_CICLO_Y_FASES_2', self.ruta_archivo, channel_colors, stim_colors, values)
         
     def open_FFT(self, values, channel_colors, stim_colors):
-        #Ejecuta la Transformada rápida de Fourier utilizando un script externo.
+        #Ejecuta la Transformada rápida de Fourier en el pool de análisis.
         print("Abriendo análisis de Transformada rápida de Fourier...")
 
-        # Ruta al script de análisis de Transformada rápida de Fourier que se ejecutará
-        script_path_FFT = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\FFT.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_FFT, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('FFT', self.ruta_archivo, channel_colors, stim_colors, values)
     
     def open_Autocorrelation(self, values, channel_colors, stim_colors):
-        #Ejecuta el análisis de Autocorrelation utilizando un script externo.
+        #Ejecuta el análisis de Autocorrelation en el pool de análisis.
         print("Abriendo análisis de Autocorrelation...")
 
-        # Ruta al script de análisis de Autocorrelation que se ejecutará
-        script_path_Autocorrelation = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\Autocorrelation.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_Autocorrelation, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('Autocorrelation', self.ruta_archivo, channel_colors, stim_colors, values)
     
              
     def open_Pearson_correlation(self, values, channel_colors, stim_colors):
-        #Ejecuta la correlación de Pearson utilizando un script externo.
+        #Ejecuta la correlación de Pearson en el pool de análisis.
         print("Abriendo análisis de Pearson correlation...")
 
-        # Ruta al script de análisis de Pearson correlation que se ejecutará
-        script_path_Pearson_correlation = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\Pearson_Correlation.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_Pearson_correlation, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('Pearson_Correlation', self.ruta_archivo, channel_colors, stim_colors, values)
     
     def open_Spike_triggered_averaging(self, values, channel_colors, stim_colors):
-        #Ejecuta el análisis de STA utilizando un script externo.
+        #Ejecuta el análisis de STA en el pool de análisis.
         print("Abriendo análisis de Spike triggered averaging...")
 
-        # Ruta al script de análisis de STA que se ejecutará
-        script_path_STA = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\STA.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_STA, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('STA', self.ruta_archivo, channel_colors, stim_colors, values)
         
     def open_Cross_wavelet(self, values, channel_colors, stim_colors):
-        #Ejecuta el análisis de Cross wavelet utilizando un script externo.
+        #Ejecuta el análisis de Cross wavelet en el pool de análisis.
         print("Abriendo análisis de Cross wavelet...")
 
-        # Ruta al script de análisis de Cross wavelet que se ejecutará
-        script_path_Cross_wavelet = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\Cross_wavelet.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_Cross_wavelet, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('Cross_wavelet', self.ruta_archivo, channel_colors, stim_colors, values)
         
         
     def open_Wavelet_coherence(self, values, channel_colors, stim_colors):
-        #Ejecuta el análisis de Wavelet coherence utilizando un script externo.
+        #Ejecuta el análisis de Wavelet coherence en el pool de análisis.
         print("Abriendo análisis de Wavelet coherence...")
 
-        # Ruta al script de análisis de Cross wavelet que se ejecutará
-        script_path_Wavelet_coherence = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\Coherence_wavelet.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_Wavelet_coherence, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('Coherence_wavelet', self.ruta_archivo, channel_colors, stim_colors, values)
     
     def open_Coherent_power(self, values, channel_colors, stim_colors):
-        #Ejecuta el análisis de Coherent power utilizando un script externo.
+        #Ejecuta el análisis de Coherent power en el pool de análisis.
         print("Abriendo análisis de Coherent power...")
 
-        # Ruta al script de análisis de Cross wavelet que se ejecutará
-        script_path_Coherent_power = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\CXWT.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_Coherent_power, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('CXWT', self.ruta_archivo, channel_colors, stim_colors, values)
         
     def open_PCA(self, values, channel_colors, stim_colors):
-        #Ejecuta el PCA utilizando un script externo.
+        #Ejecuta el PCA en el pool de análisis.
         print("Abriendo PCA...")
 
-        # Ruta al script de análisis de PCA que se ejecutará
-        script_path_PCA = r"C:\Users\eduar\OneDrive\Documentos\Documentos para SS UPIITA\Entregables\GUIs_Sahian\PCA_.py"
-
-        # Ejecuta el script como un proceso independiente pasando los parámetros necesarios
-        subprocess.run(
-            [sys.executable, script_path_PCA, self.ruta_archivo, *map(str, channel_colors), *map(str, stim_colors),
-             *map(str, values)])
+        # Abre la ventana en el pool de análisis precargados, sin bloquear la interfaz
+        analysis_pool.submit('PCA_', self.ruta_archivo, channel_colors, stim_colors, values)
 
     def reset_crosses_count(self, index):
         """Reinicia el contador de cruces y actualiza la interfaz con el nuevo índice de canal."""
@@ -798,8 +873,8 @@ class VentanaPrincipal(QMainWindow):
         # Convierte el tiempo de espera de milisegundos a segundos
         self.hold_off_time = hold_off_time / 1000
 
-        # Actualiza el tiempo de espera en el hilo hold_off_thread
-        hold_off_thread.update_hold_off_time(self.hold_off_time)
+        # Actualiza el tiempo de espera en el detector de cruces del hilo thread_a
+        thread_a.update_hold_off_time(self.hold_off_time)
 
     def update_delay(self, delay_time):
         """Actualiza el tiempo de retraso para la señal de estímulo."""
@@ -893,57 +968,60 @@ class VentanaPrincipal(QMainWindow):
 class ThreadA(QThread):
     """Hilo designado para la adquisición y detección de cruces"""
     # Definición de señales que el hilo emitirá para comunicar con la interfaz u otros componentes
-    data_generated = pyqtSignal(np.ndarray, int)
     cross_x_up = pyqtSignal(int)
     cross_x_down = pyqtSignal(int)
     send_index = pyqtSignal(int, int, float, float)
-    save_data = pyqtSignal(np.ndarray, list, list, list, list, list)
 
     def __init__(self, sample_rate, tmax, dev_name, number_of_samples, samp_per_iteration,
-                 semaphore, mutex, samp_per_channel, tiempo):
+                 samp_per_channel, tiempo, backend, n_channels=13, envelope_params=None):
         super().__init__()
 
         # Inicialización de parámetros y atributos de la clase
         self.dev_name = dev_name # Nombre del dispositivo NIDAQ
+        self.backend = backend # Backend de adquisición (tarjeta NI o dispositivo simulado)
         self.sample_rate = sample_rate # Frecuencia de muestreo
         self.samp_per_channel = samp_per_channel # Número de muestras por canal
         self.tmax = tmax # Tiempo máximo de muestreo
         self.number_of_samples = number_of_samples # Número total de muestras
         self.samples_per_iteration = samp_per_iteration # Número de muestras por iteración
         self.tiempo = tiempo # Array de tiempos (eje x)
-
-        # Inicialización del array para almacenar datos, inicialmente lleno de ceros
-        self.data_array_zeros = np.zeros((13, self.number_of_samples))
-
-        # Inicialización de banderas y contadores
-        self.crossing_detected = False # Bandera para detectar cruce
-        self.crossing_hysteresis_detected = False # Bandera para detectar histéresis
-        self.primer_cruce_encontrado = False # Bandera para detectar el primer cruce
+        self.n_channels = n_channels # Canales analógicos adquiridos (ai0 a ai{n_channels - 1})
+
+        # Buffer circular preasignado donde la tarea escribe cada bloque leído (la tarjeta NI a través
+        # de un arreglo auxiliar, ver daq_backend.NIDAQTask).
+        # La gráfica y el guardado lo leen a su propio ritmo con sus propios cursores (RingReader)
+        self.ring = RingBuffer(self.n_channels, self.number_of_samples, envelope=True)
+        # Envolvente en vivo (pasa-altas -> rectificado -> integrador) de todos los canales, bloque a bloque
+        self.envelope = StreamingEnvelope(self.n_channels, self.sample_rate, **(envelope_params or {}))
+        self.detect_on_envelope = False # True: el umbral se aplica a la envolvente del canal seleccionado
+        # Controlador que ajusta las muestras por iteración según la latencia objetivo y el backlog
+        self.block_control = BlockSizeController(self.sample_rate)
+
+        # Detector de cruces muestra a muestra; conserva umbral, histéresis y hold-off entre bloques
+        self.detector = CrossDetector()
+        self.hold_off_time = 0 # Tiempo de hold-off [s], se convierte a muestras en el detector
         self.crosses_count = 0 # Contador de cruces
 
         # Inicialización de otros parámetros
         self.data_p_index = 0 # Índice del dato
         self.delay_time = 0 # Tiempo de retardo
         self.threshold = 0 # Umbral de detección
-        self.hold_off_active = False # Bandera de hold-off
         self.current_index = 0 # Índice actual
         self.sample_time = self.tmax / self.number_of_samples # Tiempo entre muestras
         self.data_per_s = round(1 / self.sample_time) # Datos por segundo
-        self.t = np.arange(len(self.data_array_zeros[0])) # Array de tiempo
+        self.t = np.arange(self.ring.capacity) # Array de tiempo
 
         self.task = None # Inicialización de la tarea NIDAQ
-        self.semaphore = semaphore # Semáforo para sincronización de hilos
-        self.mutex = mutex # Mutex para exclusión mutua
         self.save_data_active = False # Bandera para activar/desactivar guardado de datos
 
-        # Inicialización de vectores de guardado, llenos de ceros
-        self.cross_up_save = np.zeros(self.number_of_samples)
-        self.cross_down_save = np.zeros(self.number_of_samples)
-        self.stim_1_save = np.zeros(self.number_of_samples)
-        self.stim_2_save = np.zeros(self.number_of_samples)
-        self.stim_3_save = np.zeros(self.number_of_samples)
+        # Vectores de guardado: vistas de los carriles de eventos del buffer circular
+        self.bind_event_lanes()
         self.time_end = 0
 
+    def bind_event_lanes(self):
+        """Asocia los vectores de guardado a los carriles de eventos del buffer circular actual."""
+        self.cross_up_save, self.cross_down_save, self.stim_1_save, self.stim_2_save, self.stim_3_save = self.ring.events
+
     def set_sample_rate(self, new_sample_rate):
         """Actualiza la frecuencia de muestreo y ajusta otros parámetros relacionados con la adquisición de datos."""
 
@@ -953,16 +1031,11 @@ class ThreadA(QThread):
         self.samp_per_channel = new_sample_rate
         # Calcula el número total de muestras basándose en el tiempo máximo y la nueva frecuencia de muestreo
         self.number_of_samples = int(self.tmax * self.sample_rate)
-        # Calcula el número de muestras por iteración
-        self.samples_per_iteration = int(self.number_of_samples / self.sample_rate)
-        # Re-inicializa el array de datos con ceros con las nuevas dimensiones
-        self.data_array_zeros = np.zeros((13, self.number_of_samples))
-        # Re-inicializa los vectores de guardado con ceros
-        self.cross_up_save = np.zeros(self.number_of_samples)
-        self.cross_down_save = np.zeros(self.number_of_samples)
-        self.stim_1_save = np.zeros(self.number_of_samples)
-        self.stim_2_save = np.zeros(self.number_of_samples)
-        self.stim_3_save = np.zeros(self.number_of_samples)
+        # Ajusta los límites del tamaño de bloque y el hold-off a la nueva frecuencia de muestreo
+        self.block_control.set_sample_rate(new_sample_rate)
+        self.envelope.configure(new_sample_rate)
+        self.update_hold_off_time(self.hold_off_time)
+        self.samples_per_iteration = self.block_control.block
         # Reinicia el índice actual a 0
         self.current_index = 0
         # Ajusta el número de muestras a la nueva frecuencia de muestreo
@@ -973,157 +1046,128 @@ class ThreadA(QThread):
         self.save_data_active = save_data_active
 
     def initialize_task(self):
-        """Inicializa la tarea de adquisición de datos utilizando nidaqmx."""
+        """Inicializa la tarea de adquisición de datos a través del backend seleccionado."""
 
         try:
             if self.dev_name is None:
                 raise ValueError("No DAQ device specified.")
-            self.task = nidaqmx.Task()
-            self.task.ai_channels.add_ai_voltage_chan(f"{self.dev_name}/ai0:12", min_val=-10.0, max_val=10.0)
-            # Configura la frecuencia de muestreo y el modo de adquisición continua
-            self.task.timing.cfg_samp_clk_timing(rate=self.sample_rate, sample_mode=nidaqmx.constants.AcquisitionType.CONTINUOUS,
-                                             samps_per_chan=self.samp_per_channel)
-        except nidaqmx.errors.DaqError as e:
+            # Añade los canales de voltaje ai0 a ai{n_channels - 1} en modo de adquisición continua
+            self.task = self.backend.open_ai_task(self.dev_name, self.n_channels, self.sample_rate, self.samp_per_channel)
+        except self.backend.DaqError as e:
             print(f"DAQ Error: {e}")
         except ValueError as ve:
             print(ve)
-        
-        """# Crea una nueva tarea de nidaqmx
-        self.task = nidaqmx.Task()
-        # Añade un canal de voltaje para la adquisición de datos (canales ai0 a ai12)
-        self.task.ai_channels.add_ai_voltage_chan(f"{self.dev_name}/ai0:12", min_val=-10.0, max_val=10.0)"""
-        
-        
 
     def update_data_p_index(self, index):
         self.data_p_index = index
 
-    def update_hold_off(self, hold_off_flag):
-        self.hold_off_active = hold_off_flag
+    def update_hold_off_time(self, hold_off_time):
+        self.hold_off_time = hold_off_time
+        self.detector.hold_off_samples = round(hold_off_time * self.sample_rate)
 
     def update_threshold(self, threshold_value):
         self.threshold = threshold_value
+        self.detector.threshold = threshold_value
+
+    def update_hysteresis_up(self, hysteresis):
+        self.detector.hysteresis_up = hysteresis
+
+    def update_hysteresis_down(self, hysteresis):
+        self.detector.hysteresis_down = hysteresis
 
     def reset_flags(self):
-        self.crossing_detected = False
-        self.primer_cruce_encontrado = False
-        self.crossing_hysteresis_detected = False
+        self.detector.reset()
+
+    def update_detect_on_envelope(self, active):
+        """Elige si el detector de cruces trabaja sobre la señal cruda o sobre su envolvente."""
+        self.detect_on_envelope = active
+        self.detector.reset()
 
     def set_number_of_samples(self, new_tmax):
         self.tmax = new_tmax
         #print("t max: ", self.tmax)
         self.number_of_samples = int(new_tmax * self.sample_rate)
         #print("NUMBER_SAMPLES-----------------------------", self.number_of_samples, self.sample_rate)
-        #self.samples_per_iteration = int(self.number_of_samples / self.sample_rate
-        self.samples_per_iteration = 20
-        #print("muestras por iteración: ", self.samples_per_iteration)
+        # Las muestras por iteración las decide el controlador adaptativo en cada lectura
         self.tiempo = np.array(np.linspace(0, new_tmax, self.number_of_samples))
         #print("tiempo: ", self.tiempo)
-        self.data_array_zeros = np.zeros((13, self.number_of_samples))
-        self.t = np.arange(len(self.data_array_zeros[0]))
+        # Reasigna el buffer circular; los lectores detectan el cambio y reinician su cursor
+        self.ring.resize(self.number_of_samples)
+        self.t = np.arange(self.ring.capacity)
         #print("T: ", self.t, self.tiempo[self.t[len(self.t)-1]])
         # Ajustar índices
         self.current_index = 0
         self.reset_flags()
-        # Asegúrate de que cualquier operación de guardado o procesamiento se resetea
-        self.cross_up_save = np.zeros(self.number_of_samples)
-        self.cross_down_save = np.zeros(self.number_of_samples)
-        self.stim_1_save = np.zeros(self.number_of_samples)
-        self.stim_2_save = np.zeros(self.number_of_samples)
-        self.stim_3_save = np.zeros(self.number_of_samples)
+        # Los vectores de guardado apuntan a los carriles de eventos del nuevo buffer
+        self.bind_event_lanes()
 
         print("------------------------------------------------------------------------------------------------CAMBIO DE TIEMPO A", self.tmax, new_tmax)
 
     def run(self):
         if self.task is None:
             self.initialize_task()
+        self.envelope.design() # Importa scipy aquí y no al arrancar la interfaz
 
         while True:
-            data_read = np.array(self.task.read(number_of_samples_per_channel=self.samples_per_iteration))
-            current_end_index = (self.current_index + self.samples_per_iteration) % self.number_of_samples
+            # El tamaño del bloque se ajusta a las muestras que la tarjeta tiene pendientes
+            backlog = self.task.available()
+            telemetry.monitor.record_loop(backlog)
+            self.samples_per_iteration = self.block_control.next_block(backlog)
+            # Lee el bloque en el buffer circular; data_read es una vista del buffer, no una copia
+            self.current_index, n = self.ring.read_from(self.task, self.samples_per_iteration)
+            self.read_time = time.perf_counter() # Instante en que el bloque regresó de la tarjeta
+            data_read = self.ring.view(self.current_index, n)
+            # La envolvente de todos los canales se escribe junto a las señales en el buffer circular
+            envelope_block = self.ring.envelope[:, self.current_index:self.current_index + n]
+            current_end_index = (self.current_index + n) % self.ring.capacity
             #print("current index", self.current_index)
             #print("current end index: ", current_end_index)
 
             #print(f"self.samples_per_iteration: {self.samples_per_iteration}")
             #print(f"data_read.shape: {data_read.shape}")
 
-            self.semaphore.acquire()
-            try:
-                self.mutex.lock()
-                try:
-                    data_t_p = self.t[self.current_index:self.current_index + self.samples_per_iteration]
-                    #print("RANGOS EN HILO A", self.current_index, self.current_index + self.samples_per_iteration)
-                    #print("DATA_T_P", data_t_p)
-                    data = np.array(data_read[self.data_p_index, :])
-                    promedio_p = np.mean(data)
-                    self.detect_crosses(promedio_p, data, data_t_p)
-                    self.data_generated.emit(data_read, self.current_index)
-                    if self.save_data_active and current_end_index == 0:
-                        self.save_data.emit(data_read, self.cross_up_save, self.cross_down_save, self.stim_1_save,
-                                            self.stim_2_save, self.stim_3_save)
-                        self.cross_up_save.fill(0)
-                        self.cross_down_save.fill(0)
-                        self.stim_1_save.fill(0)
-                        self.stim_2_save.fill(0)
-                        self.stim_3_save.fill(0)
-
-                    self.save_data.emit(data_read,
-                                        self.cross_up_save[
-                                        self.current_index:self.current_index + self.samples_per_iteration],
-                                        self.cross_down_save[
-                                        self.current_index:self.current_index + self.samples_per_iteration],
-                                        self.stim_1_save[
-                                        self.current_index:self.current_index + self.samples_per_iteration],
-                                        self.stim_2_save[
-                                        self.current_index:self.current_index + self.samples_per_iteration],
-                                        self.stim_3_save[
-                                        self.current_index:self.current_index + self.samples_per_iteration])
-                finally:
-                    self.mutex.unlock()
-            finally:
-                self.semaphore.release()
+            data_t_p = self.t[self.current_index:self.current_index + n]
+            #print("RANGOS EN HILO A", self.current_index, self.current_index + n)
+            if self.detect_on_envelope:
+                self.envelope.process(data_read, out=envelope_block)
+                self.detect_crosses(envelope_block[self.data_p_index, :], data_t_p)
+            else:
+                # Los cruces se publican antes de filtrar: la envolvente no retrasa la estimulación
+                self.detect_crosses(data_read[self.data_p_index, :], data_t_p)
+                self.envelope.process(data_read, out=envelope_block)
 
+            # Publica el bloque: la gráfica y el guardado lo leerán del buffer a su propio ritmo,
+            # sin señales por bloque ni bloqueos sobre la interfaz
+            self.ring.commit(n)
             self.current_index = current_end_index
-            self.time_end = time.time()
-
-    def detect_crosses(self, data_p, data, data_t_p):
-        if self.hold_off_active:
-            return
-
-        if not self.crossing_detected and not self.primer_cruce_encontrado:
-            primer_cruce_index = np.argmax(data_p >= self.threshold)
-            self.primer_cruce_encontrado = True
-            self.crossing_detected = True
-            self.crossing_hysteresis_detected = False
-
-        if self.crossing_detected and self.primer_cruce_encontrado and not self.crossing_hysteresis_detected:
-            if data_p >= self.threshold + window.hysteresis_up:
-                first_index = np.argmax(data >= self.threshold + window.hysteresis_up)
-                #print("INDICES DE TIEMPO EN CRUCES", data_t_p)
-                #print("DATOS", data)
-                self.value_up = data_t_p[first_index]
-                #print("CRUCE ASCENDENTE", self.value_up,"-----------------------------------")
-                #print("RANGOS", data_t_p)
-                start_time = time.time()
-                # print("EN COMPARAR------------", start_time)
-                thread_index.run(self.value_up, start_time)
-                self.cross_x_up.emit(self.value_up)
-                hold_off_thread.start()
-                self.hold_off_active = True
-                self.crossing_hysteresis_detected = True
-                if self.save_data_active:
-                    self.cross_up_save[self.value_up] = 1
-
-        if self.crossing_detected and self.primer_cruce_encontrado and self.crossing_hysteresis_detected and not self.hold_off_active:
-            if data_p < self.threshold - window.hysteresis_down:
-                first_index_down = np.argmax(data <= self.threshold)
-                self.value_down = data_t_p[first_index_down]
-                #print("CRUCE DESCENDENTE", self.value_down)
-                self.cross_x_down.emit(self.value_down)
-                if self.save_data_active:
-                    self.cross_down_save[self.value_down] = 1
-                self.reset_flags()
+            telemetry.monitor.report_cpu('adquisición')
+
+    def detect_crosses(self, data, data_t_p):
+        """Busca todos los cruces del bloque muestra a muestra y los comunica al resto de la aplicación."""
+        ups, downs = self.detector.process(data)
+
+        for first_index in ups:
+            self.value_up = data_t_p[first_index]
+            #print("CRUCE ASCENDENTE", self.value_up,"-----------------------------------")
+            start_time = time.perf_counter()
+            latency.monitor.record_detection(self.read_time, start_time)
+            # La lógica de estimulación corre en thread_index; aquí sólo se publica el cruce
+            thread_index.post_cross(self.value_up, start_time, self.read_time)
+            self.cross_x_up.emit(self.value_up)
+            self.cross_up_save[self.value_up] = 1
+
+        for first_index_down in downs:
+            self.value_down = data_t_p[first_index_down]
+            #print("CRUCE DESCENDENTE", self.value_down)
+            self.cross_x_down.emit(self.value_down)
+            self.cross_down_save[self.value_down] = 1
 class Thread_index(QThread):
+    """Planificador de estimulación: consume los cruces ascendentes que publica ThreadA.
+
+    ThreadA sólo agrega cada cruce a una deque (append y popleft son atómicos, no hay candados) y
+    este hilo los procesa en orden. Los estimuladores que corresponden a cada número de ciclo se
+    resuelven con una tabla de máscaras de bits precalculada cada vez que cambian los botones o el
+    número máximo de cruces."""
     crosses_detected = pyqtSignal(int)
     tag_1 = pyqtSignal(int)
     tag_2 = pyqtSignal(int)
@@ -1153,6 +1197,22 @@ class Thread_index(QThread):
         self.crosses_count_max = 0
         self.save_data_active = False
         self.estimuladores_botones_activos = {1: [], 2: [], 3: []}
+        self.stim_table = np.zeros(1, dtype=np.uint8) # Máscara de estimuladores por número de ciclo (bit 0 = Stim 1)
+        self.pending_crosses = deque() # Cruces (índice, instante) publicados por ThreadA
+        self.posted = 0 # Cruces publicados por ThreadA (sólo lo escribe ThreadA)
+        self.processed = 0 # Cruces ya procesados, con sus marcas escritas (sólo lo escribe este hilo)
+        self.wakeup = threading.Event()
+        self.running = False
+        self.stim_signals = {
+            1: ('stim_1_apply', self.tag_1, 'port1/line0', 'S_1', 'tag_1_active', 'stim_1_save'),
+            2: ('stim_2_apply', self.tag_2, 'port1/line1', 'S_2', 'tag_2_active', 'stim_2_save'),
+            3: ('stim_3_apply', self.tag_3, 'port1/line2', 'S_3', 'tag_3_active', 'stim_3_save')
+        }
+
+    def build_stim_table(self):
+        """Precalcula qué estimuladores se activan en cada número de ciclo."""
+        # Se reemplaza la referencia completa para que el planificador nunca vea una tabla a medias
+        self.stim_table = build_stim_table(self.estimuladores_botones_activos, self.crosses_count_max)
 
     def stim_active_update(self, stim_1, stim_2, stim_3):
         self.stim_1_apply = stim_1
@@ -1164,6 +1224,7 @@ class Thread_index(QThread):
         self.tag_1_active = any(self.estimuladores_botones_activos[1])
         self.tag_2_active = any(self.estimuladores_botones_activos[2])
         self.tag_3_active = any(self.estimuladores_botones_activos[3])
+        self.build_stim_table()
 
     def save_data_update(self, save_data_active):
         self.save_data_active = save_data_active
@@ -1195,8 +1256,41 @@ class Thread_index(QThread):
 
     def update_crosses_max(self, crosses_count_max):
         self.crosses_count_max = crosses_count_max
+        self.build_stim_table()
+
+    def post_cross(self, value_up, start_time, read_time):
+        """Publica un cruce ascendente desde el hilo de adquisición sin esperar a la estimulación."""
+        self.pending_crosses.append((value_up, start_time, read_time))
+        self.posted += 1
+        self.wakeup.set()
+
+    def wait_idle(self, timeout=1.0):
+        """Espera a que se procesen los cruces publicados hasta ahora; sus marcas STIM ya están en el buffer."""
+        target = self.posted
+        deadline = time.perf_counter() + timeout
+        while self.processed < target:
+            if time.perf_counter() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
 
-    def run(self, value_up, start_time):
+    def run(self):
+        self.running = True
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            # Un cruce publicado después de clear() se procesa en esta pasada o deja el evento activo
+            while self.pending_crosses:
+                value_up, start_time, read_time = self.pending_crosses.popleft()
+                self.process_cross(value_up, start_time, read_time)
+                self.processed += 1
+            telemetry.monitor.report_cpu('estimulación')
+
+    def process_cross(self, value_up, start_time, read_time):
         try:
             #print("EN INDEX", start_time)
             if self.crosses_count >= self.crosses_count_max:
@@ -1206,38 +1300,33 @@ class Thread_index(QThread):
 
             index_t = (value_up + round(self.delay_time * self.data_per_s)) % self.number_of_samples
 
-            stim_signals = {
-                1: (self.stim_1_apply, self.tag_1, 'port1/line0', 'S_1', 'tag_1_active', 'stim_1_save', window.main_graph.update_tag_1),
-                2: (self.stim_2_apply, self.tag_2, 'port1/line1', 'S_2', 'tag_2_active', 'stim_2_save', window.main_graph.update_tag_2),
-                3: (self.stim_3_apply, self.tag_3, 'port1/line2', 'S_3', 'tag_3_active', 'stim_3_save', window.main_graph.update_tag_3)
-            }
-
-            if self.save_data_active:
-                self.save_data(index_t)
+            self.save_data(index_t)
 
-            for stim_number, vector in self.estimuladores_botones_activos.items():
-                if self.crosses_count in vector:
-                    self.handle_stimulus(stim_signals[stim_number], index_t, start_time)
+            stim_table = self.stim_table
+            mask = stim_table[self.crosses_count] if self.crosses_count < len(stim_table) else 0
+            decision_time = time.perf_counter()
+            latency.monitor.record_decision(start_time, decision_time)
+            for stim_number in (1, 2, 3):
+                if mask & (1 << (stim_number - 1)):
+                    self.handle_stimulus(self.stim_signals[stim_number], index_t, start_time, read_time, decision_time)
 
             self.reset_flags()
         except Exception as e:
-            print(f"Error en PulseThread: {e}")
+            print(f"Error en Thread_index: {e}")
 
-    def handle_stimulus(self, stim_signal, index_t, start_time):
-        apply_stim, tag_signal, device_channel, S_attr, tag_active_attr, save_attr, update_function = stim_signal
+    def handle_stimulus(self, stim_signal, index_t, start_time, read_time, decision_time):
+        apply_attr, tag_signal, device_channel, S_attr, tag_active_attr, save_attr = stim_signal
+        apply_stim = getattr(self, apply_attr)
 
         if not getattr(self, tag_active_attr) and getattr(self, S_attr) == 0:
             setattr(self, tag_active_attr, True)
             setattr(self, S_attr, 1)
 
         if apply_stim:
-            thread_pulse.start()
-            thread_pulse.send_ttl_pulse(device_channel, start_time)
-            if self.save_data_active:
-                getattr(thread_a, save_attr)[index_t] = 2
+            thread_pulse.send_ttl_pulse(device_channel, start_time, read_time, decision_time)
+            getattr(thread_a, save_attr)[index_t] = 2
         else:
-            if self.save_data_active:
-                getattr(thread_a, save_attr)[index_t] = 1.5
+            getattr(thread_a, save_attr)[index_t] = 1.5
 
         tag_signal.emit(index_t)
 
@@ -1249,48 +1338,37 @@ class Thread_index(QThread):
         if any(self.estimuladores_botones_activos[3]):
             thread_a.stim_3_save[index_t] = 1
 class PulseThread(QThread):
+    """Hilo de alta prioridad que atiende el motor de pulsos TTL (stimulation.PulseEngine).
+
+    Los pulsos se encolan con un plazo monotónico (instante del cruce + retardo) y se generan sobre
+    tareas digitales abiertas toda la sesión."""
     tag_signal = pyqtSignal(int)  # Asegúrate de definir esto si no está definido
 
-    def __init__(self, dev_name):
+    def __init__(self, dev_name, backend):
         super().__init__()
         self.dev_name = dev_name
-        self.delay_time = 0
-        self.device_channel = ''
-        self.start_time = 0
-        self.index_t = 0
+        self.backend = backend
+        self.engine = PulseEngine(backend, dev_name)
 
-    def update_delay_time(self, delay_time):
-        self.delay_time = delay_time
+    @property
+    def delay_time(self):
+        return self.engine.delay_time
 
-    def send_ttl_pulse(self, device_channel, start_time):
-        self.device_channel = device_channel
-        new_delay = self.delay_time - (time.time() - start_time)
-        if new_delay < 0:
-            new_delay = 0
-        QTimer.singleShot(int(new_delay * 1000), self.trigger_pulse)
-
-    def trigger_pulse(self):
-        with nidaqmx.Task() as ttl_task:
-            ttl_task.do_channels.add_do_chan(f"{self.dev_name}/{self.device_channel}")
-            ttl_task.write(True, timeout=0.00001)
-            ttl_task.write(False, timeout=0.00001)
-            #print("Dentro de trigger",time.time() - self.start_time)
-            #print("Pulso enviado correctamente")
-class Hold_off(QThread):
-    hold_off_finished = pyqtSignal(bool)
+    @property
+    def pulse_log(self):
+        return self.engine.pulse_log
 
-    def __init__(self):
-        super().__init__()
-        self.hold_off_time = 0
+    def update_delay_time(self, delay_time):
+        self.engine.delay_time = delay_time
 
-    def update_hold_off_time(self, hold_off_time):
-        self.hold_off_time = hold_off_time
+    def send_ttl_pulse(self, device_channel, start_time, read_time=None, decision_time=None):
+        self.engine.send_ttl_pulse(device_channel, start_time, read_time, decision_time)
 
-    def run(self):
-        QTimer.singleShot(int(self.hold_off_time * 1000), self.finish_hold_off)
+    def stop(self):
+        self.engine.stop()
 
-    def finish_hold_off(self):
-        self.hold_off_finished.emit(False)
+    def run(self):
+        self.engine.serve()
 
 class CanvasGraph(QWidget):
     def __init__(self, channel_colors, stim_color_1, stim_color_2, stim_color_3, threshold_color, line_up_color, line_down_color, number_of_samples, samp_per_iteration, tmax, tiempo, sample_rate):
@@ -1300,24 +1378,11 @@ class CanvasGraph(QWidget):
         self.tmax = tmax
         self.samples_per_iteration = samp_per_iteration
         self.number_of_samples = number_of_samples
-        self.data_array_zeros = np.zeros((13, number_of_samples))
-        self.cross_up = np.zeros(number_of_samples)
-        self.cross_down = np.zeros(number_of_samples)
-        self.Stim_1 = np.zeros(number_of_samples)
-        self.Stim_2 = np.zeros(number_of_samples)
-        self.Stim_3 = np.zeros(number_of_samples)
-        self.zeros = np.zeros(samp_per_iteration)
+        self.n_channels = len(channel_colors)
+        # Columnas de la copia decimada min/max (aprox. una por píxel horizontal de la gráfica)
+        self.display_columns = 2000
+        self.allocate_display()
         self.current_index = 0
-        self.New_value_up = False
-        self.New_value_down = False
-        self.tag_1_value = False
-        self.tag_2_value = False
-        self.tag_3_value = False
-        self.value_S_1 = 0
-        self.value_S_2 = 0
-        self.value_S_3 = 0
-        self.value_up = 0
-        self.value_down = 0
 
         self.Graph_layout = pg.PlotWidget(enableOpenGL=True)
         self.layout = QVBoxLayout()
@@ -1350,11 +1415,27 @@ class CanvasGraph(QWidget):
         self.cross_indices = []
         self.legend.setRotation(0)
 
-        for i in range(len(channel_colors)):
-            setattr(self, f'offset_{i + 1}', 0)
+        # Texto superpuesto con las estadísticas de dibujo (fijo en píxeles, no se mueve con los ejes)
+        self.stats_text = pg.TextItem(anchor=(0, 0))
+        self.stats_text.setParentItem(self.Graph_layout.getPlotItem().getViewBox())
+        self.stats_text.setPos(5, 5)
+
+        self.offsets = np.zeros(self.n_channels) # Desplazamiento vertical de cada curva
+        self.show_envelope = False # True: se dibuja la envolvente en vivo en lugar de la señal cruda
 
         self.tmax_changed = False
 
+    def allocate_display(self):
+        """Reserva los vectores de marcas y las copias decimadas para el número de muestras actual."""
+        # Vectores de marcas de cruces y estímulos, como filas de un mismo arreglo
+        self.markers = np.zeros((5, self.number_of_samples))
+        self.cross_up, self.cross_down, self.Stim_1, self.Stim_2, self.Stim_3 = self.markers
+        # Copias decimadas min/max de las señales y de las marcas; sólo se actualizan las columnas nuevas
+        self.signal_decimator = MinMaxDecimator(self.n_channels, self.number_of_samples, self.display_columns, self.tiempo)
+        self.marker_decimator = MinMaxDecimator(5, self.number_of_samples, self.display_columns, self.tiempo)
+        # Marcas (fila, índice, valor) recibidas y aún no dibujadas; varias pueden llegar en un mismo cuadro
+        self.pending_marks = deque()
+
     def save_data_update(self, bool):
         self.save_data_active = bool
 
@@ -1364,208 +1445,445 @@ class CanvasGraph(QWidget):
     def set_sample_rate(self, new_sample_rate):
         self.sample_rate = new_sample_rate
         self.number_of_samples = int(self.tmax * self.sample_rate)
-        self.samples_per_iteration = int(self.number_of_samples / self.sample_rate)  # Este valor debe ser igual al número de muestras por segundo
 
         print(f"Nuevo sample_rate: {self.sample_rate}")
         print(f"Nuevo number_of_samples: {self.number_of_samples}")
-        print(f"Nuevo samples_per_iteration: {self.samples_per_iteration}")
 
         self.tiempo = np.linspace(0, self.tmax, self.number_of_samples)
-        self.data_array_zeros = np.zeros((13, self.number_of_samples))
-        self.cross_up = np.zeros(self.number_of_samples)
-        self.cross_down = np.zeros(self.number_of_samples)
-        self.Stim_1 = np.zeros(self.number_of_samples)
-        self.Stim_2 = np.zeros(self.number_of_samples)
-        self.Stim_3 = np.zeros(self.number_of_samples)
-        self.zeros = np.zeros(self.samples_per_iteration)
         self.set_number_of_samples(self.tmax)
 
     def update_x_up(self, value_up):
-        self.value_up = value_up
-        self.New_value_up = True
+        self.pending_marks.append((0, value_up, 1))
 
     def update_x_down(self, value_down):
-        self.value_down = value_down
-        self.New_value_down = True
+        self.pending_marks.append((1, value_down, -1))
 
     def update_tag_1(self, value_S_1):
-        self.value_S_1 = value_S_1
-        self.tag_1_value = True
+        self.pending_marks.append((2, value_S_1, 10))
 
     def update_tag_2(self, value_S_2):
-        self.value_S_2 = value_S_2
-        self.tag_2_value = True
+        self.pending_marks.append((3, value_S_2, 10))
 
     def update_tag_3(self, value_S_3):
-        self.value_S_3 = value_S_3
-        self.tag_3_value = True
-
-    def update_offset_1(self, value):
-        self.offset_1 = value
-        #print("OFFSET 1", value)
-
-    def update_offset_2(self, value):
-        self.offset_2 = value
+        self.pending_marks.append((4, value_S_3, 10))
 
-    def update_offset_3(self, value):
-        self.offset_3 = value
+    def mark_is_pending(self, index):
+        """True si la muestra `index` todavía no llega a la gráfica: está en el bloque que la adquisición
+        aún no publica o, para un estímulo con retardo, más adelante en el buffer."""
+        return (index - self.reader.cursor) % self.ring.capacity < self.ring.max_lag
 
-    def update_offset_4(self, value):
-        self.offset_4 = value
-        #print("OFFSET 4", value)
+    def signal_source(self):
+        """Arreglo del buffer circular que se dibuja: señales crudas o su envolvente."""
+        return self.ring.envelope if self.show_envelope and self.ring.envelope is not None else self.ring.data
 
-    def update_offset_5(self, value):
-        self.offset_5 = value
+    def set_show_envelope(self, active):
+        """Cambia entre señal cruda y envolvente; la copia decimada se recalcula completa."""
+        self.show_envelope = active
+        if self.ring.capacity == self.number_of_samples:
+            self.signal_decimator.update(self.signal_source(), 0, self.number_of_samples)
 
-    def update_offset_6(self, value):
-        self.offset_6 = value
-
-    def update_offset_7(self, value):
-        self.offset_7 = value
-        #print("OFFSET 7", value)
-
-    def update_offset_8(self, value):
-        self.offset_8 = value
-
-    def update_offset_9(self, value):
-        self.offset_9 = value
-
-    def update_offset_10(self, value):
-        self.offset_10 = value
-
-    def update_offset_11(self, value):
-        self.offset_11 = value
-        #print("OFFSET 11", value)
-
-    def update_offset_12(self, value):
-        self.offset_12 = value
+    def update_offset(self, index, value):
+        """Desplazamiento vertical de la curva del canal `index`."""
+        self.offsets[index] = value
 
     def set_number_of_samples(self, new_tmax):
         self.tmax = new_tmax
         self.number_of_samples = int(new_tmax * self.sample_rate)
-        #self.samples_per_iteration = int(self.number_of_samples / self.sample_rate)
-        self.samples_per_iteration = 20
+        # El tamaño de cada bloque llega con los datos (lo decide el controlador adaptativo de ThreadA)
         #print("number_of_samples", self.number_of_samples)
-        #print("MUESTRAS POR ITE", self.samples_per_iteration)
-        self.zeros = np.zeros(self.samples_per_iteration)
-        #print("ZEROS", len(self.zeros))
         self.tiempo = np.array(np.linspace(0, new_tmax, self.number_of_samples))
         #print("tiempo", len(self.tiempo))
-        self.data_array_zeros = np.zeros((13, self.number_of_samples))
-        #print("data_array_zeros", self.data_array_zeros.shape)
-        self.cross_up = np.zeros(self.number_of_samples)
-        self.cross_down = np.zeros(self.number_of_samples)
-        self.Stim_1 = np.zeros(self.number_of_samples)
-        self.Stim_2 = np.zeros(self.number_of_samples)
-        self.Stim_3 = np.zeros(self.number_of_samples)
+        self.allocate_display()
         #self.current_index = 0
         self.tmax_changed = True
         print("-----------------------------------------------------------------------------CAMBIO DE TIEMPO GRAPH",
               self.tmax, new_tmax)
 
 
-    def update_plot(self, data, current_index):
-        self.current_index = current_index
-        if len(data[0]) == self.samples_per_iteration:
-            min_length = min(len(self.tiempo), self.number_of_samples)
-            vectors = [self.cross_up, self.cross_down, self.Stim_1, self.Stim_2, self.Stim_3]
-            tiempo_s = self.tiempo[:min_length]
-            data_all = self.data_array_zeros[:, :min_length]
-            subsample_factor = 1
-            tiempo_T_s = tiempo_s[::subsample_factor]
-            data_T_s = data_all[:, ::subsample_factor]
+    def attach_ring(self, ring):
+        """Conecta la gráfica al buffer circular de la adquisición; la gráfica lo lee con su propio cursor."""
+        self.ring = ring
+        self.reader = ring.reader()
 
-            current_end_index = (self.current_index + self.samples_per_iteration) % min_length
-            #if self.tmax_changed:
-                #current_end_index = (0 + self.samples_per_iteration) % min_length
-                #print("INDICES ACTUALIZADOS EN GRAPH", self.current_index, current_end_index)
+    def update_stats_text(self, text):
+        """Muestra el texto de estadísticas en la esquina superior izquierda de la gráfica."""
+        self.stats_text.setText(text)
 
-                #self.tmax_changed = False
-            #print("plot")
-            #print(f"current_index: {self.current_index}")
-            #print(f"current_end_index: {current_end_index}")
-            #print("CURRENT INDEX EN GRAPH", self.current_index)
+    def update_plot(self):
+        """Dibuja los bloques publicados en el buffer circular desde la última actualización.
 
-            #self.data_array_zeros[:, current_end_index:current_end_index + self.samples_per_iteration] = data
-            self.data_array_zeros[:, self.current_index:self.current_index + self.samples_per_iteration] = data
+        Devuelve el número de bloques de adquisición agrupados en este cuadro."""
+        segments = self.reader.poll()
+        # Si el buffer se reasignó con otra ventana de tiempo se espera a que la gráfica se ajuste
+        if not segments or self.ring.capacity != self.number_of_samples:
+            return 0
 
-            for array in vectors:
-                array[self.current_index:self.current_index + self.samples_per_iteration] = self.zeros
-                #print("RANGOS GRAPH", self.current_index, current_end_index)
+        min_length = min(len(self.tiempo), self.number_of_samples)
+        marked = [] # Índices de las marcas dibujadas en este cuadro (se recalculan sus columnas decimadas)
 
+        for self.current_index, self.samples_per_iteration in segments:
+            self.markers[:, self.current_index:self.current_index + self.samples_per_iteration] = 0
             #print("RANGOS GRAPH", self.current_index, current_end_index)
-            if self.New_value_up: #and self.value_up <= self.number_of_samples:
-                self.cross_up[self.value_up] = 1
-                #print(f"VALOR DE SUBIDA GRAPH {self.value_up}-------------------")
-                #print("RANGOS GRAPH", self.current_index, current_end_index)
-                self.New_value_up = False
 
-            if self.New_value_down: #and self.value_down <= self.number_of_samples:
-                self.cross_down[self.value_down] = -1
-                self.New_value_down = False
+        # Todas las marcas llegadas desde el cuadro anterior; las de muestras que aún no se leen esperan
+        waiting = deque()
+        while self.pending_marks:
+            row, index, value = self.pending_marks.popleft()
+            if index >= self.number_of_samples:
+                continue # Marca de una ventana de tiempo anterior
+            if self.mark_is_pending(index):
+                waiting.append((row, index, value))
+            else:
+                self.markers[row, index] = value
+                marked.append(index)
+        self.pending_marks = waiting
+
+        for self.current_index, self.samples_per_iteration in segments:
+            # Recalcula sólo las columnas decimadas que tocan el segmento nuevo (señales leídas del buffer circular)
+            self.signal_decimator.update(self.signal_source(), self.current_index, self.samples_per_iteration)
+            self.marker_decimator.update(self.markers, self.current_index, self.samples_per_iteration)
+
+        for index in marked:
+            self.marker_decimator.update(self.markers, index, 1)
+
+        # Cada curva recibe 2 puntos (min, max) por columna en lugar de todas las muestras de la ventana
+        tiempo_s = self.marker_decimator.x
+        self.cross_line_up.setData(tiempo_s, self.marker_decimator.row(0))
+        self.cross_line_down.setData(tiempo_s, self.marker_decimator.row(1))
+        self.Stim_1_line.setData(tiempo_s, self.marker_decimator.row(2))
+        self.Stim_2_line.setData(tiempo_s, self.marker_decimator.row(3))
+        self.Stim_3_line.setData(tiempo_s, self.marker_decimator.row(4))
+        # El umbral es una recta: bastan sus dos extremos
+        self.threshold_line.setData([self.tiempo[0], self.tiempo[min_length - 1]], [window.threshold, window.threshold])
+
+        for i, curve in enumerate(self.curves):
+            if curve.isVisible():
+                curve.setData(x=self.signal_decimator.x, y=self.signal_decimator.row(i) + self.offsets[i])
+
+        return self.reader.blocks
+
+
+class ProcessThreadA(QObject):
+    """Sustituto de ThreadA cuando la adquisición corre en un proceso aparte (--proceso).
+
+    Expone la misma interfaz que usa la ventana, pero cada cambio se envía como comando al proceso de
+    adquisición; el buffer circular es el segmento de memoria compartida que escribe ese proceso.
+    Los cruces y estímulos que informa el proceso se reemiten como las señales de ThreadA y Thread_index;
+    sus resúmenes periódicos de telemetría y latencias se suman a los monitores de la interfaz."""
+    cross_x_up = pyqtSignal(int)
+    cross_x_down = pyqtSignal(int)
+
+    def __init__(self, process, sample_rate, tmax, stimulation):
+        super().__init__()
+        self.process = process
+        self.stimulation = stimulation
+        self.sample_rate = sample_rate
+        self.tmax = tmax
+        self.number_of_samples = int(tmax * sample_rate)
+        self.sample_time = self.tmax / self.number_of_samples
+        self.ring = process.ring
+        self.task = None # La tarea vive en el proceso de adquisición
+        self.event_timer = QTimer()
+        self.event_timer.timeout.connect(self.dispatch_events)
+        self.event_interval = 10 # Periodo de consulta de eventos [ms]
+
+    def update_threshold(self, threshold_value):
+        self.process.send('threshold', threshold_value)
+
+    def update_hysteresis_up(self, hysteresis):
+        self.process.send('hysteresis_up', hysteresis)
+
+    def update_hysteresis_down(self, hysteresis):
+        self.process.send('hysteresis_down', hysteresis)
+
+    def update_hold_off_time(self, hold_off_time):
+        self.process.send('hold_off', hold_off_time)
+
+    def update_data_p_index(self, index):
+        self.process.send('channel', index)
+
+    def save_data_update(self, save_data_active):
+        self.process.send('save_active', save_data_active)
+
+    def reset_flags(self):
+        self.process.send('reset_flags')
+
+    def update_detect_on_envelope(self, active):
+        self.process.send('envelope_detect', active)
+
+    def set_number_of_samples(self, new_tmax):
+        self.tmax = new_tmax
+        self.number_of_samples = int(new_tmax * self.sample_rate)
+        self.sample_time = self.tmax / self.number_of_samples
+        self.process.send('window', new_tmax)
+
+    def set_sample_rate(self, new_sample_rate):
+        self.sample_rate = new_sample_rate
+        self.number_of_samples = int(self.tmax * new_sample_rate)
+        self.sample_time = self.tmax / self.number_of_samples
+        self.process.send('sample_rate', new_sample_rate)
+
+    def start(self):
+        self.event_timer.start(self.event_interval)
+
+    def terminate(self):
+        self.event_timer.stop()
+        self.process.stop()
+
+    def dispatch_events(self):
+        for event in self.process.poll_events():
+            kind = event[0]
+            if kind == 'up':
+                self.cross_x_up.emit(event[1])
+            elif kind == 'down':
+                self.cross_x_down.emit(event[1])
+            elif kind == 'count':
+                self.stimulation.last_crosses_count = event[1]
+                self.stimulation.crosses_detected.emit(event[1])
+            elif kind == 'tag':
+                getattr(self.stimulation, f'tag_{event[1]}').emit(event[2])
+            elif kind == 'telemetry':
+                telemetry.monitor.merge_loops(*event[1:])
+            elif kind == 'latency':
+                latency.monitor.merge(event[1])
+
+
+class ProcessStimulation(QObject):
+    """Sustituto de Thread_index y PulseThread cuando la estimulación corre en el proceso de adquisición."""
+    crosses_detected = pyqtSignal(int)
+    tag_1 = pyqtSignal(int)
+    tag_2 = pyqtSignal(int)
+    tag_3 = pyqtSignal(int)
+
+    def __init__(self, process):
+        super().__init__()
+        self.process = process
+        self.delay_time = 0
+        self.last_crosses_count = 0 # Último conteo de cruces informado por el proceso
+
+    @property
+    def crosses_count(self):
+        return self.last_crosses_count
+
+    @crosses_count.setter
+    def crosses_count(self, value):
+        self.last_crosses_count = value
+        self.process.send('crosses_count', value)
+
+    def stim_active_update(self, stim_1, stim_2, stim_3):
+        self.process.send('stim_apply', (stim_1, stim_2, stim_3))
+
+    def update_stims(self, estimuladores_botones_activos):
+        self.process.send('stims', {k: list(v) for k, v in estimuladores_botones_activos.items()})
+
+    def update_crosses_max(self, crosses_count_max):
+        self.process.send('crosses_max', crosses_count_max)
+
+    def update_delay_time(self, delay_time):
+        if delay_time != self.delay_time:
+            self.delay_time = delay_time
+            self.process.send('delay', delay_time)
+
+    def save_data_update(self, save_data_active):
+        pass # El proceso recibe la bandera de guardado a través de ProcessThreadA
+
+    def set_number_of_samples(self, new_tmax):
+        pass # El proceso reasigna su buffer al recibir el comando de ProcessThreadA
+
+    def set_sample_rate(self, new_sample_rate):
+        pass
+
+    def start(self, priority=None):
+        pass # Los hilos de estimulación y pulsos arrancan dentro del proceso de adquisición
+
+    def wait_idle(self, timeout=1.0):
+        return True # El proceso escribe las marcas STIM antes de publicar cada bloque
+
+
+class LatencyPanel(QWidget):
+    """Ventana con los percentiles de latencia del lazo cerrado, actualizada una vez por segundo."""
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Latencia del lazo cerrado")
+        layout = QVBoxLayout()
+        self.table = QPlainTextEdit()
+        self.table.setReadOnly(True)
+        self.table.setFont(QFont("Courier New", 10))
+        layout.addWidget(self.table)
+        self.bt_export = QPushButton("Exportar JSON")
+        self.bt_export.clicked.connect(self.export_json)
+        layout.addWidget(self.bt_export)
+        self.bt_reset = QPushButton("Reiniciar")
+        self.bt_reset.clicked.connect(latency.monitor.reset)
+        layout.addWidget(self.bt_reset)
+        self.setLayout(layout)
+        self.resize(520, 220)
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start(1000)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        self.table.setPlainText("Latencias en ms\n\n" + latency.monitor.format_table())
+
+    def export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar latencias", "latency.json", "JSON (*.json)")
+        if path:
+            latency.monitor.export_json(path)
+
+
+class RenderScheduler(QObject):
+    """Redibuja la gráfica a una tasa fija de cuadros, independiente del ritmo de lectura de la tarjeta.
 
-            if self.tag_1_value and self.value_S_1 < self.number_of_samples and self.current_index <= self.value_S_1 < current_end_index:
-                self.Stim_1[self.value_S_1] = 10
-                self.tag_1_value = False
+    Cada cuadro agrupa todos los bloques publicados desde el anterior. Una vez por segundo se calculan
+    los cuadros por segundo alcanzados y cuántos bloques se agruparon sin dibujarse por separado
+    (`achieved_fps` y `coalesced_blocks`, que la telemetría muestra sobre la gráfica)."""
 
-            if self.tag_2_value and self.value_S_2 < self.number_of_samples and self.current_index <= self.value_S_2 < current_end_index:
-                self.Stim_2[self.value_S_2] = 10
-                self.tag_2_value = False
+    def __init__(self, graph, fps=30):
+        super().__init__()
+        self.graph = graph
+        self.timer = QTimer()
+        self.timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.render_frame)
+        self.frames = 0 # Cuadros dibujados desde la última estadística
+        self.skipped_blocks = 0 # Bloques agrupados en otro cuadro desde la última estadística
+        self.achieved_fps = 0.0 # Cuadros por segundo del último segundo completo
+        self.coalesced_blocks = 0 # Bloques agrupados durante el último segundo completo
+        self.last_stats = time.perf_counter()
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        """Cambia la tasa de cuadros objetivo."""
+        self.fps = max(int(fps), 1)
+        self.timer.setInterval(int(1000 / self.fps))
+
+    def start(self):
+        self.last_stats = time.perf_counter()
+        self.timer.start()
 
-            if self.tag_3_value and self.value_S_3 < self.number_of_samples and self.current_index <= self.value_S_3 < current_end_index:
-                self.Stim_3[self.value_S_3] = 10
-                self.tag_3_value = False
+    def stop(self):
+        self.timer.stop()
 
-            threshold_line = np.full_like(tiempo_s, window.threshold)
-            self.cross_line_up.setData(tiempo_s, self.cross_up[:min_length])
-            self.cross_line_down.setData(tiempo_s, self.cross_down[:min_length])
-            self.Stim_1_line.setData(tiempo_s, self.Stim_1[:min_length])
-            self.Stim_2_line.setData(tiempo_s, self.Stim_2[:min_length])
-            self.Stim_3_line.setData(tiempo_s, self.Stim_3[:min_length])
-            self.threshold_line.setData(tiempo_s, threshold_line)
+    def render_frame(self):
+        blocks = self.graph.update_plot()
+        telemetry.monitor.report_cpu('interfaz')
+        if blocks:
+            self.frames += 1
+            self.skipped_blocks += blocks - 1
 
-            offsets = [self.offset_1, self.offset_2, self.offset_3, self.offset_4, self.offset_5,self.offset_6,
-                       self.offset_7, self.offset_8, self.offset_9, self.offset_10, self.offset_11, self.offset_12, self.offset_13]  # Ejemplos de offsets para cada curva
+        now = time.perf_counter()
+        if now - self.last_stats >= 1.0:
+            self.achieved_fps = self.frames / (now - self.last_stats)
+            self.coalesced_blocks = self.skipped_blocks
+            self.frames = 0
+            self.skipped_blocks = 0
+            self.last_stats = now
 
-            for i, curve in enumerate(self.curves):
-                if curve.isVisible():
-                    curve.setData(x=tiempo_T_s, y=data_T_s[i, :] + offsets[i])
 
-            #self.current_index = current_end_index
+class TelemetrySampler(QObject):
+    """Muestrea la telemetría de la adquisición una vez por segundo y la publica como texto."""
+    overlay_updated = pyqtSignal(str)
 
+    def __init__(self, monitor, interval=1000):
+        super().__init__()
+        self.monitor = monitor
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.sample)
+        self.interval = interval
+
+    def start(self):
+        self.monitor.sample() # Primera muestra de referencia
+        self.timer.start(self.interval)
+
+    def sample(self):
+        snapshot = self.monitor.sample()
+        if snapshot is not None:
+            self.overlay_updated.emit(self.monitor.format_overlay(snapshot))
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    sample_rate = 3300
+    # Procesos de análisis precargados: se calientan mientras arranca la adquisición
+    # Dos procesos listos: los análisis 1 y 2 se abren en paralelo
+    # Canales, frecuencia, ventana y precisión de los análisis desde acquisition.json
+    # o --canales=N --fs=HZ --tmax=S --precision=float32
+    config = AcquisitionConfig.load()
+    analysis_pool = AnalysisPool(min_workers=2, precision=config.precision)
+    analysis_pool.start()
+    app.aboutToQuit.connect(analysis_pool.shutdown)
+
+    # Backend de adquisición: la tarjeta NI por defecto, el dispositivo simulado con --simulado
+    # (también se puede elegir con la variable de entorno DAQ_BACKEND) o una grabación con
+    # --reproducir=archivo.bin|.csv a --velocidad=N veces el tiempo real (0 = lo más rápido posible)
+    replay_path = next((arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--reproducir=')), None)
+    if replay_path:
+        speed = next((float(arg.split('=', 1)[1]) for arg in sys.argv if arg.startswith('--velocidad=')), 1.0)
+        backend_name = daq_backend.ReplayBackend(replay_path, speed=speed)
+        # La frecuencia y los canales se toman de la grabación
+        config.sample_rate, config.channel_labels = backend_name.recording_info()
+        config.n_channels = len(config.channel_labels)
+    else:
+        backend_name = 'simulado' if '--simulado' in sys.argv else None
+    backend = daq_backend.get_backend(backend_name)
+    sample_rate = config.sample_rate
     #print("sample_rate inicial", sample_rate)
     samp_per_channel = sample_rate #cuántas muestras se almacenan en el buffer antes de que la aplicación las lea
     #print("samp_per_channel inicial", samp_per_channel)
-    tmax = 20
+    tmax = config.tmax
     #print("tmax inicial", tmax)
-    number_of_samples = tmax * sample_rate # Valor para 20s a una fs=3.3KHz
+    number_of_samples = config.number_of_samples # 20 s a 3.3 kHz con la configuración por defecto
     #print("number_of_samples inicial", number_of_samples)
     samp_per_iteration = int(number_of_samples/sample_rate) #Samples_per_channel
     #print("samp_per_iteration inicial", samp_per_iteration)
     tiempo = np.array(np.linspace(0, tmax, number_of_samples))
     #print(f"{len(tiempo)} tiempo inicial", tiempo)
 
-    window = VentanaPrincipal(number_of_samples, samp_per_iteration, tmax, tiempo, sample_rate)
-
-    # Inicializar semáforo y mutex
-    semaphore = QSemaphore(1)
-    mutex = QMutex()
-
-    # Pasar las instancias de semáforo y mutex a los hilos
-    thread_a = ThreadA(sample_rate, tmax, window.dev_name, number_of_samples, samp_per_iteration,
-                       semaphore, mutex, samp_per_channel, tiempo)
-    thread_pulse = PulseThread(window.dev_name)
-    hold_off_thread = Hold_off()
-    thread_index = Thread_index(sample_rate, number_of_samples, tmax)
-    save_thread = SaveThread()
-
-    thread_a.data_generated.connect(window.main_graph.update_plot)
-    hold_off_thread.hold_off_finished.connect(thread_a.update_hold_off)
+    window = VentanaPrincipal(number_of_samples, samp_per_iteration, tmax, tiempo, sample_rate, backend, config)
+
+    if '--proceso' in sys.argv:
+        # Adquisición y estimulación en un proceso aparte que escribe en memoria compartida;
+        # esta interfaz sólo lee el buffer, dibuja y guarda
+        acquisition_process = AcquisitionProcess(config.n_channels, sample_rate, tmax, samp_per_channel,
+                                                 window.dev_name, backend_name,
+                                                 config.envelope_params)
+        acquisition_process.start()
+        thread_index = thread_pulse = ProcessStimulation(acquisition_process)
+        thread_a = ProcessThreadA(acquisition_process, sample_rate, tmax, thread_index)
+        app.aboutToQuit.connect(thread_a.terminate)
+    else:
+        # La adquisición escribe en su buffer circular sin bloqueos; la gráfica y el guardado lo leen a su ritmo
+        thread_a = ThreadA(sample_rate, tmax, window.dev_name, number_of_samples, samp_per_iteration,
+                           samp_per_channel, tiempo, backend, config.n_channels, config.envelope_params)
+        thread_pulse = PulseThread(window.dev_name, backend)
+        thread_index = Thread_index(sample_rate, number_of_samples, tmax)
+    save_thread = SaveThread(thread_a.ring, config.channel_labels)
+
+    # La gráfica consulta el buffer circular a una tasa fija de cuadros (--fps=N, 30 por defecto)
+    window.main_graph.attach_ring(thread_a.ring)
+    fps = next((int(arg.split('=', 1)[1]) for arg in sys.argv if arg.startswith('--fps=')), 30)
+    render_scheduler = RenderScheduler(window.main_graph, fps)
+    # Telemetría de salud sobre la gráfica y en la bitácora rotativa logs/telemetry.log
+    telemetry.monitor.open_log(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'telemetry.log'))
+    telemetry.monitor.add_source('render_fps', lambda: render_scheduler.achieved_fps)
+    telemetry.monitor.add_source('render_fps_target', lambda: render_scheduler.fps)
+    telemetry.monitor.add_source('skipped_blocks', lambda: render_scheduler.coalesced_blocks)
+    telemetry.monitor.add_source('overruns', lambda: window.main_graph.reader.overruns + save_thread.reader.overruns)
+    telemetry.monitor.add_source('lost_samples', lambda: window.main_graph.reader.lost_samples
+                                 + save_thread.reader.lost_samples
+                                 + getattr(thread_a.task, 'dropped_samples', 0))
+    telemetry.monitor.add_source('save_queue', lambda: save_thread.recorder.queue.qsize() if save_thread.recorder else 0)
+    telemetry.monitor.add_source('save_dropped', lambda: save_thread.recorder.dropped_blocks if save_thread.recorder else 0)
+    telemetry_sampler = TelemetrySampler(telemetry.monitor)
+    telemetry_sampler.overlay_updated.connect(window.main_graph.update_stats_text)
     thread_index.crosses_detected.connect(window.update_lcd)
     thread_a.cross_x_up.connect(window.main_graph.update_x_up)
     thread_a.cross_x_down.connect(window.main_graph.update_x_down)
@@ -1577,6 +1895,10 @@ if __name__ == "__main__":
 
     thread_a.start()
     thread_index.start()
+    # Los pulsos se generan desde un hilo de máxima prioridad con las tareas digitales ya abiertas
+    thread_pulse.start(QThread.Priority.TimeCriticalPriority)
+    render_scheduler.start()
+    telemetry_sampler.start()
 
     window.show()
     app.exec()
@@ -4,13 +4,15 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 from PyQt6.QtCore import Qt
-from PyQt6.uic import loadUi
-from matplotlib import pyplot as plt
+from startup import lazy_import, load_ui
+plt = lazy_import('matplotlib.pyplot')
 from PyQt6 import QtCore
 from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
 import pyqtgraph as pg
-from scipy.signal import lfilter, butter, filtfilt
+butter, filtfilt = lazy_import('scipy.signal', 'butter', 'filtfilt')
+from precision import lfilter
 import csv
+from lazy_recording import open_recording
 
 
 class MainWindow(QMainWindow):
@@ -29,7 +31,7 @@ class MainWindow(QMainWindow):
 
         super().__init__()
         # Carga el archivo de interfaz de usuario .ui generado con Qt Designer
-        loadUi('RECT_E_INT_GUI_con_HP.ui', self)
+        load_ui('RECT_E_INT_GUI_con_HP.ui', self)
 
         # Configuración del widget central y layout
         central_widget = QWidget()
@@ -171,8 +173,8 @@ class MainWindow(QMainWindow):
         # Configuración inicial de variables
         self.ruta_archivo = archivo
         self.carpeta_datos = os.path.dirname(self.ruta_archivo)  # Extrae la carpeta del archivo de datos
-        self.data = pd.read_csv(self.ruta_archivo)  # Lee los datos del archivo CSV
-        self.data_copy = pd.read_csv(self.ruta_archivo)  # Crea una copia de los datos
+        self.data = open_recording(self.ruta_archivo)  # Abre el archivo; cada columna se lee al usarla
+        self.data_copy = self.data.copy()  # Copia de los datos; guarda sólo las columnas reemplazadas
         self.time = self.data['TIME'].to_numpy()  # Extrae la columna de tiempo
         self.stim_plot_1 = self.data['STIM 1'].to_numpy()  # Extrae la columna de estimulación 1
         self.stim_plot_2 = self.data['STIM 2'].to_numpy()  # Extrae la columna de estimulación 2
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+from precision import PRECISIONS
+
+
+# Valores de la configuración original: 12 canales de EMG + TAG OUT a 3.3 kHz con ventana de 20 s
+DEFAULT_CONFIG = {
+    'n_channels': 13,
+    'sample_rate': 3300,
+    'tmax': 20,
+    'tag_out': True, # El último canal es la copia de la salida de estímulo (TAG OUT)
+    'channel_labels': None, # Etiquetas propias; si no se dan se generan como CH 1..CH N
+    'envelope_hp_cutoff': 10.0, # Pasa-altas de la envolvente en vivo [Hz] (0 lo desactiva)
+    'envelope_time_constant': 0.05, # Constante de tiempo del integrador de la envolvente [s]
+    'snapshot_seconds': 10, # Segundos recientes que congela una instantánea para los análisis
+    'precision': 'float64', # Tipo de dato de los análisis: 'float32' usa la mitad de memoria (ver precision.py)
+}
+
+# Colores de los 13 canales originales; los canales adicionales toman colores de una paleta
+CHANNEL_COLORS = ['#23BAC4', '#DAA520', '#E69DFB', '#F08080', '#FF0000', '#00FF00', '#7FFFD4', '#FF9900',
+                  '#DA70D6', '#E7D40A', '#F08080', '#FF689D', '#FFFFFF']
+
+
+class AcquisitionConfig:
+    """Número de canales, frecuencia de muestreo y ventana de la adquisición en vivo.
+
+    Se lee de `acquisition.json` (si existe) y se puede sobreescribir desde la línea de comandos con
+    `--canales=N`, `--fs=HZ`, `--tmax=S` y `--precision=float32`. Los buffers de adquisición, gráfica y guardado se
+    dimensionan a partir de estos valores."""
+
+    def __init__(self, n_channels=13, sample_rate=3300, tmax=20, tag_out=True, channel_labels=None,
+                 envelope_hp_cutoff=10.0, envelope_time_constant=0.05, snapshot_seconds=10, precision='float64'):
+        if n_channels < 1:
+            raise ValueError("Se necesita al menos un canal")
+        if sample_rate <= 0 or tmax <= 0:
+            raise ValueError("La frecuencia de muestreo y la ventana deben ser positivas")
+        if precision not in PRECISIONS:
+            raise ValueError(f"Precisión desconocida: {precision} (opciones: {', '.join(PRECISIONS)})")
+        self.n_channels = int(n_channels)
+        self.sample_rate = int(sample_rate)
+        self.tmax = tmax
+        self.tag_out = tag_out
+        if channel_labels is None:
+            channel_labels = [f'CH {i + 1}' for i in range(self.n_channels)]
+            if tag_out:
+                channel_labels[-1] = 'TAG OUT'
+        if len(channel_labels) != self.n_channels:
+            raise ValueError(f"Se dieron {len(channel_labels)} etiquetas para {self.n_channels} canales")
+        self.channel_labels = list(channel_labels)
+        self.envelope_hp_cutoff = envelope_hp_cutoff
+        self.envelope_time_constant = envelope_time_constant
+        self.snapshot_seconds = snapshot_seconds
+        self.precision = precision
+
+    @property
+    def envelope_params(self):
+        """Parámetros para `StreamingEnvelope`."""
+        return {'hp_cutoff': self.envelope_hp_cutoff, 'time_constant': self.envelope_time_constant}
+
+    @property
+    def number_of_samples(self):
+        return int(self.tmax * self.sample_rate)
+
+    @property
+    def channel_colors(self):
+        """Un color por canal; repite la paleta original y agrega tonos distribuidos para más canales."""
+        colors = CHANNEL_COLORS[:self.n_channels]
+        extra = self.n_channels - len(colors)
+        for i in range(extra):
+            hue = (i * 0.618034) % 1.0 # Paso de la razón áurea: tonos bien separados entre sí
+            r, g, b = hsv_to_rgb(hue, 0.6, 1.0)
+            colors.append(f'#{r:02X}{g:02X}{b:02X}')
+        return colors
+
+    @classmethod
+    def load(cls, path='acquisition.json', argv=None):
+        """Combina los valores por defecto, el archivo de configuración y los argumentos de la línea de comandos."""
+        values = dict(DEFAULT_CONFIG)
+        if path and os.path.exists(path):
+            with open(path) as config_file:
+                values.update(json.load(config_file))
+        flags = {'--canales=': ('n_channels', int), '--fs=': ('sample_rate', int), '--tmax=': ('tmax', float),
+                 '--precision=': ('precision', str)}
+        for arg in (sys.argv if argv is None else argv):
+            for flag, (key, cast) in flags.items():
+                if arg.startswith(flag):
+                    values[key] = cast(arg[len(flag):])
+        if values['channel_labels'] is not None and len(values['channel_labels']) != values['n_channels']:
+            # Las etiquetas del archivo no aplican si el número de canales cambió desde la línea de comandos
+            values['channel_labels'] = None
+        return cls(**values)
+
+
+def hsv_to_rgb(h, s, v):
+    i = int(h * 6) % 6
+    f = h * 6 - int(h * 6)
+    p, q, t = v * (1 - s), v * (1 - f * s), v * (1 - (1 - f) * s)
+    r, g, b = [(v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q)][i]
+    return round(r * 255), round(g * 255), round(b * 255)
+
+
+def scaling_benchmark(channel_counts=(13, 16, 32, 64), sample_rates=(3300, 10000, 20000), duration=2.0,
+                      tmax=20, realtime=True):
+    """Mide la ruta de adquisición completa para cada combinación canales x frecuencia.
+
+    Con el dispositivo simulado ejecuta el mismo lazo que ThreadA (bloque adaptativo, lectura al buffer
+    circular, detección de cruces) más el trabajo que la gráfica y el guardado hacen sobre cada bloque
+    (decimación min/max y conversión a float32). Devuelve una lista de diccionarios con muestras
+    perdidas, backlog máximo y la fracción del tiempo real que ocupa el lazo (carga)."""
+    from daq_backend import SimulatedBackend
+    from ring_buffer import RingBuffer
+    from block_size import BlockSizeController
+    from cross_detector import CrossDetector
+    from decimation import MinMaxDecimator
+
+    results = []
+    for n_channels in channel_counts:
+        for sample_rate in sample_rates:
+            config = AcquisitionConfig(n_channels, sample_rate, tmax)
+            backend = SimulatedBackend(realtime=realtime)
+            task = backend.open_ai_task(backend.list_devices()[0][0], n_channels, sample_rate, sample_rate)
+            task.start()
+            ring = RingBuffer(n_channels, config.number_of_samples)
+            block_control = BlockSizeController(sample_rate)
+            detector = CrossDetector(threshold=1.0)
+            tiempo = np.linspace(0, tmax, config.number_of_samples)
+            decimator = MinMaxDecimator(n_channels, config.number_of_samples, 2000, tiempo)
+
+            total_samples = int(duration * sample_rate)
+            busy = 0.0 # Tiempo de procesamiento, sin contar la espera a que la tarjeta tenga datos
+            max_backlog = 0
+            crosses = 0
+            t_start = time.perf_counter()
+            while task.samples_generated < total_samples:
+                backlog = task.available()
+                max_backlog = max(max_backlog, backlog)
+                start, n = ring.read_from(task, block_control.next_block(backlog))
+                t_block = time.perf_counter()
+                ups, _ = detector.process(ring.view(start, n)[0])
+                crosses += len(ups)
+                ring.commit(n)
+                decimator.update(ring.data, start, n)
+                np.ascontiguousarray(np.vstack((ring.view(start, n), ring.events[:, start:start + n])).T,
+                                     dtype=np.float32)
+                busy += time.perf_counter() - t_block
+            elapsed = time.perf_counter() - t_start
+
+            stats = backend.stats()
+            results.append({
+                'n_channels': n_channels,
+                'sample_rate': sample_rate,
+                'samples_read': stats['samples_read'],
+                'dropped_samples': stats['dropped_samples'],
+                'max_backlog': max_backlog,
+                'crosses': crosses,
+                'load': busy / elapsed if elapsed > 0 else 0.0,
+                'throughput_samples_s': stats['samples_read'] * n_channels / elapsed if elapsed > 0 else 0.0,
+                'memory_mb': (ring.data.nbytes + ring.events.nbytes) / 1e6,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    # Uso: python acquisition_config.py [segundos] [--rapido]
+    duration = next((float(arg) for arg in sys.argv[1:] if not arg.startswith('--')), 2.0)
+    realtime = '--rapido' not in sys.argv
+    start = time.perf_counter()
+    print(f"{'canales':>8}{'fs [Hz]':>9}{'perdidas':>10}{'backlog':>9}{'carga':>8}{'muestras/s':>14}{'buffer MB':>11}")
+    for result in scaling_benchmark(duration=duration, realtime=realtime):
+        print(f"{result['n_channels']:>8}{result['sample_rate']:>9}{result['dropped_samples']:>10}"
+              f"{result['max_backlog']:>9}{result['load']:>8.1%}{result['throughput_samples_s']:>14.0f}"
+              f"{result['memory_mb']:>11.1f}")
+    print(f"Total: {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,327 @@
+import os
+import sys
+import time
+import queue
+import threading
+import multiprocessing as mp
+import daq_backend
+import latency
+import telemetry
+from shared_ring import SharedRingBuffer
+from block_size import BlockSizeController
+from cross_detector import CrossDetector
+from stimulation import PulseEngine, DEVICE_CHANNELS, build_stim_table
+from envelope import StreamingEnvelope
+
+
+class AcquisitionWorker:
+    """Adquisición, detección de cruces y estimulación dentro del proceso hijo.
+
+    Hace el mismo trabajo que ThreadA + Thread_index + PulseThread, pero en un intérprete propio:
+    el trabajo pesado de la interfaz (gráfica, cambio de ventana, análisis) no compite por el GIL con
+    la lectura de la tarjeta. Las muestras y las marcas de guardado se escriben en el buffer circular
+    compartido; los cruces y los estímulos se informan a la interfaz por la cola de eventos y la
+    configuración llega por la cola de control."""
+
+    def __init__(self, ring_name, n_channels, sample_rate, tmax, samp_per_channel, dev_name, backend_name,
+                 envelope_params, control, events):
+        self.control = control
+        self.events = events
+        self.dev_name = dev_name
+        self.n_channels = n_channels
+        self.sample_rate = sample_rate
+        self.samp_per_channel = samp_per_channel
+        self.tmax = tmax
+        self.number_of_samples = int(tmax * sample_rate)
+        self.backend = daq_backend.get_backend(backend_name)
+        self.ring = SharedRingBuffer(ring_name, n_channels, self.number_of_samples, create=True, envelope=True)
+        self.envelope = StreamingEnvelope(n_channels, sample_rate, **(envelope_params or {}))
+        self.detect_on_envelope = False
+        self.block_control = BlockSizeController(sample_rate)
+        self.detector = CrossDetector()
+        self.hold_off_time = 0
+        self.data_p_index = 0
+        self.save_data_active = False
+        self.running = True
+
+        # Estado de la estimulación (equivalente a Thread_index)
+        self.crosses_count = 0
+        self.crosses_count_max = 0
+        self.estimuladores_botones_activos = {1: [], 2: [], 3: []}
+        self.stim_table = build_stim_table(self.estimuladores_botones_activos, 0)
+        self.stim_apply = [False, False, False]
+        self.delay_time = 0
+        self.pulse_engine = PulseEngine(self.backend, dev_name)
+        self.pending_events = [] # Eventos del bloque actual; se envían juntos a la interfaz
+        self.report_interval = 0.5 # Periodo de envío de la telemetría y las latencias a la interfaz [s]
+
+        self.commands = {
+            'threshold': self.set_threshold,
+            'hysteresis_up': self.set_hysteresis_up,
+            'hysteresis_down': self.set_hysteresis_down,
+            'hold_off': self.set_hold_off_time,
+            'channel': self.set_data_p_index,
+            'window': self.set_number_of_samples,
+            'sample_rate': self.set_sample_rate,
+            'save_active': self.set_save_data_active,
+            'reset_flags': lambda _: self.detector.reset(),
+            'envelope_detect': self.set_detect_on_envelope,
+            'delay': self.set_delay_time,
+            'crosses_max': self.set_crosses_max,
+            'stims': self.set_stims,
+            'stim_apply': self.set_stim_apply,
+            'crosses_count': self.set_crosses_count,
+            'stop': self.stop,
+        }
+
+    # Comandos de la interfaz
+    def set_threshold(self, value):
+        self.detector.threshold = value
+
+    def set_hysteresis_up(self, value):
+        self.detector.hysteresis_up = value
+
+    def set_hysteresis_down(self, value):
+        self.detector.hysteresis_down = value
+
+    def set_hold_off_time(self, hold_off_time):
+        self.hold_off_time = hold_off_time
+        self.detector.hold_off_samples = round(hold_off_time * self.sample_rate)
+
+    def set_data_p_index(self, index):
+        self.data_p_index = index
+
+    def set_number_of_samples(self, tmax):
+        self.tmax = tmax
+        self.number_of_samples = int(tmax * self.sample_rate)
+        self.ring.resize(self.number_of_samples)
+        self.detector.reset()
+
+    def set_sample_rate(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.samp_per_channel = sample_rate
+        self.block_control.set_sample_rate(sample_rate)
+        self.envelope.configure(sample_rate)
+        self.set_hold_off_time(self.hold_off_time)
+        self.set_number_of_samples(self.tmax)
+
+    def set_detect_on_envelope(self, active):
+        self.detect_on_envelope = active
+        self.detector.reset()
+
+    def set_save_data_active(self, active):
+        self.save_data_active = active
+
+    def set_delay_time(self, delay_time):
+        self.delay_time = delay_time
+        self.pulse_engine.delay_time = delay_time
+
+    def set_crosses_max(self, crosses_count_max):
+        self.crosses_count_max = crosses_count_max
+        self.stim_table = build_stim_table(self.estimuladores_botones_activos, crosses_count_max)
+
+    def set_stims(self, estimuladores_botones_activos):
+        self.estimuladores_botones_activos = estimuladores_botones_activos
+        self.stim_table = build_stim_table(estimuladores_botones_activos, self.crosses_count_max)
+
+    def set_stim_apply(self, stim_apply):
+        self.stim_apply = list(stim_apply)
+
+    def set_crosses_count(self, crosses_count):
+        self.crosses_count = crosses_count
+
+    def stop(self, _=None):
+        self.running = False
+
+    def handle_commands(self):
+        """Aplica los comandos pendientes sin bloquear el lazo de adquisición."""
+        while True:
+            try:
+                command, value = self.control.get_nowait()
+            except queue.Empty:
+                return
+            self.commands[command](value)
+
+    # Lazo de adquisición
+    def run(self):
+        pulse_thread = threading.Thread(target=self.pulse_engine.serve, name='Pulsos', daemon=True)
+        pulse_thread.start()
+        try:
+            if self.dev_name is None:
+                raise ValueError("No DAQ device specified.")
+            task = self.backend.open_ai_task(self.dev_name, self.n_channels, self.sample_rate, self.samp_per_channel)
+        except (self.backend.DaqError, ValueError) as e:
+            self.events.put([('error', str(e))])
+            self.shutdown(pulse_thread)
+            return
+        self.envelope.design()
+        self.events.put([('ready', self.ring.name)])
+        next_report = time.perf_counter() + self.report_interval
+
+        try:
+            while self.running:
+                self.handle_commands()
+                backlog = task.available()
+                telemetry.monitor.record_loop(backlog)
+                start, n = self.ring.read_from(task, self.block_control.next_block(backlog))
+                read_time = time.perf_counter()
+                block = self.ring.view(start, n)
+                envelope_block = self.ring.envelope[:, start:start + n]
+                if self.detect_on_envelope:
+                    self.envelope.process(block, out=envelope_block)
+                    ups, downs = self.detector.process(envelope_block[self.data_p_index])
+                else:
+                    ups, downs = self.detector.process(block[self.data_p_index])
+                # Los eventos llevan el índice en el buffer y la muestra absoluta desde el inicio
+                first_sample = self.ring.write_count
+                for index in ups:
+                    self.process_cross(start + index, read_time, first_sample + index)
+                for index in downs:
+                    value_down = start + index
+                    self.pending_events.append(('down', value_down, first_sample + index))
+                    self.ring.events[1, value_down] = 1
+                if not self.detect_on_envelope:
+                    # Los pulsos ya se programaron: la envolvente no retrasa la estimulación
+                    self.envelope.process(block, out=envelope_block)
+                self.ring.commit(n)
+                telemetry.monitor.report_cpu('adquisición')
+                if read_time >= next_report:
+                    # La interfaz suma estos resúmenes a sus monitores (superposición, panel, _latency.json)
+                    next_report = read_time + self.report_interval
+                    self.pending_events.append(('telemetry',) + telemetry.monitor.drain_loops())
+                    self.pending_events.append(('latency', latency.monitor.drain()))
+                if self.pending_events:
+                    self.events.put(self.pending_events)
+                    self.pending_events = []
+        except EOFError:
+            # Terminó una grabación reproducida sin repetición (daq_backend.ReplayBackend)
+            self.events.put([('end', self.ring.write_count)])
+
+        task.close()
+        self.shutdown(pulse_thread)
+
+    def process_cross(self, value_up, read_time, sample):
+        """Cruce ascendente: cuenta el ciclo, resuelve los estimuladores y programa los pulsos."""
+        start_time = time.perf_counter()
+        latency.monitor.record_detection(read_time, start_time)
+        events = self.ring.events
+        events[0, value_up] = 1
+
+        if self.crosses_count >= self.crosses_count_max:
+            self.crosses_count = 0
+        self.crosses_count += 1
+        self.pending_events.append(('up', value_up, sample))
+        self.pending_events.append(('count', self.crosses_count))
+
+        capacity = self.ring.capacity
+        index_t = (value_up + round(self.delay_time * self.sample_rate)) % capacity
+        for stim_number, vector in self.estimuladores_botones_activos.items():
+            if any(vector):
+                events[1 + stim_number, index_t] = 1
+
+        mask = self.stim_table[self.crosses_count] if self.crosses_count < len(self.stim_table) else 0
+        decision_time = time.perf_counter()
+        latency.monitor.record_decision(start_time, decision_time)
+        for stim_number in (1, 2, 3):
+            if mask & (1 << (stim_number - 1)):
+                if self.stim_apply[stim_number - 1]:
+                    self.pulse_engine.send_ttl_pulse(DEVICE_CHANNELS[stim_number - 1], start_time, read_time,
+                                                     decision_time)
+                    mark = 2
+                else:
+                    mark = 1.5
+                events[1 + stim_number, index_t] = mark
+                self.pending_events.append(('tag', stim_number, index_t))
+
+    def shutdown(self, pulse_thread):
+        self.pulse_engine.stop()
+        pulse_thread.join(timeout=1.0)
+        self.ring.close()
+
+
+def run_worker(*args):
+    """Punto de entrada del proceso de adquisición."""
+    AcquisitionWorker(*args).run()
+
+
+class AcquisitionProcess:
+    """Lado de la interfaz del proceso de adquisición: lo arranca, le envía comandos y recibe eventos.
+
+    El buffer circular compartido se abre en modo lectura con el nombre que anuncia el proceso hijo,
+    así que la gráfica y el guardado lo leen con los mismos `RingReader` que en el modo de hilos."""
+
+    def __init__(self, n_channels, sample_rate, tmax, samp_per_channel, dev_name, backend_name=None,
+                 envelope_params=None):
+        context = mp.get_context('spawn') # Igual en Windows y Linux: el hijo no hereda el estado de Qt
+        self.control = context.Queue()
+        self.events = context.Queue()
+        ring_name = f'nmsig_{os.getpid()}'
+        self.process = context.Process(target=run_worker, name='Adquisicion', daemon=True,
+                                       args=(ring_name, n_channels, sample_rate, tmax, samp_per_channel,
+                                             dev_name, backend_name, envelope_params, self.control, self.events))
+        self.ring = None
+        self.backlog_events = [] # Eventos recibidos antes de que la interfaz empiece a consultarlos
+
+    def start(self, timeout=10.0):
+        """Arranca el proceso y espera a que el buffer compartido esté listo."""
+        self.process.start()
+        deadline = time.monotonic() + timeout
+        while self.ring is None:
+            try:
+                batch = self.events.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                if time.monotonic() >= deadline or not self.process.is_alive():
+                    raise RuntimeError("El proceso de adquisición no respondió")
+                continue
+            for event in batch:
+                if event[0] == 'ready':
+                    self.ring = SharedRingBuffer(event[1])
+                elif event[0] == 'error':
+                    raise daq_backend.DaqError(event[1])
+                else:
+                    self.backlog_events.append(event)
+
+    def send(self, command, value=None):
+        self.control.put((command, value))
+
+    def poll_events(self):
+        """Devuelve los eventos (cruces, conteo, estímulos) llegados desde la última consulta."""
+        events, self.backlog_events = self.backlog_events, []
+        while True:
+            try:
+                events.extend(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def stop(self, timeout=2.0):
+        if self.process.is_alive():
+            self.send('stop')
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+if __name__ == "__main__":
+    # Prueba con el dispositivo simulado: python acquisition_process.py [segundos]
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    acquisition = AcquisitionProcess(13, 3300, 20, 3300, 'SimDev1', 'simulado')
+    acquisition.start()
+    acquisition.send('threshold', 1.0)
+    acquisition.send('crosses_max', 2)
+    acquisition.send('stims', {1: [1], 2: [2], 3: []})
+    acquisition.send('stim_apply', (True, True, False))
+    reader = acquisition.ring.reader()
+    counts = {}
+    received = 0
+    t_end = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        time.sleep(0.05)
+        received += sum(n for _, n in reader.poll())
+        for event in acquisition.poll_events():
+            counts[event[0]] = counts.get(event[0], 0) + 1
+    print(f"muestras leídas del buffer compartido: {received} ({received / seconds:.0f}/s)")
+    print(f"eventos: {counts}, desbordes del lector: {reader.overruns}")
+    acquisition.stop()
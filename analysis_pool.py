@@ -0,0 +1,243 @@
+import os
+import sys
+import time
+import queue
+import logging
+import importlib
+import threading
+import traceback
+import itertools
+import multiprocessing as mp
+from concurrent.futures import Future, ThreadPoolExecutor
+import recording_cache
+import startup
+import precision
+
+
+# Carpeta de los scripts de análisis y de sus archivos .ui (load_ui usa rutas relativas)
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos de análisis que abre PRINCIPAL; todos exponen MainWindow(archivo, channel_colors, stim_colors, values)
+ANALYSIS_MODULES = ['BINS', 'DURACIÓN_CICLO_Y_FASES_2', 'FFT', 'Autocorrelation', 'Pearson_Correlation', 'STA',
+                    'Cross_wavelet', 'Coherence_wavelet', 'CXWT', 'PCA_', 'RECT_E_INT_con_HP', 'Read_ATF']
+
+# Módulos que reciben el archivo original (Read_ATF convierte un .atf, no lee una grabación)
+RAW_INPUT_MODULES = {'Read_ATF'}
+
+
+def analysis_worker(jobs, results, preload, precision_name='float64'):
+    """Proceso del pool: importa de antemano Qt y los módulos de análisis y abre una ventana por trabajo.
+
+    Corre su propio QApplication; los trabajos llegan por la cola `jobs` y se atienden desde un
+    temporizador, así que las ventanas que ya están abiertas siguen respondiendo. `None` pide terminar:
+    el proceso sale en cuanto se cierra su última ventana.
+
+    Los módulos de análisis importan sus bibliotecas pesadas al primer uso, así que el proceso avisa
+    que está listo en cuanto los importa y después calienta matplotlib, scipy, pywt y sklearn; un
+    trabajo que llegue antes sólo espera la parte que necesita.
+
+    Todos los análisis del proceso corren en la precisión `precision_name` (ver `precision`)."""
+    os.chdir(ANALYSIS_DIR)
+    precision.set_precision(precision_name)
+    sys.path.insert(0, ANALYSIS_DIR)
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QTimer, Qt
+
+    app = QApplication([sys.argv[0]])
+    app.setQuitOnLastWindowClosed(False)
+    def warm(names):
+        for name in names:
+            try:
+                startup.timed_import(name)
+            except Exception as e:
+                logging.error(f'No se pudo precargar {name}: {e}')
+
+    warm(preload)
+    windows = {}
+    state = {'closing': False}
+
+    def window_closed(job_id):
+        windows.pop(job_id, None)
+        results.put(('cerrada', job_id, os.getpid()))
+        if state['closing'] and not windows:
+            app.quit()
+
+    def poll_jobs():
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is None:
+                state['closing'] = True
+                if not windows:
+                    app.quit()
+                return
+            job_id, module_name, archivo, channel_colors, stim_colors, values, submitted = job
+            try:
+                module = importlib.import_module(module_name)
+                window = module.MainWindow(archivo, channel_colors, stim_colors, values)
+                window.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+                window.destroyed.connect(lambda _=None, job_id=job_id: window_closed(job_id))
+                window.show()
+                windows[job_id] = window
+                results.put(('abierta', job_id, os.getpid(), time.time() - submitted))
+            except Exception:
+                results.put(('error', job_id, os.getpid(), traceback.format_exc()))
+
+    timer = QTimer()
+    timer.timeout.connect(poll_jobs)
+    timer.start(20)
+    results.put(('lista', None, os.getpid()))
+
+    def warm_heavy():
+        warm(startup.HEAVY_MODULES)
+        print(f'Importaciones del proceso de análisis {os.getpid()}:\n{startup.report()}')
+
+    QTimer.singleShot(0, warm_heavy)
+    app.exec()
+
+
+class AnalysisPool:
+    """Pool de procesos precalentados que abren las ventanas de análisis.
+
+    Cada proceso ya importó PyQt6, pandas, scipy, matplotlib, pywt, sklearn y los módulos de análisis,
+    así que abrir un análisis sólo cuesta leer el archivo y construir la ventana (con su interfaz
+    compilada, ver `startup.load_ui`). `submit` regresa
+    de inmediato (la interfaz principal no se bloquea) y el trabajo va al proceso con menos ventanas
+    abiertas. Si todos tienen ventanas abiertas se arranca otro, hasta `max_workers`, para que
+    siempre haya uno libre y varios análisis corran en paralelo.
+
+    Un CSV se decodifica una sola vez (en un hilo, sin bloquear la interfaz) a su caché de columnas
+    (`recording_cache`), que todos los análisis de ese archivo abren como memmaps desde `load_table`;
+    la caché se reutiliza mientras el CSV no cambie de tamaño ni de fecha. El estado de cada trabajo (decodificando, en cola, abierta, cerrada
+    o error) queda en `status` para mostrarlo en la ventana principal. Con `precision='float32'` los
+    procesos leen, filtran y transforman las señales en float32/complex64."""
+
+    def __init__(self, min_workers=2, max_workers=4, preload=ANALYSIS_MODULES, precision='float64'):
+        self.context = mp.get_context('spawn') # Igual en Windows y Linux: el hijo no hereda el estado de Qt
+        self.min_workers = min_workers
+        self.max_workers = max(max_workers, min_workers)
+        self.preload = list(preload)
+        self.precision = precision
+        self.results = self.context.Queue()
+        self.workers = [] # Diccionarios con el proceso, su cola de trabajos y sus ventanas abiertas
+        self.job_ids = itertools.count(1)
+        self.jobs = {} # Trabajos enviados: id -> (módulo, pid del proceso)
+        self.status = {} # Estado de cada trabajo: id -> [módulo, estado]
+        self.decoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Decodificacion')
+        self.decoded = {} # (ruta, fecha, tamaño) del CSV -> Future que termina al escribir su caché
+        self.lock = threading.Lock()
+        self.collector = None
+
+    def start(self):
+        for _ in range(self.min_workers):
+            self.start_worker()
+        self.collector = threading.Thread(target=self.collect, name='AnalysisPool', daemon=True)
+        self.collector.start()
+
+    def start_worker(self):
+        jobs = self.context.Queue()
+        process = self.context.Process(target=analysis_worker, args=(jobs, self.results, self.preload, self.precision),
+                                       name='Analisis')
+        process.start()
+        worker = {'process': process, 'jobs': jobs, 'open': set(), 'ready': False}
+        self.workers.append(worker)
+        return worker
+
+    def worker_for(self, pid):
+        return next((worker for worker in self.workers if worker['process'].pid == pid), None)
+
+    def collect(self):
+        """Hilo que recibe el estado de los procesos (lista, ventana abierta o cerrada, error)."""
+        while True:
+            message = self.results.get()
+            kind, job_id, pid = message[:3]
+            with self.lock:
+                worker = self.worker_for(pid)
+                if worker is None:
+                    continue
+                if kind == 'lista':
+                    worker['ready'] = True
+                    continue
+                self.status[job_id][1] = kind
+                if kind == 'abierta':
+                    print(f"{self.jobs[job_id][0]} abierto en {message[3] * 1000:.0f} ms (proceso {pid})")
+                elif kind == 'cerrada' or kind == 'error':
+                    worker['open'].discard(job_id)
+                    if kind == 'error':
+                        logging.error(f'Error al abrir {self.jobs[job_id][0]}:\n{message[3]}')
+
+    def decoded_copy(self, archivo):
+        """Future de la caché de columnas de `archivo`; todos sus análisis esperan a la misma."""
+        key = tuple(recording_cache.source_key(archivo).values())
+        with self.lock:
+            future = self.decoded.get(key)
+            if future is None:
+                if recording_cache.find_cache(archivo) is not None:
+                    # Construida en una sesión anterior o al convertir la grabación a CSV
+                    future = Future()
+                    future.set_result(None)
+                else:
+                    future = self.decoder.submit(recording_cache.build, archivo)
+                self.decoded[key] = future
+        return future
+
+    def submit(self, module_name, archivo, channel_colors, stim_colors, values):
+        """Programa un análisis y regresa de inmediato con su id. Los parámetros viajan como texto, igual que por argv."""
+        job_id = next(self.job_ids)
+        job = (module_name, archivo, [str(c) for c in channel_colors], [str(c) for c in stim_colors],
+               [str(v) for v in values])
+        if module_name in RAW_INPUT_MODULES or os.path.splitext(archivo)[1].lower() != '.csv':
+            self.status[job_id] = [module_name, 'en cola']
+            self.dispatch(job_id, *job)
+            return job_id
+        # Los análisis del mismo CSV esperan a la misma decodificación y se despachan juntos al terminar
+        self.status[job_id] = [module_name, 'decodificando']
+        self.decoded_copy(archivo).add_done_callback(lambda future: self.dispatch_decoded(job_id, job, future))
+        return job_id
+
+    def dispatch_decoded(self, job_id, job, future):
+        # El análisis recibe la ruta del CSV (ahí guarda sus resultados) y `load_table` abre la caché;
+        # si el CSV tiene columnas de texto no hay caché y se lee directamente
+        if future.exception() is not None:
+            logging.error(f'No se pudo decodificar {job[1]}: {future.exception()}')
+        self.status[job_id][1] = 'en cola'
+        self.dispatch(job_id, *job)
+
+    def dispatch(self, job_id, module_name, archivo, channel_colors, stim_colors, values):
+        """Envía el trabajo al proceso menos ocupado; el número de procesos no pasa de `max_workers`."""
+        with self.lock:
+            self.workers = [worker for worker in self.workers if worker['process'].is_alive()]
+            worker = min(self.workers, key=lambda w: (len(w['open']), not w['ready']), default=None)
+            if worker is None:
+                worker = self.start_worker()
+            worker['open'].add(job_id)
+            self.jobs[job_id] = (module_name, worker['process'].pid)
+            # Se mantiene un proceso libre listo para el siguiente análisis
+            if all(w['open'] for w in self.workers) and len(self.workers) < self.max_workers:
+                self.start_worker()
+        worker['jobs'].put((job_id, module_name, archivo, channel_colors, stim_colors, values, time.time()))
+
+    def summary(self):
+        """Texto corto con los análisis que no se han cerrado y su estado."""
+        active = [f'{module} {state}' for module, state in list(self.status.values()) if state != 'cerrada']
+        return 'Análisis: ' + ' · '.join(active) if active else ''
+
+    def shutdown(self):
+        """Pide a los procesos que terminen; los que tienen ventanas abiertas salen al cerrarlas."""
+        self.decoder.shutdown(wait=False, cancel_futures=True)
+        for worker in self.workers:
+            if worker['process'].is_alive():
+                worker['jobs'].put(None)
+
+
+if __name__ == "__main__":
+    # Uso: python analysis_pool.py archivo.csv [MÓDULO ...]  (abre los análisis con los colores por defecto)
+    from acquisition_config import CHANNEL_COLORS
+    pool = AnalysisPool(min_workers=2)
+    pool.start()
+    for name in sys.argv[2:] or ['FFT']:
+        pool.submit(name, os.path.abspath(sys.argv[1]), CHANNEL_COLORS, ['#FFFF00', '#00FFFF', '#FF00FF', '#FFFFFF'],
+                    [0, 1.0, 0, 0, 0, 0])
+    pool.shutdown()
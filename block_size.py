@@ -0,0 +1,39 @@
+class BlockSizeController:
+    """Controlador adaptativo del número de muestras leídas en cada iteración de adquisición.
+
+    El tamaño base del bloque sale de la latencia objetivo del lazo (latencia x frecuencia de muestreo).
+    Si la tarjeta acumula muestras sin leer (backlog) el bloque crece de inmediato para vaciarlas;
+    cuando el backlog desaparece el bloque regresa poco a poco al tamaño base. El resultado siempre
+    queda entre `min_block` y `max_block`."""
+
+    def __init__(self, sample_rate, target_latency=0.005, min_block=20, max_latency=0.1, smoothing=0.25):
+        self.target_latency = target_latency # Latencia objetivo de cada iteración [s]
+        self.min_block = min_block # Tamaño mínimo del bloque [muestras]
+        self.max_latency = max_latency # Latencia máxima tolerada, define el bloque máximo [s]
+        self.smoothing = smoothing # Factor de suavizado al reducir el bloque (0-1)
+        self.set_sample_rate(sample_rate)
+
+    def set_sample_rate(self, sample_rate):
+        """Recalcula los límites del bloque para la nueva frecuencia de muestreo."""
+        self.sample_rate = sample_rate
+        self.max_block = max(int(self.max_latency * sample_rate), self.min_block)
+        self.base_block = self.clamp(int(self.target_latency * sample_rate))
+        self.block = self.base_block
+
+    def set_target_latency(self, target_latency):
+        self.target_latency = target_latency
+        self.base_block = self.clamp(int(target_latency * self.sample_rate))
+
+    def clamp(self, block):
+        return min(max(int(block), self.min_block), self.max_block)
+
+    def next_block(self, backlog):
+        """Devuelve el tamaño del siguiente bloque a partir de las muestras pendientes en la tarjeta."""
+        desired = max(self.base_block, backlog)
+        if desired >= self.block:
+            # Si el backlog crece se lee todo de una vez para no perder muestras
+            self.block = self.clamp(desired)
+        else:
+            # Cuando el backlog baja, el bloque se reduce gradualmente para no oscilar
+            self.block = self.clamp(self.block + self.smoothing * (desired - self.block))
+        return self.block
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class CrossDetector:
+    """Detector de cruces por umbral que evalúa cada muestra del bloque.
+
+    Un cruce ascendente ocurre en la primera muestra >= umbral + histéresis ascendente. A partir de
+    él corre el hold-off (contado en muestras) y después se busca el cruce descendente en la primera
+    muestra < umbral - histéresis descendente; entonces el detector vuelve a armarse. El estado se
+    conserva entre bloques, así que un cruce o un hold-off pueden empezar en un bloque y terminar en otro.
+
+    El costo por bloque es O(n + k log n) para k cruces: las máscaras se calculan una sola vez con numpy
+    y cada transición se resuelve con una búsqueda binaria sobre los índices candidatos."""
+
+    def __init__(self, threshold=0.0, hysteresis_up=0.0, hysteresis_down=0.0, hold_off_samples=0):
+        self.threshold = threshold # Umbral de detección
+        self.hysteresis_up = hysteresis_up # Histéresis para el cruce ascendente
+        self.hysteresis_down = hysteresis_down # Histéresis para el cruce descendente
+        self.hold_off_samples = hold_off_samples # Muestras a ignorar después de un cruce ascendente
+        self.reset()
+
+    def reset(self):
+        """Rearma el detector: el siguiente evento esperado es un cruce ascendente."""
+        self.waiting_down = False # True después de un cruce ascendente y hasta el descendente
+        self.hold_off_left = 0 # Muestras de hold-off que faltan por transcurrir
+
+    def process(self, data):
+        """Procesa un bloque de muestras y devuelve (ascendentes, descendentes) como índices dentro del bloque."""
+        n = len(data)
+        up_candidates = np.flatnonzero(data >= self.threshold + self.hysteresis_up)
+        down_candidates = np.flatnonzero(data < self.threshold - self.hysteresis_down)
+        ups = []
+        downs = []
+
+        # El hold-off pendiente del bloque anterior se consume antes de buscar nuevos cruces
+        position = min(self.hold_off_left, n)
+        self.hold_off_left -= position
+
+        while position < n:
+            candidates = down_candidates if self.waiting_down else up_candidates
+            k = np.searchsorted(candidates, position)
+            if k == len(candidates):
+                break
+            index = int(candidates[k])
+            if self.waiting_down:
+                downs.append(index)
+                self.waiting_down = False
+                position = index + 1
+            else:
+                ups.append(index)
+                self.waiting_down = True
+                position = index + 1 + self.hold_off_samples
+                if position > n:
+                    # El hold-off continúa en los bloques siguientes
+                    self.hold_off_left = position - n
+        return ups, downs
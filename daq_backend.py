@@ -0,0 +1,465 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+from ring_buffer import RingBuffer
+
+
+class DaqError(Exception):
+    """Error genérico de adquisición para los backends que no son nidaqmx."""
+
+
+class DAQBackend:
+    """Interfaz común de los backends de adquisición.
+
+    PRINCIPAL.py sólo habla con esta interfaz: listar dispositivos, abrir la tarea de entradas
+    analógicas y abrir las líneas digitales donde `stimulation.PulseEngine` genera los pulsos TTL."""
+    nombre = ''
+    DaqError = DaqError
+
+    def list_devices(self):
+        """Devuelve una lista de tuplas (nombre, modelo) con los dispositivos disponibles."""
+        raise NotImplementedError
+
+    def open_ai_task(self, dev_name, n_channels, sample_rate, samps_per_chan):
+        """Crea y configura la tarea de adquisición continua de `n_channels` entradas analógicas."""
+        raise NotImplementedError
+
+    def open_do_line(self, dev_name, device_channel):
+        """Abre una tarea persistente sobre la línea digital `device_channel` para generar pulsos."""
+        raise NotImplementedError
+
+
+class NIDAQTask:
+    """Envoltura de `nidaqmx.Task` para las entradas analógicas."""
+
+    def __init__(self, task, reader, n_channels):
+        self.task = task
+        self.reader = reader # AnalogMultiChannelReader sobre el flujo de entrada de la tarea
+        self.n_channels = n_channels
+        self.scratch = np.zeros((n_channels, 0)) # Buffer auxiliar para destinos no contiguos
+
+    def available(self):
+        """Número de muestras adquiridas por la tarjeta y aún no leídas."""
+        return self.task.in_stream.avail_samp_per_chan
+
+    def read_many_sample(self, data, number_of_samples_per_channel):
+        """Lee un bloque de muestras en `data` (canales x muestras), sin listas intermedias.
+
+        Sólo un destino contiguo se llena sin copia. Los bloques del buffer circular son rangos de
+        columnas (nunca contiguos), así que en la adquisición cada bloque pasa por el arreglo auxiliar:
+        `AnalogMultiChannelReader` siempre llena canal por canal y no puede escribir en un buffer
+        muestra por muestra."""
+        n = number_of_samples_per_channel
+        if data.flags.c_contiguous and data.dtype == np.float64:
+            return self.reader.read_many_sample(data, number_of_samples_per_channel=n)
+        # El lector de nidaqmx exige memoria contigua: el bloque se lee en un arreglo preasignado
+        # y luego se copia en su lugar (una copia de canales x n por lectura)
+        if self.scratch.shape[1] < n:
+            self.scratch = np.zeros((self.n_channels, n))
+        block = self.scratch[:, :n]
+        read = self.reader.read_many_sample(block, number_of_samples_per_channel=n)
+        np.copyto(data, block)
+        return read
+
+    def read(self, number_of_samples_per_channel):
+        """Lee un bloque de muestras y lo devuelve como un arreglo (canales x muestras)."""
+        data = np.zeros((self.n_channels, number_of_samples_per_channel))
+        self.read_many_sample(data, number_of_samples_per_channel)
+        return data
+
+    def close(self):
+        self.task.close()
+
+
+class NIDAQDOLine:
+    """Tarea de salida digital que permanece abierta durante toda la sesión."""
+
+    def __init__(self, task):
+        self.task = task
+
+    def pulse(self):
+        self.task.write(True, timeout=0.00001)
+        self.task.write(False, timeout=0.00001)
+
+    def close(self):
+        self.task.close()
+
+
+class NIDAQBackend(DAQBackend):
+    """Backend para las tarjetas de National Instruments a través de nidaqmx."""
+    nombre = 'nidaqmx'
+
+    def __init__(self):
+        # Se importa aquí para que el backend simulado funcione sin los controladores de NI instalados
+        import nidaqmx
+        import nidaqmx.system
+        import nidaqmx.stream_readers
+        self.nidaqmx = nidaqmx
+        self.DaqError = nidaqmx.errors.DaqError
+
+    def list_devices(self):
+        system = self.nidaqmx.system.System.local()
+        return [(device.name, device.product_type) for device in system.devices]
+
+    def open_ai_task(self, dev_name, n_channels, sample_rate, samps_per_chan):
+        task = self.nidaqmx.Task()
+        try:
+            task.ai_channels.add_ai_voltage_chan(f"{dev_name}/ai0:{n_channels - 1}", min_val=-10.0, max_val=10.0)
+            # Configura la frecuencia de muestreo y el modo de adquisición continua
+            task.timing.cfg_samp_clk_timing(rate=sample_rate,
+                                            sample_mode=self.nidaqmx.constants.AcquisitionType.CONTINUOUS,
+                                            samps_per_chan=samps_per_chan)
+        except Exception:
+            task.close()
+            raise
+        reader = self.nidaqmx.stream_readers.AnalogMultiChannelReader(task.in_stream)
+        return NIDAQTask(task, reader, n_channels)
+
+    def open_do_line(self, dev_name, device_channel):
+        task = self.nidaqmx.Task()
+        try:
+            task.do_channels.add_do_chan(f"{dev_name}/{device_channel}")
+            # Se arranca una sola vez para que cada escritura no tenga que iniciar y detener la tarea
+            task.start()
+        except Exception:
+            task.close()
+            raise
+        return NIDAQDOLine(task)
+
+
+class SimulatedAITask:
+    """Tarea analógica simulada que genera EMG/ENG sintético con ráfagas rítmicas.
+
+    La señal es determinista: depende sólo de la semilla y del índice absoluto de la muestra,
+    no del tamaño de los bloques leídos. En modo `realtime` la tarea avanza con el reloj de pared
+    como lo haría la tarjeta; si el lector se atrasa más que el buffer del dispositivo
+    (`samps_per_chan`), las muestras más antiguas se descartan y se cuentan en `dropped_samples`.
+    Sin `realtime` las muestras se generan tan rápido como se pidan (útil para medir throughput)."""
+
+    def __init__(self, n_channels, sample_rate, samps_per_chan, realtime=True, seed=0,
+                 burst_period=1.0, burst_duty=0.4, burst_amp=2.0, noise_amp=0.05):
+        self.n_channels = n_channels
+        self.sample_rate = sample_rate
+        self.buffer_size = max(int(samps_per_chan), 1)
+        self.realtime = realtime
+        self.burst_period = burst_period
+        self.burst_duty = burst_duty
+        self.burst_amp = burst_amp
+        self.noise_amp = noise_amp
+        self.rng = np.random.default_rng(seed)
+
+        # Fase de cada canal: los canales pares e impares se alternan (flexor / extensor)
+        self.phases = (np.arange(n_channels) % 2) * 0.5 + np.arange(n_channels) * 0.01
+
+        self.samples_generated = 0 # Índice absoluto de la siguiente muestra a entregar (incluye las perdidas)
+        self.dropped_samples = 0 # Muestras perdidas por desbordamiento del buffer simulado
+        self.reads = 0 # Número de lecturas realizadas
+        self.t0 = None # Instante en que arranca el reloj de muestreo
+
+    def start(self):
+        self.t0 = time.perf_counter()
+
+    def sample_time(self, sample_index):
+        """Instante (perf_counter) en que la muestra `sample_index` quedó disponible."""
+        if self.t0 is None:
+            return None
+        return self.t0 + (sample_index + 1) / self.sample_rate
+
+    def available(self):
+        """Número de muestras adquiridas por el dispositivo y aún no leídas."""
+        if not self.realtime:
+            return self.buffer_size
+        if self.t0 is None:
+            self.start()
+        acquired = int((time.perf_counter() - self.t0) * self.sample_rate)
+        return max(acquired - self.samples_generated, 0)
+
+    def generate(self, start, n):
+        """Genera las muestras [start, start + n) de todos los canales (canales x n)."""
+        # El ruido se toma en orden muestra a muestra para que no dependa del tamaño del bloque
+        noise = self.rng.standard_normal((n, self.n_channels)).T
+        t = (start + np.arange(n)) / self.sample_rate
+        phase = (t[np.newaxis, :] / self.burst_period + self.phases[:, np.newaxis]) % 1.0
+        envelope = np.where(phase < self.burst_duty, np.sin(np.pi * phase / self.burst_duty) ** 2, 0.0)
+        return noise * (self.noise_amp + self.burst_amp * envelope)
+
+    def skip(self, n):
+        """Descarta las siguientes `n` muestras (desbordamiento del buffer del dispositivo)."""
+        self.rng.standard_normal((n, self.n_channels))
+        self.samples_generated += n
+
+    def read_many_sample(self, data, number_of_samples_per_channel):
+        """Escribe el siguiente bloque de muestras en `data` (canales x muestras) y devuelve cuántas se leyeron."""
+        n = int(number_of_samples_per_channel)
+        if self.realtime:
+            if self.t0 is None:
+                self.start()
+            backlog = self.available()
+            # Si el lector se atrasó más que el buffer del dispositivo se pierden las muestras más antiguas
+            if backlog > self.buffer_size:
+                lost = backlog - self.buffer_size
+                self.dropped_samples += lost
+                self.skip(lost)
+            # Espera a que el reloj de muestreo alcance el final del bloque solicitado
+            ready_at = self.sample_time(self.samples_generated + n - 1)
+            wait = ready_at - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        data[:, :n] = self.generate(self.samples_generated, n)
+        self.samples_generated += n
+        self.reads += 1
+        return n
+
+    def read(self, number_of_samples_per_channel):
+        """Lee un bloque de muestras y lo devuelve como un arreglo (canales x muestras)."""
+        data = np.zeros((self.n_channels, int(number_of_samples_per_channel)))
+        self.read_many_sample(data, number_of_samples_per_channel)
+        return data
+
+    def close(self):
+        pass
+
+
+class SimulatedDOLine:
+    """Línea digital simulada: cada pulso queda registrado en el backend."""
+
+    def __init__(self, backend, dev_name, device_channel):
+        self.backend = backend
+        self.dev_name = dev_name
+        self.device_channel = device_channel
+
+    def pulse(self):
+        self.backend.record_pulse(self.dev_name, self.device_channel)
+
+    def close(self):
+        pass
+
+
+class SimulatedBackend(DAQBackend):
+    """Backend local que sustituye a la tarjeta NI para pruebas de carga sin hardware.
+
+    Los pulsos digitales no se emiten: se registran con su marca de tiempo (perf_counter)
+    y la muestra del reloj de adquisición en que ocurrieron, para medir la latencia cruce → pulso."""
+    nombre = 'simulado'
+
+    def __init__(self, n_devices=1, realtime=True, seed=0, **signal_kwargs):
+        self.devices = [(f"SimDev{i + 1}", "Simulated DAQ") for i in range(n_devices)]
+        self.realtime = realtime
+        self.seed = seed
+        self.signal_kwargs = signal_kwargs
+        self.ai_task = None
+        self.pulse_log = [] # Lista de (instante, línea, muestra del reloj) de cada pulso
+        self.lock = threading.Lock()
+
+    def list_devices(self):
+        return list(self.devices)
+
+    def open_ai_task(self, dev_name, n_channels, sample_rate, samps_per_chan):
+        if dev_name not in [name for name, _ in self.devices]:
+            raise DaqError(f"Dispositivo simulado desconocido: {dev_name}")
+        self.ai_task = SimulatedAITask(n_channels, sample_rate, samps_per_chan, realtime=self.realtime,
+                                       seed=self.seed, **self.signal_kwargs)
+        return self.ai_task
+
+    def open_do_line(self, dev_name, device_channel):
+        return SimulatedDOLine(self, dev_name, device_channel)
+
+    def record_pulse(self, dev_name, device_channel):
+        """Registra un pulso de una línea simulada con su instante y la muestra del reloj de adquisición."""
+        timestamp = time.perf_counter()
+        sample_clock = None
+        if self.ai_task is not None and self.ai_task.t0 is not None:
+            sample_clock = int((timestamp - self.ai_task.t0) * self.ai_task.sample_rate)
+        with self.lock:
+            self.pulse_log.append((timestamp, f"{dev_name}/{device_channel}", sample_clock))
+
+    def stats(self):
+        """Resumen de la sesión simulada: muestras leídas, perdidas y pulsos emitidos."""
+        task = self.ai_task
+        return {
+            'samples_read': task.samples_generated if task else 0,
+            'dropped_samples': task.dropped_samples if task else 0,
+            'reads': task.reads if task else 0,
+            'pulses': len(self.pulse_log),
+        }
+
+
+# Columnas de una grabación que no son señales: tiempo, eventos y columnas de ciclo del CSV procesado
+NON_SIGNAL_COLUMNS = {'TIME', 'UP', 'DOWN', 'STIM 1', 'STIM 2', 'STIM 3',
+                      'ACTIVE CYCLE', 'INACTIVE CYCLE', 'CYCLE TIME', 'FREQUENCY'}
+
+
+def load_replay_source(path):
+    """Abre una grabación para reproducirla. Devuelve (frecuencia, etiquetas, muestras x canales, escala).
+
+    Un .bin de `recorder` se abre como memmap (las muestras se escalan al leer cada bloque); un CSV
+    se abre desde su caché de columnas (`recording_cache`) y la frecuencia de muestreo se obtiene de
+    la columna TIME."""
+    if os.path.splitext(path)[1].lower() == '.bin':
+        import recorder
+        header, data = recorder.read_recording(path)
+        columns = [i for i, label in enumerate(header['columns']) if label not in NON_SIGNAL_COLUMNS]
+        scale = np.array(header['scale'])[columns]
+        if columns == list(range(len(columns))):
+            signals = data[:, :len(columns)] # Vista del memmap: las señales van antes que los eventos
+        else:
+            signals = data[:, columns]
+        return header['sample_rate'], [header['columns'][i] for i in columns], signals, scale
+    from post_processing import load_table
+    df = load_table(path)
+    labels = [label for label in df.columns if label not in NON_SIGNAL_COLUMNS]
+    sample_rate = round(1 / np.median(np.diff(df['TIME'].to_numpy()[:1000])))
+    return sample_rate, labels, df[labels].to_numpy(dtype=np.float64), np.ones(len(labels))
+
+
+class ReplayAITask(SimulatedAITask):
+    """Tarea analógica que entrega una grabación guardada en lugar de la señal sintética.
+
+    Sigue el reloj de muestreo de la tarea simulada multiplicado por `speed` (1 = tiempo real,
+    100 = cien veces más rápido, 0 = tan rápido como se pida), con el mismo desbordamiento del buffer
+    del dispositivo. Si la tarea pide más canales de los grabados, los sobrantes quedan en cero.
+    Al terminar la grabación vuelve a empezar (`loop`) o lanza EOFError en la siguiente lectura."""
+
+    def __init__(self, source, n_channels, samps_per_chan, speed=1.0, loop=True):
+        sample_rate, self.labels, self.signals, self.scale = source
+        self.speed = speed
+        self.loop = loop
+        super().__init__(n_channels, sample_rate * (speed or 1), samps_per_chan, realtime=speed > 0)
+        self.recording_rate = sample_rate
+        self.n_recorded = len(self.signals)
+        self.n_read_channels = min(n_channels, len(self.labels))
+        self.position = 0 # Siguiente muestra de la grabación
+        self.finished = False # True cuando se entregó la última muestra (sin `loop`)
+
+    def generate(self, start, n):
+        """Copia las siguientes `n` muestras de la grabación (canales x n)."""
+        if self.finished:
+            raise EOFError("Fin de la grabación")
+        block = np.zeros((self.n_channels, n))
+        filled = 0
+        while filled < n:
+            k = min(n - filled, self.n_recorded - self.position)
+            chunk = np.asarray(self.signals[self.position:self.position + k, :self.n_read_channels], dtype=np.float64)
+            block[:self.n_read_channels, filled:filled + k] = (chunk * self.scale[:self.n_read_channels]).T
+            filled += k
+            self.position += k
+            if self.position == self.n_recorded:
+                if not self.loop:
+                    # El resto del último bloque queda en cero
+                    self.finished = True
+                    break
+                self.position = 0
+        return block
+
+    def skip(self, n):
+        self.samples_generated += n
+        if self.loop:
+            self.position = (self.position + n) % self.n_recorded
+        else:
+            self.position = min(self.position + n, self.n_recorded)
+
+    def available(self):
+        if self.finished:
+            return 0
+        return super().available()
+
+
+class ReplayBackend(SimulatedBackend):
+    """Backend que reproduce una grabación (.bin o .csv) a través del mismo lazo que la tarjeta.
+
+    Los pulsos digitales se registran como en el backend simulado. La grabación se abre hasta
+    `open_ai_task`, así que el backend se puede enviar al proceso de adquisición."""
+    nombre = 'reproduccion'
+
+    def __init__(self, path, speed=1.0, loop=True):
+        super().__init__(realtime=speed > 0)
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.devices = [("Replay", f"Grabación {os.path.basename(path)}")]
+
+    def __reduce__(self):
+        # Al enviarse al proceso de adquisición sólo viajan la ruta y la velocidad
+        return ReplayBackend, (self.path, self.speed, self.loop)
+
+    def recording_info(self):
+        """(frecuencia de muestreo, etiquetas de los canales) de la grabación; la adquisición se configura con ellas."""
+        sample_rate, labels, _, _ = load_replay_source(self.path)
+        return sample_rate, labels
+
+    def open_ai_task(self, dev_name, n_channels, sample_rate, samps_per_chan):
+        if dev_name not in [name for name, _ in self.devices]:
+            raise DaqError(f"Dispositivo de reproducción desconocido: {dev_name}")
+        source = load_replay_source(self.path)
+        if len(source[2]) == 0:
+            raise DaqError(f"La grabación {self.path} no tiene muestras")
+        if sample_rate != source[0]:
+            raise DaqError(f"La grabación está a {source[0]} Hz y la adquisición a {sample_rate} Hz")
+        self.ai_task = ReplayAITask(source, n_channels, samps_per_chan, speed=self.speed, loop=self.loop)
+        return self.ai_task
+
+
+def get_backend(nombre=None, **kwargs):
+    """Devuelve el backend solicitado ('nidaqmx', 'simulado' o 'reproduccion' con `path` y `speed`).
+
+    Si no se indica un nombre se usa la variable de entorno DAQ_BACKEND (por defecto 'nidaqmx').
+    Si se recibe un backend ya creado se devuelve tal cual."""
+    if isinstance(nombre, DAQBackend):
+        return nombre
+    if nombre is None:
+        nombre = os.environ.get('DAQ_BACKEND', 'nidaqmx')
+    if nombre == 'simulado':
+        return SimulatedBackend(**kwargs)
+    if nombre == 'reproduccion':
+        return ReplayBackend(**kwargs)
+    if nombre == 'nidaqmx':
+        return NIDAQBackend()
+    raise ValueError(f"Backend de adquisición desconocido: {nombre}")
+
+
+def benchmark(sample_rate=3300, n_channels=13, duration=5.0, block=20, threshold=1.0, realtime=True):
+    """Ejecuta el lazo de adquisición con el backend simulado y mide throughput, pérdidas y latencia.
+
+    En cada bloque se busca el primer cruce ascendente del canal 1 y se emite un pulso; la latencia
+    se mide desde el instante en que la muestra del cruce quedó disponible hasta el pulso."""
+    backend = SimulatedBackend(realtime=realtime)
+    dev_name = backend.list_devices()[0][0]
+    task = backend.open_ai_task(dev_name, n_channels, sample_rate, sample_rate)
+    task.start()
+    ring = RingBuffer(n_channels, int(sample_rate * 20))
+    latencies = []
+    above = False
+    total_samples = int(duration * sample_rate)
+    t_start = time.perf_counter()
+    while task.samples_generated < total_samples:
+        first_sample = task.samples_generated
+        start, n = ring.read_from(task, block)
+        ring.commit(n)
+        crossing = ring.view(start, n)[0] >= threshold
+        if not above and crossing.any():
+            first = first_sample + int(np.argmax(crossing))
+            backend.record_pulse(dev_name, 'port1/line0')
+            if realtime:
+                latencies.append(backend.pulse_log[-1][0] - task.sample_time(first))
+        above = bool(crossing[-1])
+    elapsed = time.perf_counter() - t_start
+
+    result = backend.stats()
+    result['elapsed_s'] = elapsed
+    result['throughput_samples_s'] = result['samples_read'] / elapsed if elapsed > 0 else 0.0
+    if latencies:
+        result['latency_p50_ms'] = float(np.percentile(latencies, 50) * 1000)
+        result['latency_max_ms'] = float(np.max(latencies) * 1000)
+    return result
+
+
+if __name__ == "__main__":
+    # Uso: python daq_backend.py [sample_rate] [n_canales] [duración_s] [--rapido]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    rate = int(args[0]) if len(args) > 0 else 3300
+    channels = int(args[1]) if len(args) > 1 else 13
+    seconds = float(args[2]) if len(args) > 2 else 5.0
+    for key, value in benchmark(rate, channels, seconds, realtime='--rapido' not in sys.argv).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class MinMaxDecimator:
+    """Copia decimada mínimo/máximo de un arreglo (filas x muestras) para dibujarlo en pantalla.
+
+    Las muestras se agrupan en `n_columns` columnas (aproximadamente una por píxel horizontal) y de
+    cada columna se guardan el mínimo y el máximo, así que cada curva se dibuja con 2 * n_columns
+    puntos sin perder picos ni marcas aisladas. `update` sólo recalcula las columnas que tocan las
+    muestras recién escritas."""
+
+    def __init__(self, n_rows, n_samples, n_columns, tiempo):
+        self.n_samples = int(n_samples)
+        self.bin_size = max(int(np.ceil(self.n_samples / n_columns)), 1)
+        self.n_columns = int(np.ceil(self.n_samples / self.bin_size))
+        self.mins = np.zeros((n_rows, self.n_columns))
+        self.maxs = np.zeros((n_rows, self.n_columns))
+        # Vista intercalada (min, max, min, max...) de cada fila, lista para `setData`
+        self.interleaved = np.zeros((n_rows, 2 * self.n_columns))
+
+        # Eje x: inicio y final de cada columna, en el mismo orden que los puntos intercalados
+        starts = np.arange(self.n_columns) * self.bin_size
+        ends = np.minimum(starts + self.bin_size, self.n_samples) - 1
+        self.x = np.empty(2 * self.n_columns)
+        self.x[0::2] = tiempo[starts]
+        self.x[1::2] = tiempo[ends]
+
+    def update(self, source, start, n):
+        """Recalcula las columnas que contienen las muestras [start, start + n) de `source`."""
+        first_column = start // self.bin_size
+        last_column = (start + n - 1) // self.bin_size + 1
+        sample_start = first_column * self.bin_size
+        sample_end = min(last_column * self.bin_size, self.n_samples)
+        block = source[:, sample_start:sample_end]
+
+        full = (sample_end - sample_start) // self.bin_size
+        if full:
+            # Columnas completas: se reacomodan como (filas x columnas x bin) y se reducen de una vez
+            grouped = block[:, :full * self.bin_size].reshape(block.shape[0], full, self.bin_size)
+            self.mins[:, first_column:first_column + full] = grouped.min(axis=2)
+            self.maxs[:, first_column:first_column + full] = grouped.max(axis=2)
+        if first_column + full < last_column:
+            # Última columna incompleta (sólo al final del arreglo)
+            rest = block[:, full * self.bin_size:]
+            self.mins[:, first_column + full] = rest.min(axis=1)
+            self.maxs[:, first_column + full] = rest.max(axis=1)
+
+        self.interleaved[:, 2 * first_column:2 * last_column:2] = self.mins[:, first_column:last_column]
+        self.interleaved[:, 2 * first_column + 1:2 * last_column:2] = self.maxs[:, first_column:last_column]
+
+    def row(self, index):
+        """Puntos intercalados (min, max) de la fila `index`."""
+        return self.interleaved[index]
@@ -0,0 +1,101 @@
+import time
+import numpy as np
+from startup import lazy_import
+butter, lfilter, sosfilt = lazy_import('scipy.signal', 'butter', 'lfilter', 'sosfilt')
+
+
+class StreamingEnvelope:
+    """Envolvente en vivo de todos los canales: pasa-altas -> rectificado -> integrador de primer orden.
+
+    Es la misma cadena que RECT_E_INT_con_HP.py aplica fuera de línea (Butterworth pasa-altas,
+    rectificado de media onda con `np.maximum(x, 0)` e integrador y[i] = y[i-1] + (x[i] - y[i-1]) dt/tau),
+    pero procesa bloque por bloque: el estado de los filtros (`zi`) se conserva entre bloques, así que
+    el resultado no depende del tamaño de bloque. Todos los canales se filtran en una sola llamada.
+    El pasa-altas se aplica en secciones de segundo orden (sosfilt) para que el orden 5 sea estable
+    aun con frecuencias de corte bajas. Los coeficientes se calculan en `design()` (la primera vez
+    importa scipy), no al construir el objeto, para no cargar scipy al arrancar la interfaz."""
+
+    def __init__(self, n_channels, sample_rate, hp_cutoff=10.0, hp_order=5, time_constant=0.05):
+        self.n_channels = n_channels
+        self.configure(sample_rate, hp_cutoff, hp_order, time_constant)
+
+    def configure(self, sample_rate, hp_cutoff=None, hp_order=None, time_constant=None):
+        """Cambia los parámetros (p. ej. la frecuencia de muestreo); los coeficientes se recalculan y el
+        estado se reinicia en el siguiente `design()` o bloque procesado."""
+        self.sample_rate = sample_rate
+        if hp_cutoff is not None:
+            self.hp_cutoff = hp_cutoff # Frecuencia de corte del pasa-altas [Hz]; 0 lo desactiva
+        if hp_order is not None:
+            self.hp_order = hp_order
+        if time_constant is not None:
+            self.time_constant = time_constant # Constante de tiempo del integrador [s]
+        self.designed = False
+
+    def design(self):
+        """Calcula los coeficientes con los parámetros actuales y reinicia el estado."""
+        if self.hp_cutoff > 0:
+            self.sos = butter(self.hp_order, self.hp_cutoff, btype='high', fs=self.sample_rate, output='sos')
+        else:
+            self.sos = None
+        # Integrador de primer orden como filtro IIR: y[i] = k x[i] + (1 - k) y[i-1], con k = dt / tau
+        k = min((1 / self.sample_rate) / self.time_constant, 1.0)
+        self.b_int = np.array([k])
+        self.a_int = np.array([1.0, k - 1.0])
+        self.designed = True
+        self.reset()
+
+    def reset(self):
+        """Reinicia el estado de los filtros (todos los canales en reposo)."""
+        if not self.designed:
+            return # `design()` reiniciará el estado
+        n_sections = 0 if self.sos is None else len(self.sos)
+        self.hp_zi = np.zeros((n_sections, self.n_channels, 2))
+        self.int_zi = np.zeros((self.n_channels, 1))
+
+    def process(self, block, out=None):
+        """Procesa un bloque (canales x muestras). Si se da `out`, el resultado se escribe ahí."""
+        if not self.designed:
+            self.design()
+        x = block
+        if self.sos is not None:
+            x, self.hp_zi = sosfilt(self.sos, x, axis=1, zi=self.hp_zi)
+            np.maximum(x, 0, out=x)
+        else:
+            x = np.maximum(x, 0)
+        y, self.int_zi = lfilter(self.b_int, self.a_int, x, axis=1, zi=self.int_zi)
+        if out is not None:
+            out[...] = y
+            return out
+        return y
+
+
+if __name__ == "__main__":
+    # Verificación: bloques de tamaño variable == señal completa == integrador fuera de línea
+    fs = 3300
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal((13, 5 * fs)) * (1 + np.sin(np.arange(5 * fs) / fs * 2 * np.pi))
+
+    whole = StreamingEnvelope(13, fs).process(signal)
+
+    streaming = StreamingEnvelope(13, fs)
+    blocks = np.empty_like(signal)
+    position = 0
+    block_times = []
+    while position < signal.shape[1]:
+        n = int(rng.integers(1, 200))
+        t0 = time.perf_counter()
+        streaming.process(signal[:, position:position + n], out=blocks[:, position:position + n])
+        block_times.append(time.perf_counter() - t0)
+        position += n
+    print(f"bloques vs señal completa: error máximo {np.abs(blocks - whole).max():.2e}")
+
+    # Integrador del análisis fuera de línea (sin pasa-altas) aplicado muestra por muestra
+    envelope = StreamingEnvelope(1, fs, hp_cutoff=0, time_constant=0.2)
+    rectified = np.maximum(signal[0], 0)
+    offline = np.zeros_like(rectified)
+    previous = 0
+    for i in range(len(rectified)):
+        offline[i] = previous + (rectified[i] - previous) * (1 / fs) / 0.2
+        previous = offline[i]
+    print(f"integrador vs RECT_E_INT: error máximo {np.abs(envelope.process(signal[:1])[0] - offline).max():.2e}")
+    print(f"costo por bloque (13 canales): mediana {np.median(block_times) * 1e6:.0f} µs")
@@ -0,0 +1,172 @@
+import json
+import time
+import numpy as np
+
+
+# Intervalos medidos entre las etapas de cada cruce ascendente; 'retraso_pulso' es el atraso del
+# pulso respecto a su plazo
+INTERVALS = ['lectura->cruce', 'cruce->decision', 'decision->pulso', 'lectura->pulso', 'retraso_pulso']
+
+
+class LatencyHistogram:
+    """Histograma de latencias con contenedores logarítmicos de 1 µs a 10 s.
+
+    La memoria es fija sin importar cuántos eventos se registren; los percentiles se interpolan
+    dentro del contenedor (error relativo < 3 % con 400 contenedores) y el máximo es exacto."""
+
+    def __init__(self, min_latency=1e-6, max_latency=10.0, n_bins=400):
+        self.edges = np.geomspace(min_latency, max_latency, n_bins + 1)
+        self.reset()
+
+    def reset(self):
+        # Contenedor 0: menos que la primera orilla; último: más que la última orilla
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.drain_max = 0.0 # Máximo desde el último `LatencyMonitor.drain`
+
+    def add(self, value):
+        self.counts[np.searchsorted(self.edges, value, side='right')] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value > self.drain_max:
+            self.drain_max = value
+
+    def percentile(self, q):
+        """Percentil `q` (0-100) en segundos."""
+        if self.count == 0:
+            return float('nan')
+        target = q / 100 * self.count
+        cumulative = np.cumsum(self.counts)
+        k = int(np.searchsorted(cumulative, target, side='left'))
+        if k == 0:
+            return float(min(self.edges[0], self.max))
+        if k > len(self.edges) - 1:
+            return self.max
+        # Interpolación lineal dentro del contenedor [edges[k-1], edges[k])
+        below = cumulative[k - 1]
+        fraction = (target - below) / self.counts[k] if self.counts[k] else 0.0
+        value = self.edges[k - 1] + fraction * (self.edges[k] - self.edges[k - 1])
+        return float(min(value, self.max))
+
+    def merge(self, counts, count, total, max_latency):
+        """Suma un incremento enviado por `LatencyMonitor.drain` de otro proceso."""
+        self.counts += counts
+        self.count += count
+        self.total += total
+        if max_latency > self.max:
+            self.max = max_latency
+
+    def summary(self):
+        return {
+            'n': self.count,
+            'mean': self.total / self.count if self.count else float('nan'),
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max if self.count else float('nan'),
+        }
+
+
+class LatencyMonitor:
+    """Latencias del lazo cerrado: lectura de la tarjeta -> cruce -> decisión -> pulso TTL.
+
+    Cada hilo registra su etapa con `time.perf_counter()` y los instantes viajan junto con el cruce
+    (ThreadA -> Thread_index -> PulseThread), así que no hay estado compartido entre hilos más allá
+    de los histogramas, y cada intervalo lo escribe un solo hilo. En 'lectura->pulso' no se cuenta
+    el retardo programado por el usuario."""
+
+    def __init__(self):
+        self.histograms = {name: LatencyHistogram() for name in INTERVALS}
+        self.started = time.time()
+        self.drained = {} # (contenedores, n, total) ya enviados por `drain`, por intervalo
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.started = time.time()
+
+    def record_detection(self, read_time, detect_time):
+        """ThreadA: el bloque regresó de la tarjeta en `read_time` y el cruce se detectó en `detect_time`."""
+        self.histograms['lectura->cruce'].add(detect_time - read_time)
+
+    def record_decision(self, detect_time, decision_time):
+        """Thread_index: el planificador resolvió los estimuladores del cruce."""
+        self.histograms['cruce->decision'].add(decision_time - detect_time)
+
+    def record_pulse(self, read_time, detect_time, decision_time, deadline, fire_time):
+        """PulseThread: el pulso programado para `deadline` salió en `fire_time`."""
+        delay_time = deadline - detect_time # Retardo programado al encolar el pulso
+        # Si la decisión llegó antes del plazo, el tiempo de la etapa se cuenta desde el plazo
+        self.histograms['decision->pulso'].add(fire_time - max(decision_time, deadline))
+        self.histograms['lectura->pulso'].add(fire_time - read_time - delay_time)
+        self.histograms['retraso_pulso'].add(max(fire_time - deadline, 0.0))
+
+    def drain(self):
+        """Proceso de adquisición: lo registrado en cada intervalo desde la llamada anterior.
+
+        Se envía a la interfaz como (contenedores, n, total, máximo) y allá se suma con `merge`. Los
+        histogramas no se reinician, así que un pulso que se registre mientras tanto sale en el siguiente.
+        El máximo es el de lo registrado desde la llamada anterior: así un `reset()` en la interfaz no
+        vuelve a recibir el máximo de una sesión previa."""
+        delta = {}
+        for name, histogram in self.histograms.items():
+            counts, count, total = histogram.counts.copy(), histogram.count, histogram.total
+            last_counts, last_count, last_total = self.drained.get(name, (0, 0, 0.0))
+            if count != last_count:
+                max_latency, histogram.drain_max = histogram.drain_max, 0.0
+                delta[name] = (counts - last_counts, count - last_count, total - last_total, max_latency)
+                self.drained[name] = (counts, count, total)
+        return delta
+
+    def merge(self, delta):
+        """Interfaz: incorpora lo que envió `drain` desde el proceso de adquisición."""
+        for name, values in delta.items():
+            self.histograms[name].merge(*values)
+
+    def summary(self):
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def format_table(self):
+        """Tabla de texto (en milisegundos) para el panel de latencias."""
+        lines = [f"{'intervalo':<16}{'n':>8}{'p50':>10}{'p99':>10}{'max':>10}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<16}{stats['n']:>8}{stats['p50'] * 1e3:>10.3f}"
+                         f"{stats['p99'] * 1e3:>10.3f}{stats['max'] * 1e3:>10.3f}")
+        return '\n'.join(lines)
+
+    def export_json(self, path, **metadata):
+        """Guarda el resumen y los histogramas de la sesión en `path`."""
+        report = {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'exported': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'units': 's',
+            'metadata': metadata,
+            'bin_edges': self.histograms[INTERVALS[0]].edges.tolist(),
+            'intervals': {name: dict(histogram.summary(), counts=histogram.counts.tolist())
+                          for name, histogram in self.histograms.items()},
+        }
+        with open(path, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+        return path
+
+
+# Monitor de la sesión en curso, compartido por los hilos de PRINCIPAL.py
+monitor = LatencyMonitor()
+
+
+if __name__ == "__main__":
+    # Verificación de percentiles contra numpy: python latency.py
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(np.log(2e-4), 0.6, 100000)
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.add(value)
+    for q in (50, 99):
+        exact = np.percentile(values, q)
+        estimate = histogram.percentile(q)
+        print(f"p{q}: exacto {exact * 1e3:.4f} ms, histograma {estimate * 1e3:.4f} ms "
+              f"({abs(estimate - exact) / exact:.2%})")
+    print(f"max: {histogram.max * 1e3:.4f} ms")
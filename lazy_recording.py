@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import recorder
+import recording_cache
+import precision
+from post_processing import add_cycle_columns
+
+
+# Columnas decodificadas que se mantienen en memoria por archivo: TIME, hasta 4 señales y los estímulos
+MAX_DECODED_COLUMNS = 8
+
+# Columnas que `add_cycle_columns` calcula a partir de UP y DOWN en una grabación binaria
+CYCLE_COLUMNS = ['ACTIVE CYCLE', 'INACTIVE CYCLE', 'CYCLE TIME', 'FREQUENCY']
+
+# Columnas de tiempo: se quedan en float64 (en float32 el tiempo de una grabación larga pierde resolución)
+TIME_COLUMNS = ['TIME'] + CYCLE_COLUMNS
+
+
+class ColumnSource:
+    """Lee columnas sueltas de una grabación y guarda las últimas usadas (LRU de `max_columns`).
+
+    Un CSV con caché (`recording_cache`) y una grabación binaria se leen desde memmaps, así que
+    decodificar una columna sólo toca sus propias páginas; un CSV sin caché se lee con `usecols`.
+    Las columnas de una grabación binaria se escalan a sus unidades y las de ciclo se calculan con
+    `add_cycle_columns`, igual que en `load_table`. Las señales y los eventos se entregan con el tipo
+    `dtype` (por defecto el de `precision`); las columnas de tiempo siempre en float64."""
+
+    def __init__(self, path, max_columns=MAX_DECODED_COLUMNS, dtype=None):
+        self.path = path
+        self.max_columns = max_columns
+        self.dtype = dtype or precision.real_dtype()
+        self.decoded = OrderedDict() # Nombre -> arreglo, del menos al más recientemente usado
+        self.loads = 0 # Columnas decodificadas (incluye las que se volvieron a leer tras salir del LRU)
+        self.binary = os.path.splitext(path)[1].lower() == '.bin'
+        if self.binary:
+            self.header, self.values = recorder.read_recording(path)
+            self.columns = ['TIME'] + list(self.header['columns']) + CYCLE_COLUMNS
+            self.n_samples = len(self.values)
+            self.cache = None
+        else:
+            found = recording_cache.find_cache(path)
+            if found is None and recording_cache.build(path) is not None:
+                found = recording_cache.find_cache(path)
+            self.cache = found
+            if found is not None:
+                self.columns = list(found[1]['columns'])
+                self.n_samples = found[1]['n_samples']
+            else:
+                self.columns = list(pd.read_csv(path, nrows=0).columns)
+                self.n_samples = None
+
+    def __len__(self):
+        if self.n_samples is None:
+            self.n_samples = len(self.get(self.columns[0]))
+        return self.n_samples
+
+    def get(self, name):
+        if name in self.decoded:
+            self.decoded.move_to_end(name)
+            return self.decoded[name]
+        if name not in self.columns:
+            raise KeyError(name)
+        values = self.load(name)
+        if name not in TIME_COLUMNS:
+            values = np.asarray(values, dtype=self.dtype)
+        self.loads += 1
+        self.decoded[name] = values
+        while len(self.decoded) > self.max_columns:
+            self.decoded.popitem(last=False)
+        return values
+
+    def load(self, name):
+        if self.binary:
+            if name == 'TIME':
+                return np.arange(len(self.values)) / self.header['sample_rate']
+            if name in CYCLE_COLUMNS:
+                events = pd.DataFrame({label: self.get(label) for label in ('UP', 'DOWN')})
+                return add_cycle_columns(events, 1 / self.header['sample_rate'])[name].to_numpy()
+            i = self.header['columns'].index(name)
+            return np.asarray(self.values[:, i], dtype=np.float64) * self.header['scale'][i]
+        if self.cache is not None:
+            folder, index = self.cache
+            return np.load(os.path.join(folder, f"{index['columns'].index(name)}.npy"), mmap_mode='c')
+        return pd.read_csv(self.path, usecols=[name])[name].to_numpy()
+
+
+class LazyRecording:
+    """Grabación que entrega sus columnas al primer acceso, con la interfaz de tabla que usan los análisis.
+
+    `rec['CH 1']` devuelve una Series y `rec[['TIME', 'CH 1']]` un DataFrame sólo con esas columnas.
+    Las columnas asignadas (`rec['CH 1'] = señal_filtrada`) quedan en esta tabla y tapan a las del
+    archivo; `copy()` comparte el archivo y el LRU pero no las asignaciones, como `DataFrame.copy`.
+    `to_numpy()` arma todas las columnas, para guardar la tabla completa."""
+
+    def __init__(self, source, overrides=None):
+        self.source = source
+        self.overrides = dict(overrides or {})
+        self.extra_columns = [name for name in self.overrides if name not in source.columns]
+
+    @property
+    def columns(self):
+        return pd.Index(self.source.columns + self.extra_columns)
+
+    def __len__(self):
+        return len(self.source)
+
+    def __contains__(self, name):
+        return name in self.overrides or name in self.source.columns
+
+    def column(self, name):
+        """Arreglo de una columna (asignada o del archivo)."""
+        if name in self.overrides:
+            return self.overrides[name]
+        return self.source.get(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return pd.Series(self.column(key), name=key, copy=False)
+        # concat conserva las columnas repetidas (los análisis piden cada señal dos veces: filtrada y original)
+        return pd.concat([self[name] for name in key], axis=1)
+
+    def __setitem__(self, name, values):
+        values = np.asarray(values)
+        if len(values) != len(self):
+            raise ValueError(f"La columna {name} tiene {len(values)} valores para {len(self)} muestras")
+        if name not in self.source.columns and name not in self.extra_columns:
+            self.extra_columns.append(name)
+        self.overrides[name] = values
+
+    def copy(self, deep=False):
+        return LazyRecording(self.source, self.overrides)
+
+    def head(self, n=5):
+        return pd.DataFrame({name: self.column(name)[:n] for name in self.columns}, columns=self.columns)
+
+    def to_numpy(self):
+        return np.column_stack([self.column(name) for name in self.columns])
+
+
+def open_recording(path, max_columns=MAX_DECODED_COLUMNS, dtype=None):
+    """Abre un CSV o una grabación binaria sin decodificar ninguna columna todavía."""
+    return LazyRecording(ColumnSource(path, max_columns, dtype))
+
+
+if __name__ == "__main__":
+    # Prueba: python lazy_recording.py [archivo.csv|archivo.bin]
+    # Compara las columnas con `load_table` y mide tiempo y memoria de abrir el archivo y leer 4 señales.
+    import tracemalloc
+    from post_processing import load_table
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        import tempfile
+        import replay
+        path = replay.synthetic_recording(os.path.join(tempfile.gettempdir(), 'lazy_sintetico.bin'), seconds=120)
+    selected = ['TIME', 'CH 1', 'CH 5', 'CH 9', 'CH 12', 'STIM 1']
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rec = open_recording(path)
+    arrays = [rec[name].to_numpy() for name in selected]
+    t1 = time.perf_counter()
+    lazy_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    table = load_table(path)
+    t2 = time.perf_counter()
+    full_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    same = list(rec.columns) == list(table.columns) and all(
+        np.allclose(rec[name].to_numpy(), table[name].to_numpy(), equal_nan=True) for name in table.columns)
+    print(f"{len(rec)} muestras x {len(rec.columns)} columnas, columnas iguales a load_table: {same}")
+    print(f"{len(selected)} columnas: {1e3 * (t1 - t0):.1f} ms y {lazy_peak / 1e6:.1f} MB; "
+          f"tabla completa: {1e3 * (t2 - t1):.1f} ms y {full_peak / 1e6:.1f} MB")
+    print(f"columnas decodificadas en memoria: {len(rec.source.decoded)} (máximo {rec.source.max_columns}), "
+          f"lecturas: {rec.source.loads}")
@@ -0,0 +1,103 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import recorder
+import recording_cache
+
+
+def previous_event(starts, events):
+    """Para cada índice de `starts` devuelve el último índice de `events` que no lo supera.
+
+    Si no hay ninguno se devuelve el propio índice de inicio (duración 0), igual que el cálculo
+    original con `idxmax` sobre la columna invertida."""
+    if len(events) == 0:
+        return starts
+    k = np.searchsorted(events, starts, side='right') - 1
+    return np.where(k >= 0, events[np.maximum(k, 0)], starts)
+
+
+def add_cycle_columns(df, sample_time):
+    """Agrega las columnas TIME, ACTIVE CYCLE, INACTIVE CYCLE, CYCLE TIME y FREQUENCY a una grabación.
+
+    Trabaja sobre los índices de los eventos UP y DOWN con búsquedas binarias en lugar de recorrer
+    las filas, así que el costo es O(N + k log k) para k eventos."""
+    n = len(df)
+    # Inserta la columna de tiempo; `sample_time` es el incremento de tiempo entre muestras
+    time_values = np.arange(n) * sample_time
+    df.insert(0, 'TIME', time_values)
+
+    up_indices = np.flatnonzero(df['UP'].to_numpy() == 1)
+    down_indices = np.flatnonzero(df['DOWN'].to_numpy() == 1)
+
+    # Un ciclo activo termina en 'DOWN' y empieza en el 'UP' previo; uno inactivo termina en 'UP'
+    # y empieza en el 'DOWN' previo
+    active = np.full(n, np.nan)
+    active[down_indices] = time_values[down_indices] - time_values[previous_event(down_indices, up_indices)]
+    inactive = np.full(n, np.nan)
+    inactive[up_indices] = time_values[up_indices] - time_values[previous_event(up_indices, down_indices)]
+    df['ACTIVE CYCLE'] = active
+    df['INACTIVE CYCLE'] = inactive
+
+    # Tiempo de ciclo: diferencia entre inicios consecutivos ('UP'); el último ciclo queda vacío
+    cycle_time = np.full(n, np.nan)
+    cycle_time[up_indices[:-1]] = np.diff(time_values[up_indices])
+    df['CYCLE TIME'] = cycle_time
+
+    # La frecuencia (inverso del tiempo promedio de ciclo) sólo se escribe en la primera fila
+    frequency = np.full(n, np.nan)
+    if n:
+        valid = cycle_time[~np.isnan(cycle_time)]
+        frequency[0] = 1 / valid.mean() if len(valid) else np.nan
+    df['FREQUENCY'] = frequency
+    return df
+
+
+def load_table(path):
+    """Carga una grabación con las columnas del CSV procesado (TIME, canales, eventos y ciclos).
+
+    Un .bin (grabación binaria o instantánea del buffer en vivo) se abre como memmap y las columnas
+    de ciclo se calculan en memoria, sin escribir ni volver a leer un CSV. Un .csv se abre desde su
+    caché de columnas (`recording_cache`), que se construye la primera vez que se abre el archivo."""
+    if os.path.splitext(path)[1].lower() != '.bin':
+        table = recording_cache.load(path)
+        # Los CSV con columnas de texto no se guardan en caché
+        return table if table is not None else pd.read_csv(path)
+    header, _ = recorder.read_recording(path)
+    return add_cycle_columns(recorder.to_dataframe(path), 1 / header['sample_rate'])
+
+
+def process_file(bin_path, sample_time):
+    """Convierte una grabación binaria a CSV con las columnas de ciclo. Devuelve la ruta del CSV."""
+    csv_path = os.path.splitext(bin_path)[0] + '.csv'
+    df = add_cycle_columns(recorder.to_dataframe(bin_path), sample_time)
+    df.to_csv(csv_path, index=False)
+    # La tabla ya está en memoria: la caché de columnas sale sin volver a leer el CSV
+    recording_cache.store(csv_path, df)
+    return csv_path
+
+
+def process_files(paths, sample_time, progress=None, is_cancelled=None, max_workers=None):
+    """Procesa varias grabaciones en paralelo, una tarea por archivo en un pool de procesos.
+
+    `progress(hechos, total, ruta)` se llama cada vez que termina un archivo y `is_cancelled()` se
+    consulta entre archivos; si devuelve True se cancelan los que aún no empiezan. Devuelve la lista
+    de CSV generados."""
+    results = []
+    if not paths:
+        return results
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(process_file, path, sample_time): path for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logging.error(f'Error en el procesamiento posterior de {path}: {e}')
+            if progress is not None:
+                progress(done, len(paths), path)
+            if is_cancelled is not None and is_cancelled():
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+    return results
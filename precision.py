@@ -0,0 +1,136 @@
+import sys
+import time
+import numpy as np
+from startup import lazy_import
+signal = lazy_import('scipy.signal')
+
+
+# Tipos de dato de cada modo: (señales reales, coeficientes complejos)
+PRECISIONS = {
+    'float64': (np.float64, np.complex128),
+    'float32': (np.float32, np.complex64),
+}
+
+# Modo de los análisis; lo fija PRINCIPAL (acquisition.json o --precision=float32) en cada proceso de análisis
+current = 'float64'
+
+# Tolerancias de float32 frente a float64 para `tolerance_check` (error relativo al máximo de la referencia).
+# Cada paso parte del resultado del anterior, así que el error del filtro (polos cerca de 1) se arrastra
+TOLERANCES = {'filtro': 5e-4, 'detrend': 1e-5, 'fft': 1e-3, 'cwt': 1e-3, 'coherencia': 1e-2}
+
+
+def set_precision(name):
+    global current
+    if name not in PRECISIONS:
+        raise ValueError(f"Precisión desconocida: {name} (opciones: {', '.join(PRECISIONS)})")
+    current = name
+
+
+def real_dtype():
+    return PRECISIONS[current][0]
+
+
+def complex_dtype():
+    return PRECISIONS[current][1]
+
+
+def as_real(values):
+    """Convierte un arreglo al tipo real del modo actual (sin copiar si ya lo es)."""
+    return np.asarray(values, dtype=real_dtype())
+
+
+def lfilter(b, a, x):
+    """`scipy.signal.lfilter` con condiciones iniciales cero en la precisión actual.
+
+    En float64 es exactamente `lfilter`. En float32 el filtro se pasa a secciones de segundo orden:
+    los coeficientes (b, a) de un Butterworth de orden 5 con corte bajo no caben en float32 sin
+    mover los polos (el filtro se vuelve inestable), mientras que las secciones sí."""
+    if real_dtype() == np.float64:
+        return signal.lfilter(b, a, x)
+    sos = signal.tf2sos(b, a).astype(real_dtype())
+    return signal.sosfilt(sos, as_real(x))
+
+
+def relative_error(result, reference):
+    """Error máximo de `result` relativo al valor máximo de `reference`."""
+    reference = np.asarray(reference)
+    return float(np.max(np.abs(np.asarray(result, dtype=reference.dtype) - reference)) / np.max(np.abs(reference)))
+
+
+def smooth_scales(wave, scales, dt, dj):
+    """Suavizado en tiempo de cada escala (Torrence y Webster, 1998), como en las coherencias de wavelet."""
+    n = wave.shape[1]
+    npad = int(2 ** np.ceil(np.log2(n)))
+    k = np.arange(1, npad // 2 + 1) * ((2. * np.pi) / npad)
+    k2 = np.concatenate(([0.], k, -k[(npad - 1) // 2:0:-1])) ** 2
+    smooth = np.empty_like(wave)
+    for ii, scale in enumerate(scales):
+        F = np.exp(-0.5 * (scale / dt) ** 2 * k2).astype(wave.real.dtype)
+        smoothed = np.fft.ifft(F * np.fft.fft(wave[ii], npad))[:n]
+        smooth[ii] = smoothed if np.iscomplexobj(wave) else smoothed.real
+    return smooth
+
+
+def tolerance_check(seconds=20.0, sample_rate=3300, seed=0):
+    """Corre los pasos numéricos de los análisis en float64 y en float32 sobre la misma señal.
+
+    Filtro pasa-altos/pasa-bajos Butterworth de orden 5, detrend, FFT, CWT Morlet (si pywt está
+    instalado) y coherencia de wavelet suavizada. Devuelve {paso: (error relativo, tolerancia,
+    bytes float64, bytes float32)}."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    bursts = (np.sin(2 * np.pi * 0.5 * t) > 0.6) * rng.standard_normal(len(t))
+    x = 0.2 * np.sin(2 * np.pi * 3 * t) + bursts + 0.05 * rng.standard_normal(len(t)) + 1.5
+    y = np.roll(x, 150) + 0.05 * rng.standard_normal(len(t))
+    b_hp, a_hp = signal.butter(5, 10, btype='high', fs=sample_rate)
+    b_lp, a_lp = signal.butter(5, 100, btype='low', fs=sample_rate)
+
+    def run(name):
+        set_precision(name)
+        out = {}
+        x1, x2 = as_real(x), as_real(y)
+        out['filtro'] = lfilter(b_lp, a_lp, lfilter(b_hp, a_hp, x1))
+        out['detrend'] = signal.detrend(x1, type='linear')
+        out['fft'] = np.abs(np.fft.fft(out['filtro']))
+        try:
+            import pywt
+        except ImportError:
+            return out
+        # La CWT se calcula sobre la señal submuestreada, como hacen los análisis con subsample_factor
+        s1, s2 = out['filtro'][::10], lfilter(b_lp, a_lp, lfilter(b_hp, a_hp, x2))[::10]
+        dt, dj = 10 / sample_rate, 1 / 8
+        scales = 2 ** np.arange(1, int(np.log2(len(s1))) - 2, dj)
+        c1, _ = pywt.cwt(s1, scales, 'cmor1.5-1.0', dt)
+        c2, _ = pywt.cwt(s2, scales, 'cmor1.5-1.0', dt)
+        out['cwt'] = c1
+        scale_matrix = (np.ones([1, len(s1)]) * scales[:, None]).astype(real_dtype())
+        S1 = smooth_scales(np.abs(c1) ** 2 / scale_matrix, scales, dt, dj)
+        S2 = smooth_scales(np.abs(c2) ** 2 / scale_matrix, scales, dt, dj)
+        S12 = smooth_scales(c1 * np.conj(c2) / scale_matrix, scales, dt, dj)
+        out['coherencia'] = np.abs(S12) ** 2 / (S1 * S2)
+        return out
+
+    previous = current
+    try:
+        reference, single = run('float64'), run('float32')
+    finally:
+        set_precision(previous)
+    return {step: (relative_error(single[step], reference[step]), TOLERANCES[step],
+                   reference[step].nbytes, single[step].nbytes) for step in reference}
+
+
+if __name__ == "__main__":
+    # Prueba de tolerancia float32 frente a float64: python precision.py [segundos]
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    start = time.perf_counter()
+    results = tolerance_check(seconds)
+    failed = False
+    for step, (error, tolerance, bytes64, bytes32) in results.items():
+        ok = error <= tolerance
+        failed |= not ok
+        print(f"{step:<12} error {error:.2e} (tolerancia {tolerance:.0e}) {'ok' if ok else 'FALLA'}  "
+              f"memoria {bytes64 / 1e6:.1f} -> {bytes32 / 1e6:.1f} MB")
+    if 'cwt' not in results:
+        print("cwt y coherencia: pywt no está instalado")
+    print(f"{time.perf_counter() - start:.1f} s")
+    sys.exit(1 if failed else 0)
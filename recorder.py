@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+
+# Escala de las columnas de señal cuando se graba en int16 (rango de la tarjeta: ±10 V)
+INT16_SIGNAL_SCALE = 10.0 / 32767
+# Escala de las columnas de eventos en int16 (admite los valores 1, 1.5 y 2 de los estímulos)
+INT16_EVENT_SCALE = 0.5
+# Marca de fin de grabación para el hilo escritor
+STOP = object()
+
+
+def header_path(bin_path):
+    """Ruta del encabezado JSON que acompaña a un archivo binario de grabación."""
+    return os.path.splitext(bin_path)[0] + '.json'
+
+
+class BinaryRecorder:
+    """Motor de grabación en binario con cola acotada y un hilo escritor dedicado.
+
+    Cada bloque se guarda como filas (muestras x columnas) en float32 o int16, una detrás de otra,
+    en un archivo .bin. Junto a él se escribe un encabezado .json con las etiquetas de las columnas,
+    la frecuencia de muestreo, las columnas de eventos, el tipo de dato y la escala de cada columna.
+    El hilo que produce los bloques sólo los encola; la escritura y los flush periódicos ocurren en el
+    hilo escritor."""
+
+    def __init__(self, path, column_labels, sample_rate, event_columns, dtype='float32',
+                 queue_size=256, flush_interval=1.0):
+        self.path = path
+        self.column_labels = list(column_labels)
+        self.sample_rate = sample_rate
+        self.event_columns = list(event_columns)
+        self.dtype = np.dtype(dtype)
+        self.flush_interval = flush_interval # Segundos entre flush del archivo
+        self.queue = queue.Queue(maxsize=queue_size) # Cola acotada de bloques pendientes de escribir
+        self.n_samples = 0 # Muestras escritas en el archivo
+        self.dropped_blocks = 0 # Bloques descartados porque la cola estaba llena
+        self.thread = None
+
+        # Escala por columna: en float32 se guarda el valor tal cual; en int16 se cuantiza
+        if self.dtype == np.int16:
+            self.scale = np.array([INT16_EVENT_SCALE if label in self.event_columns else INT16_SIGNAL_SCALE
+                                   for label in self.column_labels])
+        else:
+            self.scale = np.ones(len(self.column_labels))
+
+    def header(self):
+        return {
+            'format': 'neuromuscular-bin',
+            'version': 1,
+            'columns': self.column_labels,
+            'event_columns': self.event_columns,
+            'sample_rate': self.sample_rate,
+            'dtype': self.dtype.name,
+            'scale': self.scale.tolist(),
+            'layout': 'samples x columns',
+            'n_samples': self.n_samples,
+        }
+
+    def write_header(self):
+        with open(header_path(self.path), 'w') as header_file:
+            json.dump(self.header(), header_file, indent=2)
+
+    def open(self):
+        """Crea el archivo y arranca el hilo escritor."""
+        self.file = open(self.path, 'wb')
+        self.write_header()
+        self.thread = threading.Thread(target=self.writer_loop, name='BinaryRecorder', daemon=True)
+        self.thread.start()
+
+    def push(self, data, events):
+        """Encola un bloque de señales (canales x n) y eventos (eventos x n) para escribirlo.
+
+        El bloque se convierte de inmediato al formato del archivo, así que `data` y `events` pueden
+        ser vistas del buffer circular. Si la cola está llena espera hasta `flush_interval`, por lo que
+        no se debe llamar desde el hilo de la interfaz (SaveThread lo hace desde su propio hilo).
+        Devuelve False si la cola siguió llena y el bloque se descartó."""
+        block = np.vstack((data, events)).T
+        if self.dtype == np.int16:
+            block = np.round(block / self.scale)
+        block = np.ascontiguousarray(block, dtype=self.dtype)
+        try:
+            self.queue.put(block, timeout=self.flush_interval)
+        except queue.Full:
+            self.dropped_blocks += 1
+            logging.error(f'Cola de grabación llena, bloque descartado ({self.dropped_blocks})')
+            return False
+        return True
+
+    def writer_loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                block = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                block = None
+            if block is STOP:
+                break
+            if block is not None:
+                block.tofile(self.file)
+                self.n_samples += len(block)
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.file.flush()
+                last_flush = time.monotonic()
+
+    def close(self):
+        """Escribe lo pendiente en la cola, cierra el archivo y actualiza el encabezado."""
+        if self.thread is None:
+            return
+        self.queue.put(STOP)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
+        self.write_header()
+
+
+def read_recording(bin_path):
+    """Abre una grabación binaria. Devuelve (encabezado, arreglo memmap de muestras x columnas)."""
+    with open(header_path(bin_path)) as header_file:
+        header = json.load(header_file)
+    n_columns = len(header['columns'])
+    n_samples = os.path.getsize(bin_path) // (np.dtype(header['dtype']).itemsize * n_columns)
+    if n_samples == 0:
+        return header, np.zeros((0, n_columns), dtype=header['dtype'])
+    data = np.memmap(bin_path, dtype=header['dtype'], mode='r', shape=(n_samples, n_columns))
+    return header, data
+
+
+def write_recording(bin_path, values, column_labels, sample_rate, event_columns, **extra):
+    """Escribe de una vez un arreglo (muestras x columnas) como grabación binaria float64 con su encabezado.
+
+    Lo usan las instantáneas del buffer en vivo y los CSV decodificados; `extra` se agrega al encabezado."""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    values.tofile(bin_path)
+    header = {
+        'format': 'neuromuscular-bin',
+        'version': 1,
+        'columns': list(column_labels),
+        'event_columns': list(event_columns),
+        'sample_rate': sample_rate,
+        'dtype': 'float64',
+        'scale': [1.0] * len(column_labels),
+        'layout': 'samples x columns',
+        'n_samples': len(values),
+        **extra,
+    }
+    with open(header_path(bin_path), 'w') as header_file:
+        json.dump(header, header_file, indent=2)
+    return bin_path
+
+
+def to_dataframe(bin_path):
+    """Carga una grabación binaria como DataFrame en las unidades originales (V y valores de evento)."""
+    header, data = read_recording(bin_path)
+    values = np.asarray(data, dtype=np.float64) * np.array(header['scale'])
+    return pd.DataFrame(values, columns=header['columns'])
+
+
+def to_csv(bin_path, csv_path=None, chunk_size=200000):
+    """Convierte una grabación binaria a CSV con las mismas columnas que guardaba SaveThread."""
+    if csv_path is None:
+        csv_path = os.path.splitext(bin_path)[0] + '.csv'
+    header, data = read_recording(bin_path)
+    scale = np.array(header['scale'])
+    with open(csv_path, 'w', newline='') as csvfile:
+        csvfile.write(','.join(header['columns']) + '\n')
+        for start in range(0, len(data), chunk_size):
+            chunk = np.asarray(data[start:start + chunk_size], dtype=np.float64) * scale
+            pd.DataFrame(chunk).to_csv(csvfile, header=False, index=False)
+    return csv_path
+
+
+if __name__ == "__main__":
+    # Uso: python recorder.py archivo.bin [archivo.csv]
+    print(to_csv(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None))
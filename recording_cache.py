@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+# Versión del formato de la caché; al cambiarla se reconstruyen todas
+CACHE_VERSION = 1
+
+# Carpeta de respaldo si no se puede escribir junto al CSV (unidad de sólo lectura, carpeta compartida)
+FALLBACK_DIR = os.path.join(tempfile.gettempdir(), 'neuromuscular_cache')
+
+
+def cache_dirs(csv_path):
+    """Carpetas donde puede estar la caché de `csv_path`: junto al CSV y, si no, en la carpeta temporal."""
+    source = os.path.abspath(csv_path)
+    folder, name = os.path.split(source)
+    stem = os.path.splitext(name)[0]
+    fallback = f'{stem}_{hashlib.md5(source.encode()).hexdigest()[:12]}'
+    return [os.path.join(folder, '__cache__', stem), os.path.join(FALLBACK_DIR, fallback)]
+
+
+def source_key(csv_path):
+    """Ruta, fecha de modificación y tamaño del CSV: si alguno cambia la caché deja de valer."""
+    stat = os.stat(csv_path)
+    return {'source': os.path.abspath(csv_path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def find_cache(csv_path):
+    """Carpeta y encabezado de una caché válida de `csv_path`, o None si no la hay."""
+    key = source_key(csv_path)
+    for folder in cache_dirs(csv_path):
+        try:
+            with open(os.path.join(folder, 'index.json')) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            continue
+        if index.get('version') == CACHE_VERSION and all(index.get(k) == v for k, v in key.items()):
+            return folder, index
+    return None
+
+
+def build(csv_path):
+    """Convierte el CSV, una sola vez, a un archivo .npy por columna. Devuelve la carpeta de la caché.
+
+    Si ya hay una caché válida no se hace nada."""
+    found = find_cache(csv_path)
+    if found is not None:
+        return found[0]
+    key = source_key(csv_path)
+    return store(csv_path, pd.read_csv(csv_path), key)
+
+
+def store(csv_path, df, key=None):
+    """Guarda `df` (el contenido de `csv_path`) como caché de columnas. Devuelve la carpeta o None.
+
+    Las columnas se guardan con el tipo que les da pandas, así que la tabla cargada desde la caché es
+    la misma que la del CSV (desde una tabla en memoria los valores pueden diferir en el último bit del
+    redondeo del lector de CSV). Devuelve None si hay columnas de texto (no se pueden abrir como memmap) o
+    si no se pudo escribir en ningún lado."""
+    key = key or source_key(csv_path)
+    if any(dtype.kind not in 'biuf' for dtype in df.dtypes):
+        return None
+    index = {'version': CACHE_VERSION, **key, 'columns': list(df.columns), 'n_samples': len(df),
+             'created': time.time()}
+    for folder in cache_dirs(csv_path):
+        # Se escribe en una carpeta temporal y se renombra al final: una caché a medias nunca es visible
+        temporary = f'{folder}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(temporary, exist_ok=True)
+            for i, column in enumerate(df.columns):
+                np.save(os.path.join(temporary, f'{i}.npy'), np.ascontiguousarray(df[column].to_numpy()))
+            with open(os.path.join(temporary, 'index.json'), 'w') as index_file:
+                json.dump(index, index_file, indent=2)
+            if os.path.exists(folder):
+                shutil.rmtree(folder) # Caché de una versión anterior del CSV
+            os.rename(temporary, folder)
+            return folder
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+            found = find_cache(csv_path)
+            if found is not None:
+                return found[0] # Otro proceso la terminó primero
+    return None
+
+
+def open_columns(csv_path, columns=None, build_missing=True):
+    """Columnas de la caché como memmaps: {nombre: arreglo}. None si el CSV no se puede guardar en caché.
+
+    Los memmaps se abren en modo copia-al-escribir ('c'): el código de análisis puede modificarlos
+    sin tocar la caché en disco."""
+    found = find_cache(csv_path)
+    if found is None and build_missing and build(csv_path) is not None:
+        found = find_cache(csv_path)
+    if found is None:
+        return None
+    folder, index = found
+    names = index['columns'] if columns is None else list(columns)
+    return {name: np.load(os.path.join(folder, f"{index['columns'].index(name)}.npy"), mmap_mode='c')
+            for name in names}
+
+
+def load(csv_path, columns=None):
+    """DataFrame del CSV armado sobre los memmaps de la caché (se construye si falta), o None."""
+    arrays = open_columns(csv_path, columns)
+    if arrays is None:
+        return None
+    return pd.DataFrame(arrays, copy=False)
+
+
+if __name__ == "__main__":
+    # Prueba: python recording_cache.py [archivo.csv] [--minutos=N]
+    # Sin archivo genera un CSV sintético de 13 canales a 3.3 kHz con las columnas de ciclo.
+    minutes = next((float(arg[len('--minutos='):]) for arg in sys.argv[1:] if arg.startswith('--minutos=')), 2.0)
+    files = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if files:
+        path = files[0]
+    else:
+        import replay
+        import post_processing
+        work = os.path.join(tempfile.gettempdir(), 'cache_sintetico')
+        os.makedirs(work, exist_ok=True)
+        path = post_processing.process_file(
+            replay.synthetic_recording(os.path.join(work, 'cache_sintetico.bin'), seconds=60 * minutes), 1 / 3300)
+        for folder in cache_dirs(path):
+            shutil.rmtree(folder, ignore_errors=True)
+    t0 = time.perf_counter()
+    reference = pd.read_csv(path)
+    t1 = time.perf_counter()
+    build(path)
+    t2 = time.perf_counter()
+    table = load(path)
+    t3 = time.perf_counter()
+    same = list(table.columns) == list(reference.columns) and all(
+        np.array_equal(table[c].to_numpy(), reference[c].to_numpy(), equal_nan=True) for c in reference.columns)
+    print(f"{len(reference)} filas x {len(reference.columns)} columnas, tabla idéntica al CSV: {same}")
+    print(f"pd.read_csv {t1 - t0:.2f} s, construcción de la caché {t2 - t1:.2f} s, "
+          f"apertura desde la caché {1e3 * (t3 - t2):.1f} ms ({find_cache(path)[0]})")
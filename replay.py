@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import queue
+import tempfile
+import threading
+import numpy as np
+import recorder
+from daq_backend import ReplayBackend, SimulatedAITask
+from acquisition_process import AcquisitionWorker
+from ring_buffer import EVENT_LABELS
+
+
+def recorded_ups(path):
+    """Índices de los cruces ascendentes (columna UP) guardados en la grabación, si los tiene."""
+    if os.path.splitext(path)[1].lower() == '.bin':
+        header, data = recorder.read_recording(path)
+        if 'UP' not in header['columns']:
+            return None
+        return np.flatnonzero(np.asarray(data[:, header['columns'].index('UP')]) != 0)
+    from post_processing import load_table
+    df = load_table(path)
+    if 'UP' not in df.columns:
+        return None
+    return np.flatnonzero(df['UP'].to_numpy() == 1)
+
+
+def match_events(detected, reference, tolerance):
+    """Cuántos eventos detectados tienen un evento de referencia a no más de `tolerance` muestras."""
+    if len(detected) == 0 or len(reference) == 0:
+        return 0
+    k = np.clip(np.searchsorted(reference, detected), 1, len(reference) - 1)
+    nearest = np.minimum(np.abs(reference[k - 1] - detected), np.abs(reference[k] - detected))
+    if len(reference) == 1:
+        nearest = np.abs(reference[0] - detected)
+    return int(np.count_nonzero(nearest <= tolerance))
+
+
+def replay(path, speed=0.0, channel=0, threshold=1.0, hysteresis_up=0.0, hysteresis_down=0.0, hold_off_time=0.0,
+           crosses_max=1, stims=None, delay_time=0.0, tmax=20, tolerance=0.005):
+    """Reproduce una grabación por el lazo de adquisición, detección y estimulación sin interfaz.
+
+    Usa `AcquisitionWorker` (el mismo lazo del modo --proceso) con `ReplayBackend`, en este proceso:
+    bloque adaptativo, buffer circular, envolvente, detector de cruces, tabla de estímulos y motor de
+    pulsos. `speed` es el múltiplo del tiempo real (0 = tan rápido como se pueda). Devuelve un
+    diccionario con el throughput, los eventos detectados y, si la grabación trae la columna UP,
+    la coincidencia con los cruces guardados (dentro de `tolerance` segundos)."""
+    backend = ReplayBackend(path, speed=speed, loop=False)
+    sample_rate, labels = backend.recording_info()
+    control, events = queue.Queue(), queue.Queue()
+    worker = AcquisitionWorker(f'nmsig_replay_{os.getpid()}', len(labels), sample_rate, tmax, sample_rate,
+                               backend.devices[0][0], backend, None, control, events)
+    # La configuración se aplica con los mismos comandos que envía la interfaz
+    stims = stims if stims is not None else {1: [1], 2: [], 3: []}
+    for command, value in [('channel', channel), ('threshold', threshold), ('hysteresis_up', hysteresis_up),
+                           ('hysteresis_down', hysteresis_down), ('hold_off', hold_off_time),
+                           ('delay', delay_time), ('crosses_max', crosses_max), ('stims', stims),
+                           ('stim_apply', [bool(stims.get(i)) for i in (1, 2, 3)])]:
+        control.put((command, value))
+
+    ups, downs, tags = [], [], 0
+    error = None
+    thread = threading.Thread(target=worker.run, name='Reproduccion', daemon=True)
+    t_start = time.perf_counter()
+    thread.start()
+    finished = False
+    while not finished:
+        for event in events.get():
+            if event[0] == 'up':
+                ups.append(event[2])
+            elif event[0] == 'down':
+                downs.append(event[2])
+            elif event[0] == 'tag':
+                tags += 1
+            elif event[0] == 'error':
+                error = event[1]
+                finished = True
+            elif event[0] == 'end':
+                finished = True
+    elapsed = time.perf_counter() - t_start
+    thread.join(timeout=2.0)
+
+    task = backend.ai_task
+    samples = min(task.samples_generated, task.n_recorded) if task else 0
+    result = {
+        'archivo': os.path.basename(path),
+        'canales': len(labels),
+        'sample_rate': sample_rate,
+        'velocidad': speed,
+        'muestras': samples,
+        'segundos_grabados': samples / sample_rate,
+        'segundos_reproduccion': elapsed,
+        'velocidad_lograda': samples / sample_rate / elapsed if elapsed > 0 else 0.0,
+        'muestras_s': samples / elapsed if elapsed > 0 else 0.0, # Por canal
+        'valores_s': samples * len(labels) / elapsed if elapsed > 0 else 0.0, # Todos los canales
+        'muestras_perdidas': task.dropped_samples if task else 0,
+        'cruces_up': len(ups),
+        'cruces_down': len(downs),
+        'estimulos': tags,
+        'pulsos': len(backend.pulse_log),
+    }
+    if error is not None:
+        result['error'] = error
+    if len(ups) > 1:
+        result['frecuencia_ciclo_hz'] = float(sample_rate / np.mean(np.diff(ups)))
+    reference = recorded_ups(path)
+    if reference is not None and len(reference):
+        matched = match_events(np.array(ups), reference, round(tolerance * sample_rate))
+        result['up_grabados'] = len(reference)
+        result['up_coincidentes'] = matched
+        result['sensibilidad'] = matched / len(reference)
+        result['precision'] = matched / len(ups) if ups else 0.0
+    return result
+
+
+def synthetic_recording(path, seconds=30.0, n_channels=13, sample_rate=3300, threshold=1.0):
+    """Graba `seconds` segundos del dispositivo simulado con la columna UP marcada en el canal 1."""
+    task = SimulatedAITask(n_channels, sample_rate, sample_rate, realtime=False)
+    labels = [f'CH {i + 1}' for i in range(n_channels)] + EVENT_LABELS
+    rec = recorder.BinaryRecorder(path, labels, sample_rate, EVENT_LABELS)
+    rec.open()
+    above = False
+    for _ in range(int(seconds)):
+        data = task.read(sample_rate)
+        events = np.zeros((len(EVENT_LABELS), sample_rate))
+        crossing = data[0] >= threshold
+        starts = np.flatnonzero(crossing[1:] & ~crossing[:-1]) + 1
+        if crossing[0] and not above:
+            starts = np.r_[0, starts]
+        events[0, starts] = 1
+        above = bool(crossing[-1])
+        rec.push(data, events)
+    rec.close()
+    return path
+
+
+if __name__ == "__main__":
+    # Uso: python replay.py [archivo.bin|archivo.csv] [--velocidad=N] [--umbral=V] [--canal=N] [--holdoff=S]
+    # Sin archivo se reproduce una grabación sintética de 30 s. --velocidad=0 (por defecto) es lo más rápido posible.
+    options = {'--velocidad=': 0.0, '--umbral=': 1.0, '--canal=': 1, '--holdoff=': 0.0}
+    for arg in sys.argv[1:]:
+        for flag in options:
+            if arg.startswith(flag):
+                options[flag] = type(options[flag])(arg[len(flag):])
+    files = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    path = files[0] if files else synthetic_recording(os.path.join(tempfile.gettempdir(), 'replay_sintetico.bin'))
+    result = replay(path, speed=options['--velocidad='], threshold=options['--umbral='],
+                    channel=options['--canal='] - 1, hold_off_time=options['--holdoff='])
+    for key, value in result.items():
+        print(f"{key}: {value:.4g}" if isinstance(value, float) else f"{key}: {value}")
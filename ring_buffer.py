@@ -0,0 +1,132 @@
+import numpy as np
+
+
+# Carriles de eventos que acompañan a las señales en el buffer circular (mismos nombres que en el CSV)
+EVENT_LABELS = ['UP', 'DOWN', 'STIM 1', 'STIM 2', 'STIM 3']
+
+
+class RingBuffer:
+    """Buffer circular preasignado de (canales x capacidad) para la adquisición en vivo.
+
+    La tarea de adquisición escribe cada bloque en el buffer con `read_from` y los consumidores
+    (gráfica, guardado, detector) reciben vistas del bloque recién escrito en lugar de copias.
+    El buffer es (canales x capacidad), así que un bloque es un rango de columnas y no es contiguo
+    en memoria: el backend simulado escribe en él sin copias, pero el lector de nidaqmx (que exige
+    un arreglo contiguo) lee en un arreglo auxiliar y copia el bloque (ver `NIDAQTask`).
+    Los bloques nunca cruzan el final del buffer: si el bloque solicitado no cabe, se recorta hasta
+    el final y el siguiente empieza en el índice 0, de modo que cada bloque es una vista contigua.
+
+    Hay un solo escritor (el hilo de adquisición) y varios lectores (`RingReader`) que avanzan a su
+    propio ritmo sin bloqueos: el escritor sólo publica `write_count` después de escribir el bloque.
+    Junto a las señales se guardan los carriles de eventos (UP, DOWN, STIM 1-3); se limpian media
+    vuelta por delante del escritor para que las marcas de estímulo con retardo, que caen por delante
+    del índice de escritura, no se borren antes de que los lectores las vean."""
+
+    def __init__(self, n_channels, capacity, dtype=np.float64, envelope=False):
+        self.n_channels = n_channels
+        self.generation = 0 # Se incrementa cada vez que el buffer se reasigna
+        self.has_envelope = envelope # Reserva también la envolvente de cada canal (StreamingEnvelope)
+        self.allocate(capacity, dtype)
+
+    def allocate(self, capacity, dtype):
+        self.capacity = int(capacity)
+        self.data = np.zeros((self.n_channels, self.capacity), dtype=dtype)
+        self.events = np.zeros((len(EVENT_LABELS), self.capacity))
+        # Envolvente de cada canal, alineada muestra a muestra con `data`
+        self.envelope = np.zeros((self.n_channels, self.capacity)) if self.has_envelope else None
+        self.max_lag = self.capacity // 2 # Atraso máximo de un lector antes de considerarse desbordado
+        self.write_count = 0 # Total de muestras escritas desde el inicio (no se reinicia al dar la vuelta)
+        self.block_count = 0 # Total de bloques publicados
+
+    @property
+    def write_index(self):
+        """Posición en el buffer donde se escribirá el siguiente bloque."""
+        return self.write_count % self.capacity
+
+    def resize(self, capacity):
+        """Reasigna el buffer con una nueva capacidad y reinicia el conteo de escritura."""
+        self.allocate(capacity, self.data.dtype)
+        self.generation += 1
+
+    def read_from(self, task, n):
+        """Lee hasta `n` muestras por canal de `task` en el buffer.
+
+        `task` debe ofrecer `read_many_sample(data, number_of_samples_per_channel)` al estilo de los
+        stream readers de nidaqmx. Devuelve (índice de inicio, muestras leídas). El bloque no queda
+        publicado hasta llamar a `commit`."""
+        start = self.write_index
+        n = min(int(n), self.capacity - start)
+        task.read_many_sample(self.data[:, start:start + n], number_of_samples_per_channel=n)
+        return start, n
+
+    def commit(self, n):
+        """Publica las `n` muestras escritas en la última lectura."""
+        # Limpia los eventos de hace media vuelta en la región que el escritor alcanzará más adelante
+        clear_start = (self.write_count + self.max_lag) % self.capacity
+        clear_end = clear_start + n
+        self.events[:, clear_start:min(clear_end, self.capacity)] = 0
+        if clear_end > self.capacity:
+            self.events[:, :clear_end - self.capacity] = 0
+        self.write_count += n
+        self.block_count += 1
+
+    def view(self, start, n):
+        """Vista (sin copia) de las muestras [start, start + n) de todos los canales."""
+        return self.data[:, start:start + n]
+
+    def reader(self):
+        """Crea un lector independiente que empieza en la posición actual del escritor."""
+        return RingReader(self)
+
+
+class RingReader:
+    """Cursor de lectura de un consumidor del buffer circular.
+
+    Cada consumidor (gráfica, guardado) tiene su propio cursor y lee a su ritmo. Si se atrasa más de
+    `max_lag` muestras, las más antiguas se dan por perdidas y se cuentan como desbordamiento."""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.overruns = 0 # Número de veces que el lector se quedó atrás
+        self.lost_samples = 0 # Muestras que el lector no alcanzó a consumir
+        self.blocks = 0 # Bloques publicados entre las dos últimas lecturas
+        self.seek_to_end()
+
+    def seek_to_end(self):
+        """Descarta lo pendiente y continúa desde la posición actual del escritor."""
+        self.generation = self.ring.generation
+        self.cursor = self.ring.write_count
+        self.block_cursor = self.ring.block_count
+
+    def pending(self):
+        """Número de muestras publicadas que el lector aún no consume."""
+        return self.ring.write_count - self.cursor
+
+    def poll(self, hold_back=0):
+        """Devuelve la lista de segmentos (inicio, muestras) publicados desde la última lectura.
+
+        Cada segmento es contiguo en el buffer; se leen con `ring.view` y `ring.events`. Con `hold_back`
+        el lector se queda esas muestras detrás del escritor: el guardado deja tiempo a que el
+        planificador de estimulación escriba las marcas STIM de los bloques ya publicados."""
+        ring = self.ring
+        if self.generation != ring.generation:
+            # El buffer se reasignó (cambio de ventana o de frecuencia): se empieza de nuevo
+            self.seek_to_end()
+            return []
+        block_end = ring.block_count
+        end = max(ring.write_count - hold_back, self.cursor)
+        self.blocks = block_end - self.block_cursor
+        self.block_cursor = block_end
+        lag = end - self.cursor
+        if lag > ring.max_lag:
+            self.overruns += 1
+            self.lost_samples += lag - ring.max_lag
+            self.cursor = end - ring.max_lag
+
+        segments = []
+        while self.cursor < end:
+            start = self.cursor % ring.capacity
+            n = min(end - self.cursor, ring.capacity - start)
+            segments.append((start, n))
+            self.cursor += n
+        return segments
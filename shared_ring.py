@@ -0,0 +1,211 @@
+import threading
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from ring_buffer import RingBuffer, EVENT_LABELS
+
+
+# Campos del encabezado compartido (int64)
+GENERATION, CAPACITY, N_CHANNELS, WRITE_COUNT, BLOCK_COUNT, ENVELOPE = range(6)
+HEADER_FIELDS = 6
+
+
+# Evita que dos hilos que se conectan a la vez dejen `resource_tracker.register` sustituido
+tracker_lock = threading.Lock()
+
+
+def open_segment(name, create=False, size=0):
+    """Abre (o crea) un segmento de memoria compartida.
+
+    Quien sólo se conecta a un segmento no lo deja registrado en el resource_tracker; así el segmento
+    no se borra cuando termina el proceso que lo lee. En Python >= 3.13 basta con `track=False`; antes
+    se omite el registro al conectarse. No sirve registrar y retirar el registro después: el proceso
+    hijo comparte el resource_tracker de la interfaz, que guarda cada nombre una sola vez, y se
+    perdería también el registro de quien creó el segmento."""
+    if create:
+        with tracker_lock:
+            return shared_memory.SharedMemory(name=name, create=True, size=size)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        with tracker_lock:
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+
+class SharedRingBuffer(RingBuffer):
+    """Buffer circular de adquisición en memoria compartida entre procesos.
+
+    Tiene la misma interfaz que `RingBuffer` (los `RingReader` de la gráfica y el guardado funcionan
+    sin cambios), pero las señales, los carriles de eventos y los contadores viven en segmentos de
+    `multiprocessing.shared_memory`. El proceso de adquisición crea el buffer (`create=True`) y es el
+    único escritor; la interfaz se conecta con el mismo nombre y sólo lee.
+
+    Los contadores (generación, capacidad, muestras y bloques escritos) están en un encabezado de
+    tamaño fijo. Cada reasignación crea un segmento de datos nuevo `<nombre>_g<generación>`; los
+    lectores detectan el cambio de generación y se conectan al nuevo segmento. En la interfaz varios hilos
+    (gráfica, guardado, instantáneas) comparten el mismo lector; la reconexión se hace bajo un candado.
+    Al reconectarse, el lector no cierra el segmento anterior: las vistas de numpy no impiden que se
+    desmapee y otro hilo puede estar leyéndolo. Se cierra en `close`; el escritor ya lo eliminó, así
+    que el sistema libera la memoria entonces."""
+
+    def __init__(self, name, n_channels=None, capacity=None, create=False, envelope=False):
+        self.name = name
+        self.create = create
+        self.segment = None
+        self.attached_generation = -1
+        self.attach_lock = threading.Lock()
+        self.retired = [] # Lector: segmentos de generaciones anteriores, abiertos hasta `close`
+        if create:
+            self.header_segment = open_segment(f'{name}_hdr', create=True, size=HEADER_FIELDS * 8)
+            self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.header_segment.buf)
+            self.header[:] = 0
+            self.header[N_CHANNELS] = n_channels
+            self.header[ENVELOPE] = envelope
+            self.allocate(capacity, np.float64)
+        else:
+            self.header_segment = open_segment(f'{name}_hdr')
+            self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.header_segment.buf)
+            self.attach()
+
+    # Contadores publicados en el encabezado compartido
+    @property
+    def n_channels(self):
+        return int(self.header[N_CHANNELS])
+
+    @property
+    def has_envelope(self):
+        return bool(self.header[ENVELOPE])
+
+    @property
+    def generation(self):
+        return int(self.header[GENERATION])
+
+    @property
+    def capacity(self):
+        return int(self.header[CAPACITY])
+
+    @property
+    def max_lag(self):
+        return self.capacity // 2
+
+    @property
+    def write_count(self):
+        return int(self.header[WRITE_COUNT])
+
+    @write_count.setter
+    def write_count(self, value):
+        self.header[WRITE_COUNT] = value
+
+    @property
+    def block_count(self):
+        return int(self.header[BLOCK_COUNT])
+
+    @block_count.setter
+    def block_count(self, value):
+        self.header[BLOCK_COUNT] = value
+
+    # Señales y eventos: se reconectan si el escritor reasignó el buffer
+    @property
+    def data(self):
+        return self.current('_data')
+
+    @property
+    def events(self):
+        return self.current('_events')
+
+    @property
+    def envelope(self):
+        return self.current('_envelope')
+
+    def current(self, attribute):
+        """Arreglo de la generación actual; un solo hilo a la vez puede reconectarse."""
+        with self.attach_lock:
+            if self.attached_generation != self.generation:
+                self.attach()
+            return getattr(self, attribute)
+
+    def segment_name(self, generation):
+        return f'{self.name}_g{generation}'
+
+    def segment_rows(self):
+        """Filas del segmento de datos: señales, envolventes (opcionales) y carriles de eventos."""
+        return self.n_channels * (2 if self.has_envelope else 1) + len(EVENT_LABELS)
+
+    def map_segment(self, segment, capacity):
+        block = np.ndarray((self.segment_rows(), capacity), dtype=np.float64, buffer=segment.buf)
+        n = self.n_channels
+        self._data = block[:n]
+        self._envelope = block[n:2 * n] if self.has_envelope else None
+        self._events = block[-len(EVENT_LABELS):]
+
+    def attach(self):
+        """Lector: se conecta al segmento de datos de la generación actual (con `attach_lock` tomado)."""
+        while True:
+            generation = self.generation
+            try:
+                segment = open_segment(self.segment_name(generation))
+                break
+            except FileNotFoundError:
+                # El escritor reasignó otra vez mientras se conectaba: se intenta con la generación nueva
+                if generation == self.generation:
+                    raise
+        if self.segment is not None:
+            self.retired.append(self.segment)
+        self.segment = segment
+        self.map_segment(segment, self.capacity)
+        self.attached_generation = generation
+
+    def allocate(self, capacity, dtype):
+        """Escritor: crea el segmento de la siguiente generación y lo publica en el encabezado."""
+        if dtype != np.float64:
+            raise ValueError("El buffer compartido sólo admite float64")
+        generation = self.generation + 1
+        capacity = int(capacity)
+        segment = open_segment(self.segment_name(generation), create=True,
+                               size=self.segment_rows() * capacity * 8)
+        old = self.segment
+        self.segment = segment
+        self.map_segment(segment, capacity)
+        self._events[:] = 0
+        self.header[WRITE_COUNT] = 0
+        self.header[BLOCK_COUNT] = 0
+        self.header[CAPACITY] = capacity
+        # La generación se publica al final, cuando el segmento nuevo ya está listo
+        self.header[GENERATION] = generation
+        self.attached_generation = generation
+        if old is not None:
+            # Los lectores conservan su propia conexión al segmento anterior hasta reconectarse
+            self.release(old, unlink=True)
+
+    def resize(self, capacity):
+        """Reasigna el buffer con una nueva capacidad (la generación avanza en `allocate`)."""
+        self.allocate(capacity, np.float64)
+
+    @staticmethod
+    def release(segment, unlink):
+        try:
+            segment.close()
+        except BufferError:
+            pass # El buffer del segmento sigue exportado; se libera al terminar el proceso
+        if unlink:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Cierra los segmentos; el escritor además los elimina."""
+        segment = self.segment
+        self._data = self._events = self._envelope = None
+        self.segment = None
+        if segment is not None:
+            self.release(segment, unlink=self.create)
+        for old in self.retired:
+            self.release(old, unlink=False)
+        self.retired = []
+        self.header = None
+        self.release(self.header_segment, unlink=self.create)
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from ring_buffer import EVENT_LABELS
+from recorder import header_path, write_recording
+
+
+# Carpeta donde se dejan las instantáneas (en Linux suele estar en memoria; en Windows queda en la caché de disco)
+SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), 'neuromuscular_snapshots')
+
+
+def snapshot_samples(ring, seconds, sample_rate):
+    """Muestras que puede tener una instantánea de `seconds` segundos.
+
+    Los carriles de eventos se limpian media vuelta por delante del escritor, así que sólo la mitad
+    más reciente del buffer tiene los eventos completos: la instantánea no pasa de `ring.max_lag`."""
+    return max(0, min(int(round(seconds * sample_rate)), ring.max_lag, ring.write_count))
+
+
+def take_snapshot(ring, seconds, sample_rate, column_labels, path=None):
+    """Congela los últimos `seconds` segundos del buffer circular en una grabación binaria.
+
+    Copia señales y carriles de eventos (UP, DOWN, STIM 1-3) en orden cronológico a un archivo
+    con el mismo formato que `recorder.BinaryRecorder` (.bin de muestras x columnas en float64
+    y encabezado .json), así que se abre como memmap con `recorder.read_recording` sin pasar por un CSV.
+    Funciona igual con `RingBuffer` y con `SharedRingBuffer`. Devuelve la ruta del archivo .bin."""
+    generation = ring.generation
+    end = ring.write_count
+    n = snapshot_samples(ring, seconds, sample_rate)
+    if n == 0:
+        raise ValueError("El buffer de adquisición aún no tiene muestras")
+    if path is None:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = os.path.join(SNAPSHOT_DIR, time.strftime('snapshot_%Y%m%d_%H%M%S') + f'_{end}.bin')
+
+    n_channels = ring.n_channels
+    columns = list(column_labels)
+    if len(columns) != n_channels + len(EVENT_LABELS):
+        raise ValueError(f"Se dieron {len(columns)} columnas para {n_channels} canales + eventos")
+    capacity = ring.capacity
+    values = np.empty((n, len(columns)))
+
+    # La ventana [end - n, end) puede dar la vuelta al final del buffer: se copia en dos tramos
+    start = (end - n) % capacity
+    first = min(n, capacity - start)
+    for source, target in ((slice(start, start + first), slice(0, first)), (slice(0, n - first), slice(first, n))):
+        values[target, :n_channels] = ring.data[:, source].T
+        values[target, n_channels:] = ring.events[:, source].T
+
+    if ring.generation != generation:
+        raise RuntimeError("El buffer se reasignó mientras se tomaba la instantánea")
+    # El escritor siguió avanzando durante la copia: las muestras más antiguas pudieron sobrescribirse
+    # (o perder sus eventos), así que se descartan del inicio de la instantánea
+    overlap = max(0, n + (ring.write_count - end) - ring.max_lag)
+    values = values[overlap:]
+    n = len(values)
+    return write_recording(path, values, columns, sample_rate, EVENT_LABELS,
+                           snapshot={'taken_at': time.time(), 'first_sample': end - n, 'seconds': n / sample_rate})
+
+
+if __name__ == "__main__":
+    # Prueba: instantánea de un buffer con la vuelta dada y tiempo de apertura como tabla de análisis
+    from ring_buffer import RingBuffer
+    import post_processing
+    fs = 3300
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 8.0
+    ring = RingBuffer(13, 20 * fs)
+    rng = np.random.default_rng(0)
+    for _ in range(55):
+        block = ring.write_index
+        n = min(fs, ring.capacity - block)
+        ring.data[:, block:block + n] = rng.standard_normal((13, n))
+        ring.events[0, block] = 1
+        ring.events[1, block + n // 2] = 1
+        ring.commit(n)
+    labels = [f'CH {i + 1}' for i in range(13)] + EVENT_LABELS
+    t0 = time.perf_counter()
+    path = take_snapshot(ring, seconds, fs, labels)
+    t1 = time.perf_counter()
+    table = post_processing.load_table(path)
+    t2 = time.perf_counter()
+    last = (ring.write_count - 1) % ring.capacity
+    print(f"{len(table)} muestras, UP: {int(table['UP'].sum())}, "
+          f"última muestra correcta: {table['CH 1'].iloc[-1] == ring.data[0, last]}")
+    print(f"instantánea {1e3 * (t1 - t0):.1f} ms, apertura como tabla {1e3 * (t2 - t1):.1f} ms ({path})")
+    os.remove(path)
+    os.remove(header_path(path))
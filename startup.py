@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import logging
+import importlib
+import importlib.util
+import subprocess
+
+
+# Bibliotecas pesadas de los análisis; se importan al primer uso (ver `lazy_import`)
+HEAVY_MODULES = ['matplotlib.pyplot', 'scipy.signal', 'scipy.stats', 'scipy.ndimage', 'pywt', 'joblib',
+                 'sklearn.preprocessing', 'sklearn.decomposition', 'seaborn']
+
+# Módulos de interfaz generados a partir de los .ui (__pycache__ ya está excluido del repositorio)
+UI_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__', 'ui')
+
+# Costo medido de cada importación diferida y de cada carga de interfaz en este proceso [s]
+timings = {}
+
+
+def timed_import(module_name):
+    """Importa un módulo y registra cuánto tardó (0 si ya estaba importado)."""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    timings[module_name] = time.perf_counter() - start
+    return module
+
+
+class LazyImport:
+    """Módulo (o atributo de un módulo) que se importa la primera vez que se usa.
+
+    Se comporta como el objeto real al pedirle atributos o al llamarlo, así que el código que lo
+    usa no cambia: `plt.figure()`, `butter(4, 0.1)` o `PCA()` importan la biblioteca en ese momento."""
+
+    def __init__(self, module_name, attribute=None):
+        self._module_name = module_name
+        self._attribute = attribute
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            module = timed_import(self._module_name)
+            self._target = getattr(module, self._attribute) if self._attribute else module
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f'{self._module_name}.{self._attribute}' if self._attribute else self._module_name
+        return f'<importación diferida de {name}{"" if self._target is None else " (cargada)"}>'
+
+
+def lazy_import(module_name, *names):
+    """Equivalente diferido de `import módulo` (sin nombres) o de `from módulo import a, b`.
+
+    Con un nombre devuelve un objeto; con varios, una tupla en el mismo orden."""
+    if not names:
+        return LazyImport(module_name)
+    objects = tuple(LazyImport(module_name, name) for name in names)
+    return objects[0] if len(objects) == 1 else objects
+
+
+def compiled_ui(ui_file):
+    """Módulo de Python generado a partir de `ui_file`; se regenera si el .ui es más reciente.
+
+    El módulo generado se importa como cualquier otro, así que Python guarda también su bytecode."""
+    source = os.path.abspath(ui_file)
+    name = 'ui_' + os.path.splitext(os.path.basename(source))[0]
+    cached = os.path.join(UI_CACHE_DIR, name + '.py')
+    if not os.path.exists(cached) or os.path.getmtime(cached) < os.path.getmtime(source):
+        from PyQt6 import uic
+        os.makedirs(UI_CACHE_DIR, exist_ok=True)
+        # Se escribe a un temporal y se reemplaza: varios procesos del pool pueden compilar a la vez
+        temporary = f'{cached}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as output:
+            uic.compileUi(source, output)
+        os.replace(temporary, cached)
+    spec = importlib.util.spec_from_file_location(name, cached)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_ui(ui_file, widget):
+    """Reemplazo de `loadUi(ui_file, widget)` que usa la clase de interfaz compilada y guardada.
+
+    Construye los mismos widgets, con los mismos nombres de atributo en `widget`, sin volver a leer
+    el XML en cada apertura. Si no se puede compilar, se usa `loadUi` como antes."""
+    start = time.perf_counter()
+    try:
+        module = compiled_ui(ui_file)
+        ui_class = next(value for key, value in vars(module).items() if key.startswith('Ui_'))
+        ui = ui_class()
+        ui.setupUi(widget)
+        # loadUi deja cada widget como atributo de la ventana; setupUi los deja en el objeto `ui`
+        for name, value in vars(ui).items():
+            setattr(widget, name, value)
+    except (OSError, StopIteration, SyntaxError) as e:
+        logging.warning(f'No se pudo usar la interfaz compilada de {ui_file}: {e}')
+        from PyQt6.uic import loadUi
+        loadUi(ui_file, widget)
+    timings[os.path.basename(ui_file)] = time.perf_counter() - start
+
+
+def report():
+    """Texto con el costo de cada importación diferida y carga de interfaz, de mayor a menor."""
+    lines = [f'{name:<52}{1e3 * seconds:>9.1f} ms' for name, seconds in
+             sorted(timings.items(), key=lambda item: item[1], reverse=True)]
+    return '\n'.join(lines)
+
+
+def cold_import_time(module_name, cwd=None):
+    """Segundos que tarda `import module_name` en un intérprete nuevo, o el error si no se puede importar."""
+    code = ('import time, importlib\n'
+            't = time.perf_counter()\n'
+            f'importlib.import_module({module_name!r})\n'
+            'print(time.perf_counter() - t)')
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return result.stderr.strip().splitlines()[-1]
+    return float(result.stdout)
+
+
+if __name__ == "__main__":
+    # Reporte del costo de importación: python startup.py [MÓDULO ...]
+    # Cada módulo se importa en un intérprete nuevo (sin caché de módulos), como al abrir un análisis.
+    from analysis_pool import ANALYSIS_DIR, ANALYSIS_MODULES
+    names = sys.argv[1:] or ANALYSIS_MODULES + ['PRINCIPAL'] + HEAVY_MODULES
+    for name in names:
+        cost = cold_import_time(name, cwd=ANALYSIS_DIR)
+        print(f'{name:<28}' + (f'{1e3 * cost:>9.1f} ms' if isinstance(cost, float) else f'  no disponible ({cost})'))
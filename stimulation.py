@@ -0,0 +1,111 @@
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+import numpy as np
+import latency
+import telemetry
+
+
+# Líneas digitales de los 3 estimuladores
+DEVICE_CHANNELS = ['port1/line0', 'port1/line1', 'port1/line2']
+
+
+def build_stim_table(estimuladores_botones_activos, crosses_count_max):
+    """Tabla de máscaras de bits con los estimuladores que se activan en cada número de ciclo (bit 0 = Stim 1)."""
+    size = max([crosses_count_max] + [max(v, default=0) for v in estimuladores_botones_activos.values()])
+    stim_table = np.zeros(size + 1, dtype=np.uint8)
+    for stim_number, vector in estimuladores_botones_activos.items():
+        for cycle in vector:
+            stim_table[cycle] |= 1 << (stim_number - 1)
+    return stim_table
+
+
+class PulseEngine:
+    """Genera los pulsos TTL sobre tareas digitales abiertas toda la sesión.
+
+    Los pulsos se encolan con un plazo monotónico (instante del cruce + retardo). `serve()`, que corre
+    en un hilo propio, duerme hasta poco antes del plazo y espera activamente el último tramo
+    (`spin_time`, 0 para no esperar activamente) cediendo el GIL en cada vuelta, para no detener la
+    lectura ni la detección de los otros hilos; cada pulso queda registrado con su instante ordenado y
+    el instante real en que se escribió la línea.
+    No depende de Qt, así que lo usan tanto PulseThread como el proceso de adquisición."""
+
+    def __init__(self, backend, dev_name, device_channels=DEVICE_CHANNELS, spin_time=0.001):
+        self.backend = backend
+        self.dev_name = dev_name
+        self.delay_time = 0
+        self.device_channel = ''
+        self.device_channels = list(device_channels)
+        self.do_lines = {} # Tareas digitales persistentes por línea
+        self.pending = [] # Montículo de pulsos pendientes (plazo, orden, línea, instantes de las etapas)
+        self.sequence = itertools.count() # Desempate de pulsos con el mismo plazo
+        self.condition = threading.Condition()
+        self.spin_time = spin_time # Tramo final antes del plazo que se espera activamente [s]
+        self.pulse_log = deque(maxlen=10000) # (línea, instante ordenado, instante real) de cada pulso
+        self.running = False
+
+    def open_lines(self):
+        """Abre y configura una sola vez las tareas digitales de las líneas de estimulación."""
+        for device_channel in self.device_channels:
+            try:
+                self.do_lines[device_channel] = self.backend.open_do_line(self.dev_name, device_channel)
+            except self.backend.DaqError as e:
+                print(f"DAQ Error: {e}")
+
+    def close_lines(self):
+        for do_line in self.do_lines.values():
+            do_line.close()
+        self.do_lines.clear()
+
+    def send_ttl_pulse(self, device_channel, start_time, read_time=None, decision_time=None):
+        """Programa un pulso en `device_channel` para `start_time` (perf_counter) más el retardo.
+
+        `read_time` y `decision_time` son los instantes de las etapas anteriores del lazo; si se dan,
+        el pulso se registra en el monitor de latencias."""
+        deadline = start_time + self.delay_time
+        with self.condition:
+            heapq.heappush(self.pending, (deadline, next(self.sequence), device_channel, (read_time, start_time, decision_time)))
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def serve(self):
+        self.open_lines()
+        self.running = True
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                deadline, _, device_channel, stage_times = self.pending[0]
+                remaining = deadline - time.perf_counter()
+                if remaining > self.spin_time:
+                    # Duerme hasta poco antes del plazo; un pulso más urgente puede despertarlo antes
+                    self.condition.wait(remaining - self.spin_time)
+                    continue
+                heapq.heappop(self.pending)
+            # Espera activa del último tramo para no depender de la resolución del temporizador del sistema;
+            # sleep(0) libera el GIL en cada vuelta sin dormir un periodo del temporizador
+            while time.perf_counter() < deadline:
+                time.sleep(0)
+            self.trigger_pulse(device_channel, deadline, stage_times)
+            telemetry.monitor.report_cpu('pulsos')
+        self.close_lines()
+
+    def trigger_pulse(self, device_channel, deadline, stage_times=(None, None, None)):
+        self.device_channel = device_channel
+        do_line = self.do_lines.get(device_channel)
+        if do_line is None:
+            return
+        do_line.pulse()
+        fire_time = time.perf_counter()
+        self.pulse_log.append((device_channel, deadline, fire_time))
+        read_time, start_time, decision_time = stage_times
+        if read_time is not None:
+            latency.monitor.record_pulse(read_time, start_time, decision_time, deadline, fire_time)
@@ -0,0 +1,145 @@
+import os
+import time
+import logging
+import logging.handlers
+import numpy as np
+
+
+class AcquisitionTelemetry:
+    """Telemetría de salud de la adquisición en vivo.
+
+    El hilo de adquisición registra en cada vuelta el periodo del lazo y las muestras pendientes en
+    la tarjeta dentro de arreglos circulares preasignados; cada hilo reporta su propio tiempo de CPU
+    con `time.thread_time()` al terminar su trabajo. `sample()`, llamado una vez por segundo desde la
+    interfaz, resume lo registrado desde la muestra anterior sin detener a los hilos: sólo lee los
+    contadores que ellos publican."""
+
+    def __init__(self, history=8192, log_path=None, log_bytes=1_000_000, log_backups=5):
+        self.history = history
+        self.periods = np.zeros(history) # Periodo de cada vuelta del lazo de adquisición [s]
+        self.backlogs = np.zeros(history, dtype=np.int64) # Muestras pendientes en la tarjeta por vuelta
+        self.loops = 0 # Vueltas registradas (no se reinicia al dar la vuelta al arreglo)
+        self.last_loop = None
+        self.cpu_times = {} # Tiempo de CPU acumulado reportado por cada hilo
+        self.last_sample = None # (instante, vueltas, tiempos de CPU) de la muestra anterior
+        self.sources = {} # Funciones que devuelven contadores externos (desbordes, cola de guardado, FPS)
+        self.drained = 0 # Vueltas ya enviadas por `drain_loops` (proceso de adquisición)
+
+        # Bitácora rotativa: una línea por muestra, con un tamaño máximo en disco. Sin ruta no se escribe
+        # nada; la interfaz la abre al arrancar con `open_log`.
+        self.logger = logging.getLogger('telemetry')
+        self.logger.propagate = False
+        if log_path:
+            self.open_log(log_path, log_bytes, log_backups)
+
+    def open_log(self, log_path, log_bytes=1_000_000, log_backups=5):
+        """Abre la bitácora rotativa en `log_path`, creando su carpeta si hace falta."""
+        if self.logger.handlers:
+            return
+        folder = os.path.dirname(log_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=log_bytes, backupCount=log_backups,
+                                                       delay=True)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.INFO)
+
+    def record_loop(self, backlog):
+        """Hilo de adquisición: registra una vuelta del lazo con las muestras pendientes en la tarjeta."""
+        now = time.perf_counter()
+        if self.last_loop is not None:
+            k = self.loops % self.history
+            self.periods[k] = now - self.last_loop
+            self.backlogs[k] = backlog
+            self.loops += 1
+        self.last_loop = now
+
+    def drain_loops(self):
+        """Proceso de adquisición: periodos, muestras pendientes y tiempos de CPU desde la llamada anterior.
+
+        La interfaz los incorpora a su propio monitor con `merge_loops`."""
+        loops = self.loops
+        new = min(loops - self.drained, self.history)
+        self.drained = loops
+        indices = np.arange(loops - new, loops) % self.history
+        return self.periods[indices], self.backlogs[indices], dict(self.cpu_times)
+
+    def merge_loops(self, periods, backlogs, cpu_times):
+        """Interfaz: registra las vueltas y los tiempos de CPU que informa el proceso de adquisición."""
+        indices = np.arange(self.loops, self.loops + len(periods)) % self.history
+        self.periods[indices] = periods
+        self.backlogs[indices] = backlogs
+        self.loops += len(periods)
+        self.cpu_times.update(cpu_times)
+
+    def report_cpu(self, name):
+        """Cada hilo publica su tiempo de CPU acumulado; sólo avanza mientras el hilo trabaja."""
+        self.cpu_times[name] = time.thread_time()
+
+    def add_source(self, name, function):
+        """Registra un contador externo que se consulta en cada muestra."""
+        self.sources[name] = function
+
+    def sample(self):
+        """Resume la telemetría desde la muestra anterior y la escribe en la bitácora."""
+        now = time.perf_counter()
+        loops = self.loops
+        cpu_times = dict(self.cpu_times)
+        if self.last_sample is None:
+            self.last_sample = (now, loops, cpu_times)
+            return None
+        last_time, last_loops, last_cpu = self.last_sample
+        self.last_sample = (now, loops, cpu_times)
+        elapsed = now - last_time
+
+        new = min(loops - last_loops, self.history)
+        indices = np.arange(loops - new, loops) % self.history
+        periods = self.periods[indices]
+        backlogs = self.backlogs[indices]
+        snapshot = {
+            'loops_per_s': new / elapsed,
+            'period_mean_ms': periods.mean() * 1e3 if new else float('nan'),
+            'jitter_ms': periods.std() * 1e3 if new else float('nan'),
+            'period_max_ms': periods.max() * 1e3 if new else float('nan'),
+            'backlog_max': int(backlogs.max()) if new else 0,
+            'cpu_percent': {name: 100 * (cpu - last_cpu.get(name, cpu)) / elapsed
+                            for name, cpu in cpu_times.items()},
+        }
+        for name, function in self.sources.items():
+            try:
+                snapshot[name] = function()
+            except Exception as e:
+                snapshot[name] = None
+                logging.error(f'Telemetría: no se pudo leer {name}: {e}')
+        self.logger.info(self.format_line(snapshot))
+        return snapshot
+
+    @staticmethod
+    def format_line(snapshot):
+        values = []
+        for name, value in snapshot.items():
+            if isinstance(value, dict):
+                value = ','.join(f'{k}={v:.1f}' for k, v in value.items())
+            elif isinstance(value, float):
+                value = f'{value:.3f}'
+            values.append(f'{name}={value}')
+        return ' '.join(values)
+
+    @staticmethod
+    def format_overlay(snapshot):
+        """Texto de varias líneas para la superposición sobre la gráfica."""
+        cpu = '  '.join(f'{name} {value:.0f}%' for name, value in snapshot['cpu_percent'].items())
+        # Una fuente que falló llega como None; se muestra como 0
+        value = lambda name: snapshot.get(name) or 0
+        return (f"{value('render_fps'):.0f}/{value('render_fps_target')} FPS | "
+                f"bloques agrupados {value('skipped_blocks')} | lazo {snapshot['period_mean_ms']:.1f} ms "
+                f"± {snapshot['jitter_ms']:.1f} (máx {snapshot['period_max_ms']:.1f})\n"
+                f"pendientes DAQ máx {snapshot['backlog_max']} | desbordes {value('overruns')} "
+                f"({value('lost_samples')} muestras)\n"
+                f"cola de guardado {value('save_queue')} (descartados {value('save_dropped')})\n"
+                f"CPU: {cpu}")
+
+
+# Telemetría de la sesión en curso, compartida por los hilos de PRINCIPAL.py
+monitor = AcquisitionTelemetry()
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from cross_detector import CrossDetector
+
+
+def reference_crosses(data, threshold, hysteresis_up, hysteresis_down, hold_off_samples):
+    """Detección muestra por muestra, sin bloques: la referencia del detector en streaming."""
+    ups, downs = [], []
+    waiting_down = False
+    hold_off_left = 0
+    for i, value in enumerate(data):
+        if hold_off_left:
+            hold_off_left -= 1
+            continue
+        if not waiting_down and value >= threshold + hysteresis_up:
+            ups.append(i)
+            waiting_down = True
+            hold_off_left = hold_off_samples
+        elif waiting_down and value < threshold - hysteresis_down:
+            downs.append(i)
+            waiting_down = False
+    return ups, downs
+
+
+def streaming_crosses(detector, data, block_sizes):
+    """Pasa `data` al detector en bloques consecutivos y devuelve los índices absolutos."""
+    ups, downs = [], []
+    position = 0
+    for n in block_sizes:
+        block_ups, block_downs = detector.process(data[position:position + n])
+        ups += [position + i for i in block_ups]
+        downs += [position + i for i in block_downs]
+        position += n
+    assert position == len(data)
+    return ups, downs
+
+
+def random_blocks(rng, total, max_block):
+    sizes = []
+    while sum(sizes) < total:
+        sizes.append(int(min(rng.integers(1, max_block + 1), total - sum(sizes))))
+    return sizes
+
+
+def burst_signal(rng, n=6000):
+    t = np.arange(n) / 3300
+    return np.sin(2 * np.pi * 2 * t) + 0.3 * rng.standard_normal(n)
+
+
+@pytest.mark.parametrize('hold_off_samples', [0, 1, 7, 150, 5000])
+@pytest.mark.parametrize('hysteresis', [(0.0, 0.0), (0.2, 0.1)])
+def test_streaming_matches_per_sample_reference(hold_off_samples, hysteresis):
+    rng = np.random.default_rng(hold_off_samples)
+    data = burst_signal(rng)
+    expected = reference_crosses(data, 0.5, *hysteresis, hold_off_samples)
+    assert expected[0], 'la señal de prueba debe tener cruces'
+    for max_block in (1, 13, 400, len(data)):
+        detector = CrossDetector(0.5, *hysteresis, hold_off_samples)
+        assert streaming_crosses(detector, data, random_blocks(rng, len(data), max_block)) == expected
+
+
+def test_crossing_on_block_boundary():
+    # El cruce ascendente es la última muestra de un bloque y el descendente la primera del siguiente
+    detector = CrossDetector(threshold=1.0)
+    assert detector.process(np.array([0.0, 0.0, 2.0])) == ([2], [])
+    assert detector.process(np.array([0.0, 2.0])) == ([1], [0])
+    assert detector.process(np.array([2.0])) == ([], [])
+
+
+def test_hold_off_spans_several_blocks():
+    detector = CrossDetector(threshold=1.0, hold_off_samples=10)
+    assert detector.process(np.array([2.0, 0.0, 0.0, 0.0])) == ([0], [])
+    # Las 10 muestras de hold-off (1 a 10) ignoran el descenso aunque crucen dos bloques más
+    assert detector.process(np.zeros(4)) == ([], [])
+    assert detector.process(np.zeros(4)) == ([], [3])
+
+
+def test_reset_rearms_for_rising_crossing():
+    detector = CrossDetector(threshold=1.0, hold_off_samples=100)
+    detector.process(np.array([2.0]))
+    detector.reset()
+    assert detector.process(np.array([0.0, 2.0])) == ([1], [])
@@ -0,0 +1,61 @@
+import numpy as np
+from decimation import MinMaxDecimator
+
+
+def reference(source, bin_size):
+    """Mínimo y máximo de cada columna calculados columna por columna."""
+    starts = range(0, source.shape[1], bin_size)
+    mins = np.column_stack([source[:, s:s + bin_size].min(axis=1) for s in starts])
+    maxs = np.column_stack([source[:, s:s + bin_size].max(axis=1) for s in starts])
+    return mins, maxs
+
+
+def assert_matches(decimator, source):
+    mins, maxs = reference(source, decimator.bin_size)
+    np.testing.assert_array_equal(decimator.mins, mins)
+    np.testing.assert_array_equal(decimator.maxs, maxs)
+    np.testing.assert_array_equal(decimator.interleaved[:, 0::2], mins)
+    np.testing.assert_array_equal(decimator.interleaved[:, 1::2], maxs)
+
+
+def test_partial_last_column():
+    """1003 muestras en columnas de 10: la última columna tiene 3 muestras y también cuenta."""
+    tiempo = np.arange(1003) / 3300
+    source = np.random.default_rng(0).standard_normal((2, 1003))
+    source[1, 1001] = 50.0 # Pico aislado en la columna incompleta
+    decimator = MinMaxDecimator(2, 1003, 101, tiempo)
+    assert (decimator.bin_size, decimator.n_columns) == (10, 101)
+    decimator.update(source, 0, 1003)
+    assert_matches(decimator, source)
+    assert decimator.maxs[1, -1] == 50.0
+    assert decimator.x[-2] == tiempo[1000] and decimator.x[-1] == tiempo[1002]
+
+
+def test_blocks_across_column_boundaries():
+    """Bloques irregulares que empiezan y terminan a media columna, dando la vuelta al arreglo."""
+    rng = np.random.default_rng(1)
+    n_samples = 997
+    source = rng.standard_normal((3, n_samples))
+    decimator = MinMaxDecimator(3, n_samples, 64, np.arange(n_samples))
+    decimator.update(source, 0, n_samples)
+    position = 0
+    for _ in range(60):
+        n = min(int(rng.integers(1, 90)), n_samples - position)
+        block = rng.standard_normal((3, n)) * rng.uniform(0.1, 10)
+        if rng.random() < 0.3:
+            block[rng.integers(3), rng.integers(n)] = rng.choice([-100.0, 100.0]) # Pico de una muestra
+        source[:, position:position + n] = block
+        decimator.update(source, position, n)
+        assert_matches(decimator, source)
+        position = (position + n) % n_samples
+
+
+def test_isolated_marks_survive():
+    """Una marca de evento de una sola muestra queda en el máximo de su columna."""
+    markers = np.zeros((1, 500))
+    decimator = MinMaxDecimator(1, 500, 20, np.arange(500))
+    decimator.update(markers, 0, 500)
+    markers[0, 263] = 1.5
+    decimator.update(markers, 263, 1)
+    assert decimator.maxs[0, 263 // decimator.bin_size] == 1.5
+    assert np.count_nonzero(decimator.maxs) == 1
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from scipy.signal import butter, lfilter, sosfilt
+from envelope import StreamingEnvelope
+from ring_buffer import RingBuffer
+
+FS = 3300
+
+
+class SignalTask:
+    """Tarea falsa que entrega una señal pregrabada bloque por bloque."""
+
+    def __init__(self, signal):
+        self.signal = signal
+        self.position = 0
+
+    def read_many_sample(self, data, number_of_samples_per_channel):
+        n = number_of_samples_per_channel
+        data[:, :n] = self.signal[:, self.position:self.position + n]
+        self.position += n
+        return n
+
+
+def offline_envelope(signal, hp_cutoff, hp_order=5, time_constant=0.05):
+    """Cadena completa sobre la señal entera: pasa-altas, rectificado e integrador con `lfilter`."""
+    x = signal
+    if hp_cutoff > 0:
+        x = sosfilt(butter(hp_order, hp_cutoff, btype='high', fs=FS, output='sos'), x, axis=1)
+    x = np.maximum(x, 0)
+    k = min((1 / FS) / time_constant, 1.0)
+    return lfilter([k], [1.0, k - 1.0], x, axis=1)
+
+
+@pytest.mark.parametrize('hp_cutoff', [0, 10.0])
+def test_streamed_envelope_matches_offline(hp_cutoff):
+    """Bloques irregulares escritos en el buffer circular (dando varias vueltas) == señal completa."""
+    rng = np.random.default_rng(0)
+    n_samples = 3 * FS
+    signal = rng.standard_normal((3, n_samples)) * (1 + np.sin(np.arange(n_samples) / FS * 2 * np.pi))
+    ring = RingBuffer(3, 1000, envelope=True)
+    task = SignalTask(signal)
+    envelope = StreamingEnvelope(3, FS, hp_cutoff=hp_cutoff)
+    streamed = np.empty_like(signal)
+    position = 0
+    wrapped = 0
+    while position < n_samples:
+        start, n = ring.read_from(task, min(int(rng.integers(1, 250)), n_samples - position))
+        envelope.process(ring.view(start, n), out=ring.envelope[:, start:start + n])
+        ring.commit(n)
+        streamed[:, position:position + n] = ring.envelope[:, start:start + n]
+        wrapped += start + n == ring.capacity
+        position += n
+    assert wrapped >= 3
+    np.testing.assert_allclose(streamed, offline_envelope(signal, hp_cutoff), rtol=0, atol=1e-12)
+
+
+def test_configure_redesigns_and_resets():
+    """Al cambiar la frecuencia el filtro se recalcula y el estado arranca en reposo."""
+    signal = np.random.default_rng(1).standard_normal((2, 2000))
+    envelope = StreamingEnvelope(2, FS)
+    envelope.process(signal[:, :700])
+    envelope.configure(FS)
+    assert not envelope.designed
+    np.testing.assert_allclose(envelope.process(signal[:, 700:]), offline_envelope(signal[:, 700:], 10.0),
+                               rtol=0, atol=1e-12)
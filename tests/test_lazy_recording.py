@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import recording_cache
+import replay
+from lazy_recording import ColumnSource, open_recording
+from post_processing import load_table
+
+
+@pytest.fixture(scope='module')
+def recording(tmp_path_factory):
+    """Grabación binaria corta del dispositivo simulado."""
+    return replay.synthetic_recording(str(tmp_path_factory.mktemp('lazy') / 'registro.bin'), seconds=2.0)
+
+
+def test_lru_keeps_at_most_max_columns(recording):
+    source = ColumnSource(recording, max_columns=3, dtype=np.float64)
+    names = ['CH 1', 'CH 2', 'CH 3', 'CH 4', 'CH 5']
+    for name in names:
+        source.get(name)
+        assert len(source.decoded) <= 3
+    assert list(source.decoded) == ['CH 3', 'CH 4', 'CH 5']
+    assert source.loads == 5
+
+
+def test_lru_evicts_least_recently_used(recording):
+    source = ColumnSource(recording, max_columns=3, dtype=np.float64)
+    for name in ('CH 1', 'CH 2', 'CH 3'):
+        source.get(name)
+    source.get('CH 1') # Vuelve a ser la más reciente: sale CH 2
+    source.get('CH 4')
+    assert list(source.decoded) == ['CH 3', 'CH 1', 'CH 4']
+    loads = source.loads
+    source.get('CH 1')
+    assert source.loads == loads
+    source.get('CH 2') # Ya no estaba en memoria: se decodifica otra vez
+    assert source.loads == loads + 1
+
+
+def test_columns_match_load_table(recording):
+    """Con un LRU chico las columnas (incluidas las de ciclo) siguen siendo las de `load_table`."""
+    rec = open_recording(recording, max_columns=2, dtype=np.float64)
+    table = load_table(recording)
+    assert list(rec.columns) == list(table.columns)
+    for name in table.columns:
+        np.testing.assert_allclose(rec[name].to_numpy(), table[name].to_numpy(), equal_nan=True)
+    assert len(rec.source.decoded) <= 2
+
+
+def test_csv_columns_come_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(recording_cache, 'FALLBACK_DIR', str(tmp_path / 'respaldo'))
+    path = str(tmp_path / 'registro.csv')
+    table = load_table(replay.synthetic_recording(str(tmp_path / 'registro.bin'), seconds=1.0))
+    table.to_csv(path, index=False)
+    reference = load_table(path)
+    source = ColumnSource(path, max_columns=2, dtype=np.float64)
+    assert source.cache is not None
+    for name in ('TIME', 'CH 1', 'UP', 'TIME'): # UP saca a TIME, que se vuelve a leer de la caché
+        np.testing.assert_array_equal(source.get(name), reference[name].to_numpy())
+    assert len(source.decoded) == 2
+    assert source.loads == 4
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from post_processing import add_cycle_columns
+
+
+def baseline_cycle_columns(df, increment):
+    """Cálculo original de PRINCIPAL.perform_post_processing (fila por fila, O(N^2))."""
+    def calculate_cycle_duration(row, start_label, end_label):
+        if row[start_label] == 1:
+            index_start = row.name
+            index_end = df.loc[:index_start, end_label][::-1].idxmax()
+            return row['TIME'] - df.at[index_end, 'TIME']
+        return None
+
+    df.insert(0, 'TIME', [0] + [increment * i for i in range(1, len(df))])
+    df['ACTIVE CYCLE'] = df.apply(lambda row: calculate_cycle_duration(row, 'DOWN', 'UP'), axis=1)
+    df['INACTIVE CYCLE'] = df.apply(lambda row: calculate_cycle_duration(row, 'UP', 'DOWN'), axis=1)
+    up_indices = df[df['UP'] == 1].index
+    delta_cycle = [df.at[up_indices[i + 1], 'TIME'] - df.at[up_indices[i], 'TIME'] if i < len(up_indices) - 1
+                   else None for i in range(len(up_indices))]
+    df['CYCLE TIME'] = pd.Series(delta_cycle, index=up_indices)
+    frequency_value = 1 / df['CYCLE TIME'].mean()
+    df.at[0, 'FREQUENCY'] = frequency_value
+    df['FREQUENCY'] = df['FREQUENCY'].where(df.index == 0, None)
+    return df
+
+
+def recording(up_indices, down_indices, n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'CH 1': rng.standard_normal(n), 'UP': np.zeros(n), 'DOWN': np.zeros(n),
+                       'STIM 1': np.zeros(n)})
+    df.loc[list(up_indices), 'UP'] = 1
+    df.loc[list(down_indices), 'DOWN'] = 1
+    return df
+
+
+CASES = {
+    'alternados': ([10, 110, 210, 310], [60, 160, 260, 360]),
+    'empieza con DOWN': ([50, 150, 250], [5, 100, 200, 300]),
+    'sin DOWN': ([20, 90, 300], []),
+    'un solo UP': ([42], [80]),
+    'sin eventos': ([], []),
+    'UP y DOWN en la misma muestra': ([0, 100, 200], [100, 150]),
+}
+
+
+@pytest.mark.parametrize('case', CASES)
+def test_matches_baseline_loop(case):
+    ups, downs = CASES[case]
+    sample_time = 1 / 3300
+    expected = baseline_cycle_columns(recording(ups, downs), sample_time)
+    result = add_cycle_columns(recording(ups, downs), sample_time)
+    assert list(result.columns) == list(expected.columns)
+    for column in expected.columns:
+        np.testing.assert_allclose(result[column].to_numpy(dtype=float),
+                                   pd.to_numeric(expected[column]).to_numpy(dtype=float),
+                                   rtol=1e-12, atol=1e-15, err_msg=column)
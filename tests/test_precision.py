@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+import precision
+
+
+@pytest.fixture(scope='module')
+def results():
+    """Pasos de los análisis en float32 frente a float64 sobre 5 s de señal."""
+    return precision.tolerance_check(seconds=5.0)
+
+
+@pytest.mark.parametrize('step', ['filtro', 'detrend', 'fft'])
+def test_float32_within_tolerance(results, step):
+    error, tolerance, bytes64, bytes32 = results[step]
+    assert error <= precision.TOLERANCES[step] == tolerance
+    assert bytes32 * 2 == bytes64
+
+
+@pytest.mark.parametrize('step', ['cwt', 'coherencia'])
+def test_wavelet_steps_within_tolerance(results, step):
+    pytest.importorskip('pywt')
+    error, tolerance, _, _ = results[step]
+    assert error <= tolerance
+
+
+@pytest.mark.parametrize('mode', ['float64', 'float32'])
+def test_tolerance_check_restores_precision(mode):
+    previous = precision.current
+    try:
+        precision.set_precision(mode)
+        precision.tolerance_check(seconds=1.0)
+        assert precision.current == mode
+    finally:
+        precision.set_precision(previous)
@@ -0,0 +1,55 @@
+import numpy as np
+from latency import LatencyMonitor
+from telemetry import AcquisitionTelemetry
+
+
+def test_latency_drain_merge_matches_child():
+    """Los incrementos enviados por el proceso hijo reconstruyen sus histogramas en la interfaz."""
+    rng = np.random.default_rng(3)
+    child = LatencyMonitor()
+    gui = LatencyMonitor()
+    for _ in range(4):
+        for value in rng.lognormal(np.log(2e-4), 0.6, 50):
+            child.record_detection(0.0, value)
+        gui.merge(child.drain())
+    assert child.drain() == {} # Nada nuevo: no se repite lo ya enviado
+    sent = child.histograms['lectura->cruce']
+    merged = gui.histograms['lectura->cruce']
+    assert merged.count == sent.count == 200
+    np.testing.assert_array_equal(merged.counts, sent.counts)
+    assert merged.total == sent.total
+    assert merged.max == sent.max
+    assert gui.histograms['cruce->decision'].count == 0
+
+
+def test_telemetry_drain_merge_feeds_sample():
+    """Las vueltas del lazo del proceso hijo llegan a la muestra de la interfaz."""
+    child = AcquisitionTelemetry(history=16)
+    gui = AcquisitionTelemetry(history=16)
+    for k in range(10):
+        child.periods[k], child.backlogs[k] = 0.01, k
+    child.loops = 10
+    child.cpu_times['adquisición'] = 1.0
+    gui.sample()
+    periods, backlogs, cpu_times = child.drain_loops()
+    gui.merge_loops(periods, backlogs, cpu_times)
+    assert len(child.drain_loops()[0]) == 0
+    snapshot = gui.sample()
+    assert snapshot['backlog_max'] == 9
+    assert abs(snapshot['period_mean_ms'] - 10.0) < 1e-9
+    assert 'adquisición' in snapshot['cpu_percent']
+
+
+def test_latency_reset_in_gui_clears_child_max():
+    """Tras reiniciar la interfaz, el máximo es el de lo registrado después y no el de la sesión anterior."""
+    child = LatencyMonitor()
+    gui = LatencyMonitor()
+    child.record_detection(0.0, 0.5)
+    gui.merge(child.drain())
+    gui.reset()
+    child.record_detection(0.0, 1e-3)
+    gui.merge(child.drain())
+    stats = gui.summary()['lectura->cruce']
+    assert stats['n'] == 1
+    assert stats['max'] == 1e-3
+    assert stats['p99'] <= 1e-3
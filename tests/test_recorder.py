@@ -0,0 +1,97 @@
+import threading
+import numpy as np
+import pytest
+import recorder
+from post_processing import load_table
+from ring_buffer import EVENT_LABELS
+
+SAMPLE_RATE = 3300
+LABELS = ['CH 1', 'CH 2', 'CH 3'] + EVENT_LABELS
+
+
+class GatedRecorder(recorder.BinaryRecorder):
+    """El hilo escritor no empieza hasta abrir `gate`: los bloques se quedan en la cola."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gate = threading.Event()
+
+    def writer_loop(self):
+        self.gate.wait()
+        super().writer_loop()
+
+
+def make_blocks(sizes, seed=0):
+    """Bloques (señales, eventos) con valores de ±10 V y marcas 1, 1.5 y 2 como las del buffer."""
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for n in sizes:
+        data = rng.uniform(-10, 10, (3, n))
+        events = np.zeros((len(EVENT_LABELS), n))
+        events[0, ::7] = 1 # UP
+        events[1, 3::7] = 1 # DOWN
+        events[2, ::11] = rng.choice([1.0, 1.5, 2.0], len(range(0, n, 11)))
+        blocks.append((data, events))
+    return blocks
+
+
+def expected_rows(blocks):
+    return np.vstack([np.vstack((data, events)).T for data, events in blocks])
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'int16'])
+def test_round_trip(tmp_path, dtype):
+    path = str(tmp_path / f'registro_{dtype}.bin')
+    blocks = make_blocks([1, 37, 500, 64, 999])
+    rec = recorder.BinaryRecorder(path, LABELS, SAMPLE_RATE, EVENT_LABELS, dtype=dtype)
+    rec.open()
+    for data, events in blocks:
+        assert rec.push(data, events)
+    rec.close()
+
+    header, values = recorder.read_recording(path)
+    expected = expected_rows(blocks)
+    assert header['columns'] == LABELS
+    assert header['event_columns'] == EVENT_LABELS
+    assert header['sample_rate'] == SAMPLE_RATE
+    assert header['dtype'] == dtype
+    assert header['n_samples'] == len(expected) == len(values)
+    decoded = np.asarray(values, dtype=np.float64) * np.array(header['scale'])
+    # float32 redondea al tipo; int16 cuantiza las señales a la escala y deja exactos los eventos
+    tolerance = 1e-5 if dtype == 'float32' else recorder.INT16_SIGNAL_SCALE / 2
+    np.testing.assert_allclose(decoded[:, :3], expected[:, :3], rtol=0, atol=tolerance * 1.0001)
+    np.testing.assert_array_equal(decoded[:, 3:], expected[:, 3:])
+
+    table = load_table(path)
+    assert list(table.columns[:len(LABELS) + 1]) == ['TIME'] + LABELS
+    np.testing.assert_allclose(table['TIME'].to_numpy(), np.arange(len(expected)) / SAMPLE_RATE)
+    np.testing.assert_array_equal(table[LABELS].to_numpy(), decoded)
+    assert np.count_nonzero(~np.isnan(table['CYCLE TIME'].to_numpy())) == np.count_nonzero(expected[:, 3]) - 1
+
+
+def test_close_writes_blocks_still_queued(tmp_path):
+    """Al cerrar con bloques en la cola, todos se escriben antes de cerrar el archivo."""
+    path = str(tmp_path / 'pendientes.bin')
+    blocks = make_blocks([100] * 6, seed=1)
+    rec = GatedRecorder(path, LABELS, SAMPLE_RATE, EVENT_LABELS, queue_size=16, flush_interval=10.0)
+    rec.open()
+    for data, events in blocks:
+        rec.push(data, events)
+    assert rec.queue.qsize() == len(blocks)
+    rec.gate.set()
+    rec.close()
+    header, values = recorder.read_recording(path)
+    assert header['n_samples'] == len(values) == 600
+    np.testing.assert_allclose(values, expected_rows(blocks).astype(np.float32))
+
+
+def test_full_queue_drops_block(tmp_path):
+    rec = GatedRecorder(str(tmp_path / 'llena.bin'), LABELS, SAMPLE_RATE, EVENT_LABELS, queue_size=2,
+                        flush_interval=0.01)
+    rec.open()
+    blocks = make_blocks([10, 10, 10], seed=2)
+    assert [rec.push(data, events) for data, events in blocks] == [True, True, False]
+    assert rec.dropped_blocks == 1
+    rec.gate.set()
+    rec.close()
+    assert recorder.read_recording(rec.path)[0]['n_samples'] == 20
@@ -0,0 +1,64 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import recording_cache
+
+
+@pytest.fixture(autouse=True)
+def fallback_dir(tmp_path, monkeypatch):
+    """La carpeta de respaldo de la caché queda dentro del directorio temporal de la prueba."""
+    monkeypatch.setattr(recording_cache, 'FALLBACK_DIR', str(tmp_path / 'respaldo'))
+
+
+def write_csv(path, n, phase=0):
+    table = pd.DataFrame({'TIME': np.arange(n) / 3300, 'CH 1': np.arange(n) * 0.5, 'UP': (np.arange(n) + phase) % 2})
+    table.to_csv(path, index=False)
+    return pd.read_csv(path)
+
+
+def assert_same(table, reference):
+    assert list(table.columns) == list(reference.columns)
+    for column in reference.columns:
+        np.testing.assert_array_equal(table[column].to_numpy(), reference[column].to_numpy())
+
+
+def test_cache_matches_csv(tmp_path):
+    path = str(tmp_path / 'registro.csv')
+    reference = write_csv(path, 50)
+    assert recording_cache.find_cache(path) is None
+    folder = recording_cache.build(path)
+    assert folder == recording_cache.cache_dirs(path)[0]
+    assert recording_cache.find_cache(path)[0] == folder
+    assert_same(recording_cache.load(path), reference)
+
+
+def test_size_change_invalidates_cache(tmp_path):
+    """Si el CSV cambia de tamaño la caché deja de valer y se reconstruye con el contenido nuevo."""
+    path = str(tmp_path / 'registro.csv')
+    write_csv(path, 50)
+    recording_cache.build(path)
+    reference = write_csv(path, 80)
+    assert recording_cache.find_cache(path) is None
+    assert_same(recording_cache.load(path), reference)
+    assert recording_cache.find_cache(path) is not None
+
+
+def test_mtime_change_invalidates_cache(tmp_path):
+    """Mismo tamaño, otro contenido: la fecha de modificación basta para invalidar la caché."""
+    path = str(tmp_path / 'registro.csv')
+    write_csv(path, 50)
+    recording_cache.build(path)
+    stat = os.stat(path)
+    reference = write_csv(path, 50, phase=1) # Cambian los ceros y unos de UP, no la longitud de las filas
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert os.stat(path).st_size == stat.st_size
+    assert recording_cache.find_cache(path) is None
+    assert_same(recording_cache.load(path), reference)
+
+
+def test_text_columns_are_not_cached(tmp_path):
+    path = str(tmp_path / 'texto.csv')
+    pd.DataFrame({'TIME': [0.0, 1.0], 'NOTA': ['a', 'b']}).to_csv(path, index=False)
+    assert recording_cache.build(path) is None
+    assert recording_cache.load(path) is None
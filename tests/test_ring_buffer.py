@@ -0,0 +1,88 @@
+import numpy as np
+from ring_buffer import RingBuffer, EVENT_LABELS
+
+
+class CountingTask:
+    """Tarea falsa: cada muestra vale su índice absoluto (igual en todos los canales)."""
+
+    def __init__(self):
+        self.next_sample = 0
+
+    def read_many_sample(self, data, number_of_samples_per_channel):
+        n = number_of_samples_per_channel
+        data[:, :n] = np.arange(self.next_sample, self.next_sample + n)
+        self.next_sample += n
+        return n
+
+
+def write(ring, task, n):
+    start, written = ring.read_from(task, n)
+    ring.commit(written)
+    return start, written
+
+
+def read_samples(ring, segments):
+    return np.concatenate([ring.view(start, n)[0] for start, n in segments]) if segments else np.array([])
+
+
+def test_blocks_never_cross_the_end():
+    ring = RingBuffer(2, 10)
+    task = CountingTask()
+    assert write(ring, task, 7) == (0, 7)
+    # El bloque se recorta al final del buffer y el siguiente empieza en 0
+    assert write(ring, task, 7) == (7, 3)
+    assert write(ring, task, 7) == (0, 7)
+    assert ring.write_count == 17 and ring.block_count == 3
+
+
+def test_reader_follows_wraparound_in_order():
+    ring = RingBuffer(2, 10)
+    task = CountingTask()
+    reader = ring.reader()
+    received = []
+    for n in (3, 4, 2, 5, 1, 4):
+        write(ring, task, n)
+        segments = reader.poll()
+        assert all(start + k <= ring.capacity for start, k in segments)
+        received.extend(read_samples(ring, segments))
+    assert received == list(range(task.next_sample))
+    assert reader.overruns == 0 and reader.lost_samples == 0
+
+
+def test_slow_reader_overrun_counts_lost_samples():
+    ring = RingBuffer(1, 10) # max_lag = 5
+    task = CountingTask()
+    reader = ring.reader()
+    for _ in range(6):
+        write(ring, task, 2) # 12 muestras: más de una vuelta
+    segments = reader.poll()
+    # Sólo quedan las últimas max_lag muestras; las 7 anteriores se cuentan como perdidas
+    assert read_samples(ring, segments).tolist() == list(range(7, 12))
+    assert reader.overruns == 1 and reader.lost_samples == 7
+    assert reader.blocks == 6
+    write(ring, task, 2)
+    assert read_samples(ring, reader.poll()).tolist() == [12, 13]
+    assert reader.overruns == 1
+
+
+def test_resize_restarts_readers():
+    ring = RingBuffer(1, 10)
+    task = CountingTask()
+    reader = ring.reader()
+    write(ring, task, 4)
+    ring.resize(20)
+    assert reader.poll() == []
+    write(ring, task, 3)
+    assert read_samples(ring, reader.poll()).tolist() == [4, 5, 6]
+
+
+def test_events_are_cleared_half_a_lap_ahead():
+    ring = RingBuffer(1, 10)
+    task = CountingTask()
+    assert len(ring.events) == len(EVENT_LABELS)
+    # Una marca con retardo por delante del escritor sobrevive hasta que éste se acerca a media vuelta
+    ring.events[2, 8] = 1
+    write(ring, task, 2)
+    assert ring.events[2, 8] == 1
+    write(ring, task, 2)
+    assert ring.events[2, 8] == 0
@@ -0,0 +1,40 @@
+import os
+import sys
+import threading
+import numpy as np
+from shared_ring import SharedRingBuffer
+
+
+def test_concurrent_readers_see_a_mapped_segment():
+    """Varios hilos de la interfaz usan el mismo lector mientras el escritor reasigna el buffer."""
+    writer = SharedRingBuffer('nmsig_test_hilos', 2, 100, create=True, envelope=True)
+    reader = SharedRingBuffer('nmsig_test_hilos')
+    failures = []
+    stop = threading.Event()
+
+    def consume():
+        while not stop.is_set():
+            for array in (reader.data, reader.events, reader.envelope):
+                if not isinstance(array, np.ndarray):
+                    failures.append(array)
+                else:
+                    array.sum() # Un segmento desmapeado aquí termina el proceso con una violación de segmento
+
+    threads = [threading.Thread(target=consume) for _ in range(4)]
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6) # Cambios de hilo frecuentes: la carrera aparece en cada corrida
+    try:
+        for thread in threads:
+            thread.start()
+        for k in range(200):
+            writer.resize(100 + k % 7)
+    finally:
+        sys.setswitchinterval(switch_interval)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        reader.close()
+        writer.close()
+    assert failures == []
+    if os.path.isdir('/dev/shm'):
+        assert not [name for name in os.listdir('/dev/shm') if name.startswith('nmsig_test_hilos')]
@@ -0,0 +1,111 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+import daq_backend
+import recorder
+from ring_buffer import RingBuffer, EVENT_LABELS
+from cross_detector import CrossDetector
+
+
+SAMPLE_RATE = 3300
+STIM_1 = EVENT_LABELS.index('STIM 1')
+
+
+class LateScheduler:
+    """Como Thread_index: recibe los cruces de la adquisición y escribe la marca STIM 1 después de que
+    el bloque ya se publicó, con un atraso de 5 a 20 ms."""
+
+    def __init__(self, ring, seed=0):
+        self.ring = ring
+        self.rng = np.random.default_rng(seed)
+        self.pending = deque()
+        self.wakeup = threading.Event()
+        self.posted = 0
+        self.processed = 0
+        self.tags = [] # Muestra absoluta de cada marca emitida
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def post(self, index, sample):
+        self.pending.append((index, sample))
+        self.posted += 1
+        self.wakeup.set()
+
+    def run(self):
+        while self.running:
+            self.wakeup.wait(0.05)
+            self.wakeup.clear()
+            while self.pending:
+                index, sample = self.pending.popleft()
+                time.sleep(self.rng.uniform(0.005, 0.02))
+                self.ring.events[STIM_1, index] = 1
+                self.tags.append(sample)
+                self.processed += 1
+
+    def wait_idle(self, timeout=2.0):
+        target = self.posted
+        deadline = time.perf_counter() + timeout
+        while self.processed < target and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        return self.processed >= target
+
+
+def save(ring, reader, rec, hold_back):
+    for start, n in reader.poll(hold_back):
+        rec.push(ring.view(start, n), ring.events[:, start:start + n])
+
+
+def test_every_stim_tag_reaches_the_recording(tmp_path):
+    backend = daq_backend.SimulatedBackend(burst_period=0.1)
+    task = backend.open_ai_task('SimDev1', 2, SAMPLE_RATE, SAMPLE_RATE)
+    ring = RingBuffer(2, 2 * SAMPLE_RATE)
+    detector = CrossDetector(threshold=1.0, hold_off_samples=SAMPLE_RATE // 20)
+    scheduler = LateScheduler(ring)
+    labels = ['CH 1', 'CH 2'] + EVENT_LABELS
+    guarded = recorder.BinaryRecorder(str(tmp_path / 'guarda.bin'), labels, SAMPLE_RATE, EVENT_LABELS)
+    unguarded = recorder.BinaryRecorder(str(tmp_path / 'sin_guarda.bin'), labels, SAMPLE_RATE, EVENT_LABELS)
+    guarded.open()
+    unguarded.open()
+    guarded_reader, unguarded_reader = ring.reader(), ring.reader()
+    hold_back = round(0.25 * SAMPLE_RATE) # SaveThread.mark_guard
+
+    try:
+        while ring.write_count < 3 * SAMPLE_RATE:
+            start, n = ring.read_from(task, SAMPLE_RATE // 100)
+            first_sample = ring.write_count
+            ups, _ = detector.process(ring.view(start, n)[0])
+            for index in ups:
+                scheduler.post(start + index, first_sample + index)
+            ring.commit(n)
+            save(ring, guarded_reader, guarded, hold_back)
+            save(ring, unguarded_reader, unguarded, 0)
+        # Cierre de SaveThread: espera al planificador y guarda hasta el final de lo publicado
+        assert scheduler.wait_idle()
+        save(ring, guarded_reader, guarded, 0)
+        save(ring, unguarded_reader, unguarded, 0)
+    finally:
+        scheduler.running = False
+        guarded.close()
+        unguarded.close()
+
+    assert len(scheduler.tags) >= 10
+    _, data = recorder.read_recording(str(tmp_path / 'guarda.bin'))
+    stim_column = labels.index('STIM 1')
+    assert len(data) == ring.write_count
+    assert np.all(data[scheduler.tags, stim_column] == 1)
+    assert np.count_nonzero(data[:, stim_column]) == len(scheduler.tags)
+    # Control: sin margen, el lector ya pasó por las muestras cuando llegan las marcas
+    _, control = recorder.read_recording(str(tmp_path / 'sin_guarda.bin'))
+    assert np.count_nonzero(control[scheduler.tags, stim_column] == 1) < len(scheduler.tags)
+
+
+def test_poll_hold_back_stays_behind_the_writer():
+    ring = RingBuffer(1, 100)
+    reader = ring.reader()
+    for _ in range(3):
+        ring.commit(10)
+    assert reader.poll(hold_back=15) == [(0, 15)]
+    assert reader.poll(hold_back=40) == []
+    assert reader.poll() == [(15, 15)]